@@ -0,0 +1,44 @@
+"""Throughput of one logged-in ServerConnector shared by a growing thread pool.
+
+    $ poetry run python benchmarks/connector_threads.py --latency 0.05 --requests 400
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from facecast_io import ServerConnector
+from facecast_io.api import make_client
+from facecast_io.testing import FakeFacecast, FAKE_BASE_URL
+
+
+def run(workers: int, latency: float, requests: int) -> float:
+    service = FakeFacecast(latency=latency)
+    rtmp_ids = [service.add_device(f"DEV{i}") for i in range(requests)]
+    connector = ServerConnector(make_client(FAKE_BASE_URL, dispatch=service))
+    connector.do_auth(service.username, service.password)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(connector.get_status, rtmp_ids))
+    elapsed = time.perf_counter() - started
+    assert service.count("/en/login") == 1
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    for workers in args.workers:
+        throughput = run(workers, args.latency, args.requests)
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>10.1f} {throughput / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
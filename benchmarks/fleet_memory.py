@@ -0,0 +1,84 @@
+"""Memory held by the full pydantic Devices model vs CompactFleet.
+
+    $ poetry run python benchmarks/fleet_memory.py --devices 1000 10000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from facecast_io import ServerConnector
+from facecast_io.api import make_client
+from facecast_io.compact import CompactDevice, CompactFleet
+from facecast_io.entities import (
+    AvailableServers,
+    DeviceInfo,
+    DeviceOutputs as BaseDeviceOutputs,
+    DeviceStatusFull,
+)
+from facecast_io.models import Device, DeviceOutput, Devices
+from facecast_io.testing import FakeFacecast, FAKE_BASE_URL, FAKE_SERVERS
+
+
+def build_full(service: FakeFacecast, connector: ServerConnector) -> Devices:
+    # Same objects Devices.update() keeps, built without HTTP round trips
+    devices = Devices(connector)
+    for rtmp_id, data in service.devices.items():
+        device = Device(connector, data["name"], rtmp_id, devices.server_catalog)
+        device._info = DeviceInfo.parse_obj(service._device_info(rtmp_id))
+        device._status = DeviceStatusFull.parse_obj(service._device_status(rtmp_id))
+        device._available_servers = AvailableServers.parse_obj(FAKE_SERVERS)
+        outputs = BaseDeviceOutputs.parse_obj(list(data["outputs"].values()))
+        device.outputs._outputs = [DeviceOutput(device=device, output=o) for o in outputs]
+        devices._devices.append(device)
+    return devices
+
+
+def build_compact(service: FakeFacecast, connector: ServerConnector) -> CompactFleet:
+    fleet = CompactFleet(connector)
+    fleet.server_catalog.get(next(iter(service.devices)))
+    for rtmp_id, data in service.devices.items():
+        device = fleet._devices[rtmp_id] = CompactDevice(rtmp_id, data["name"])
+        fleet._apply_status(
+            device, DeviceStatusFull.parse_obj(service._device_status(rtmp_id))
+        )
+        fleet._apply_outputs(
+            device, BaseDeviceOutputs.parse_obj(list(data["outputs"].values()))
+        )
+    return fleet
+
+
+def measure(build, *args) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(*args)  # noqa: F841 - kept alive until measured
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--outputs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'devices':>8} {'full MB':>9} {'compact MB':>11} {'ratio':>6}")
+    for count in args.devices:
+        service = FakeFacecast()
+        for i in range(count):
+            service.add_device(f"DEV{i}", outputs=args.outputs)
+        connector = ServerConnector(make_client(FAKE_BASE_URL, dispatch=service))
+        connector.do_auth(service.username, service.password)
+
+        full = measure(build_full, service, connector)
+        compact = measure(build_compact, service, connector)
+        print(
+            f"{count:>8} {full / 2 ** 20:>9.1f} {compact / 2 ** 20:>11.1f}"
+            f" {full / compact:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Cold import time of the package and of the CLI against the tracked budget.
+
+    $ poetry run python benchmarks/import_time.py --runs 5
+
+Exits with 1 when the best run of any module goes over its budget.
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# milliseconds, cumulative `python -X importtime` time of the module itself
+BUDGET = {
+    "facecast_io": 5,
+    "facecast_io.cli": 200,
+    "facecast_io.api": 600,
+}
+
+IMPORT_TIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s?(\S+)$")
+
+
+def import_time(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    raise RuntimeError(f"{module} is not in the importtime output")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'module':<20}{'best, ms':>10}{'budget, ms':>12}")
+    for module, budget in BUDGET.items():
+        best = min(import_time(module) for _ in range(args.runs))
+        over_budget = over_budget or best > budget
+        mark = "" if best <= budget else "  OVER BUDGET"
+        print(f"{module:<20}{best:>10.1f}{budget:>12}{mark}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Wall time of the flows in tests/cassettes replayed with the recorded latency.
+
+    $ poetry run python benchmarks/replay_flows.py
+    $ poetry run python benchmarks/replay_flows.py --update
+
+Times are compared with benchmarks/replay_flows.json, the script exits with 1
+when a flow is slower than the baseline by more than `--tolerance`.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from facecast_io.api import FacecastAPI, make_client
+from facecast_io.cassette import REDACTED, ReplayDispatcher
+from facecast_io.entities import Stream
+from facecast_io.testing import FAKE_BASE_URL
+
+CASSETTES = Path(__file__).parent.parent / "tests" / "cassettes"
+BASELINE = Path(__file__).with_suffix(".json")
+
+STREAMS = [
+    Stream(
+        name=f"Stream {i}",
+        server_url=f"rtmp://live{i}.example.com/app",
+        shared_key=f"stream-key-{i}",
+    )
+    for i in range(3)
+]
+
+FLOWS = {
+    "create_device_and_outputs": lambda api: api.create_device_and_outputs(
+        "Flow device", STREAMS
+    ),
+    "devices_update": lambda api: api.devices.update(),
+}
+
+
+def run(name: str, flow) -> float:
+    dispatcher = ReplayDispatcher.load(CASSETTES / f"{name}.json")
+    client = make_client(FAKE_BASE_URL, dispatch=dispatcher)
+    api = FacecastAPI(REDACTED, REDACTED, client=client)
+    started = time.perf_counter()
+    flow(api)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--update", action="store_true", help="accept new times")
+    args = parser.parse_args()
+
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    results, failed = {}, False
+    print(f"{'flow':<28} {'seconds':>8} {'baseline':>9}")
+    for name, flow in FLOWS.items():
+        seconds = results[name] = round(run(name, flow), 3)
+        expected = baseline.get(name)
+        print(f"{name:<28} {seconds:>8.3f} {expected or 0:>9.3f}")
+        if expected and seconds > expected * (1 + args.tolerance):
+            failed = True
+    if args.update:
+        BASELINE.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    sys.exit(1 if failed and not args.update else 0)
+
+
+if __name__ == "__main__":
+    main()
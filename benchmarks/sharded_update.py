@@ -0,0 +1,72 @@
+"""Devices updated and polled per second by ShardedFleet with a growing process pool.
+
+    $ poetry run python benchmarks/sharded_update.py --devices 2000 --processes 1 2 4 8
+
+Worker processes are forked with a copy of the in-memory fake service, so
+only CPU (parsing and validation) limits the throughput. Polling reads the
+status and outputs of every device, as `HistoryRecorder` does each cycle.
+Speedup needs as many free cores as processes (see `nproc`).
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from typing import Tuple
+
+from facecast_io.api import FacecastAPI, make_client
+from facecast_io.sharding import ShardedFleet
+from facecast_io.testing import FakeFacecast, FAKE_BASE_URL
+
+
+def run(processes: int, devices: int, threads: int) -> Tuple[float, float]:
+    service = FakeFacecast()
+    for i in range(devices):
+        service.add_device(f"DEV{i}", outputs=2)
+    api = FacecastAPI(client=make_client(FAKE_BASE_URL, dispatch=service))
+    api.server_connector.do_auth(service.username, service.password)
+
+    fleet = ShardedFleet(
+        api.devices,
+        processes=processes,
+        threads=threads,
+        client_factory=lambda url: make_client(url, dispatch=service),
+        mp_context=multiprocessing.get_context("fork"),
+    )
+    with fleet:
+        # the first round selects servers and starts the workers
+        fleet.update()
+        started = time.perf_counter()
+        updates = fleet.update()
+        updated = time.perf_counter() - started
+        started = time.perf_counter()
+        reads = fleet.read([d.rtmp_id for d in api.devices])
+        polled = time.perf_counter() - started
+    assert all(u.ok for u in updates)
+    assert all(r.error is None for r in reads.values())
+    return devices / updated, devices / polled
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{os.cpu_count()} cores")
+    print(
+        f"{'processes':>9} {'updates/s':>10} {'speedup':>8}"
+        f" {'polls/s':>10} {'speedup':>8}"
+    )
+    for processes in args.processes:
+        updates, polls = run(processes, args.devices, args.threads)
+        baseline = baseline or (updates, polls)
+        print(
+            f"{processes:>9} {updates:>10.1f} {updates / baseline[0]:>7.1f}x"
+            f" {polls:>10.1f} {polls / baseline[1]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
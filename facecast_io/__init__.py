@@ -1,3 +1,30 @@
+from typing import TYPE_CHECKING
+
 __version__ = "0.5.1"
-from .server_connector import ServerConnector, BASE_HEADERS, BASE_URL  # noqa
-from .api import FacecastAPI  # noqa
+
+if TYPE_CHECKING:
+    from .server_connector import ServerConnector, BASE_HEADERS, BASE_URL  # noqa
+    from .api import FacecastAPI  # noqa
+
+# httpx, pydantic and pyquery take most of the import time, the public names
+# are resolved on first access so that `import facecast_io.<module>` stays cheap
+_LAZY_ATTRIBUTES = {
+    "ServerConnector": "server_connector",
+    "BASE_HEADERS": "server_connector",
+    "BASE_URL": "server_connector",
+    "FacecastAPI": "api",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
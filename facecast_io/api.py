@@ -14,6 +14,13 @@ from .server_connector import (
     POSSIBLE_BASE_URLS,
 )
 from .errors import DeviceNotFound
+from .tracing import traced
+
+
+# One client (and so one connection pool) is shared by every thread working
+# through the same ServerConnector. httpx maps hard_limit onto urllib3 as
+# sqrt(hard_limit) connections per host, i.e. 32 concurrent requests here
+POOL_LIMITS = httpx.PoolLimits(soft_limit=32, hard_limit=1024)
 
 
 def find_available_server():
@@ -24,14 +31,26 @@ def find_available_server():
                 return url
 
 
+def make_client(base_url: str = None, **kwargs) -> httpx.Client:
+    kwargs.setdefault("pool_limits", POOL_LIMITS)
+    if "dispatch" not in kwargs:
+        kwargs.setdefault("proxies", os.getenv("HTTP_PROXY"))
+    return httpx.Client(
+        base_url=base_url or find_available_server(),
+        verify=False,
+        headers=BASE_HEADERS,
+        **kwargs,
+    )
+
+
 class FacecastAPI:
-    def __init__(self, username: str = None, password: str = None):
-        self.client = httpx.Client(
-            proxies=os.getenv("HTTP_PROXY"),
-            base_url=find_available_server(),
-            verify=False,
-            headers=BASE_HEADERS,
-        )
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        client: httpx.Client = None,
+    ):
+        self.client = client or make_client()
         self.server_connector = ServerConnector(self.client)
         self.devices: Devices = Devices(self.server_connector)
         if username and password:
@@ -43,6 +62,7 @@ class FacecastAPI:
     def is_authorized(self):
         return self.server_connector.is_authorized
 
+    @traced()
     def do_auth(self, username, password):
         self.server_connector.do_auth(username, password)
         if self.is_authorized:
@@ -53,18 +73,22 @@ class FacecastAPI:
             self.devices.update()
         return self.devices
 
+    @traced()
     def delete_device(self, name):
         self.devices.delete_device(name)
 
+    @traced()
     def create_new_device(self, name: str) -> Device:
         return self.devices.create_device(name)
 
+    @traced()
     def get_or_create_device(self, name: str) -> Device:
         try:
             return self.devices[name]
         except DeviceNotFound:
             return self.devices.create_device(name)
 
+    @traced()
     def create_device_and_outputs(self, name, streams_data: List[Stream]) -> Device:
         device = self.get_or_create_device(name)
         device.delete_outputs()
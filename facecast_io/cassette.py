@@ -0,0 +1,252 @@
+"""Record the HTTP traffic of `ServerConnector` and replay it offline.
+
+    recorder = RecordingDispatcher(client.dispatch)
+    client = make_client(dispatch=recorder)
+    ...
+    recorder.cassette.save("flow.json")
+
+    client = make_client(FAKE_BASE_URL, dispatch=ReplayDispatcher.load("flow.json"))
+
+Credentials, signatures and shared keys never reach the cassette file.
+"""
+import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import parse_qsl
+
+from httpx import Request, Response
+
+__all__ = [
+    "Cassette",
+    "CassetteMismatch",
+    "RecordingDispatcher",
+    "ReplayDispatcher",
+    "REDACTED",
+]
+
+REDACTED = "REDACTED"
+
+# form fields and json keys which are replaced by REDACTED
+SECRET_FIELDS = {
+    "login",
+    "pass",
+    "signature",
+    "sign",
+    "form_sign",
+    "sharedkey",
+    "shared_key",
+}
+SECRET_PATTERNS = [
+    re.compile(r"(signature: ')(\w+)(')"),
+    re.compile(r"(form_sign: ')(\w+)(')"),
+]
+# the rest is session state (cookies) or noise
+KEPT_HEADERS = {"content-type", "location"}
+
+Key = Tuple[str, str, Tuple[Tuple[str, str], ...], Tuple[Tuple[str, str], ...]]
+
+
+class CassetteMismatch(LookupError):
+    # not a FacecastAPIError, so retries of the connector don't hide it
+    ...
+
+
+def _is_secret(field: str) -> bool:
+    return field in SECRET_FIELDS or field.endswith("[sign]")
+
+
+def _form(request: Request) -> Dict[str, str]:
+    return dict(parse_qsl(request.read().decode(), keep_blank_values=True))
+
+
+def _key(method: str, path: str, query: dict, form: dict) -> Key:
+    return (
+        method,
+        path,
+        tuple(sorted(query.items())),
+        tuple(sorted((k, v) for k, v in form.items() if not _is_secret(k))),
+    )
+
+
+class Cassette:
+    def __init__(self, interactions: List[dict] = None):
+        self.interactions: List[dict] = interactions or []
+        self._secrets: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.interactions)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Cassette":
+        with open(path) as f:
+            return cls(json.load(f)["interactions"])
+
+    def save(self, path: Union[str, Path]):
+        with self._lock:
+            # secrets learned late may have passed through earlier interactions
+            for interaction in self.interactions:
+                interaction["body"] = self._redact_text(interaction["body"])
+                interaction["form"] = {
+                    k: self._redact_text(v) for k, v in interaction["form"].items()
+                }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {"version": 1, "interactions": self.interactions}, f, indent=1
+            )
+
+    def record(self, request: Request, response: Response, elapsed: float):
+        query = dict(parse_qsl(request.url.query, keep_blank_values=True))
+        form = _form(request)
+        with self._lock:
+            self._secrets.update(v for k, v in form.items() if _is_secret(k) and v)
+            body = self._redact_body(response.text)
+            self.interactions.append(
+                {
+                    "method": request.method,
+                    "path": request.url.path,
+                    "query": query,
+                    "form": {
+                        k: REDACTED if _is_secret(k) else self._redact_text(v)
+                        for k, v in form.items()
+                    },
+                    "status": response.status_code,
+                    "headers": [
+                        [k, v]
+                        for k, v in response.headers.items()
+                        if k.lower() in KEPT_HEADERS
+                    ],
+                    "body": body,
+                    "elapsed": round(elapsed, 4),
+                }
+            )
+
+    def _redact_body(self, text: str) -> str:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, (dict, list)):
+            text = json.dumps(self._redact_json(data))
+        for pattern in SECRET_PATTERNS:
+            text = pattern.sub(lambda m: m.group(1) + REDACTED + m.group(3), text)
+        return self._redact_text(text)
+
+    def _redact_json(self, data):
+        if isinstance(data, dict):
+            redacted = {}
+            for k, v in data.items():
+                if _is_secret(k) and isinstance(v, str):
+                    self._secrets.add(v)
+                    redacted[k] = REDACTED
+                else:
+                    redacted[k] = self._redact_json(v)
+            return redacted
+        if isinstance(data, list):
+            return [self._redact_json(v) for v in data]
+        return data
+
+    def _redact_text(self, text: str) -> str:
+        # shared keys also show up as stream names and inside of urls
+        for secret in self._secrets:
+            if len(secret) > 3:
+                text = text.replace(secret, REDACTED)
+        return text
+
+
+class RecordingDispatcher:
+    """Duck-typed httpx dispatcher which writes down everything it passes on"""
+
+    def __init__(self, dispatcher, cassette: Cassette = None):
+        self.dispatcher = dispatcher
+        self.cassette = cassette if cassette is not None else Cassette()
+
+    @property
+    def request_count(self) -> int:
+        return len(self.cassette)
+
+    def close(self):
+        self.dispatcher.close()
+
+    def send(self, request: Request, timeout=None) -> Response:
+        started = time.perf_counter()
+        response = self.dispatcher.send(request, timeout=timeout)
+        response.read()
+        self.cassette.record(request, response, time.perf_counter() - started)
+        return response
+
+
+class ReplayDispatcher:
+    """Serves recorded responses to matching requests.
+
+    Requests are matched by method, path, query and form without secrets.
+    Repeated requests get the recorded answers in order, the last one is
+    served again when the recording runs out. `latency` is either
+    "recorded" or seconds per request, `scale` multiplies it.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        *,
+        latency: Union[str, float] = "recorded",
+        scale: float = 1.0,
+    ):
+        self.cassette = cassette
+        self.latency = latency
+        self.scale = scale
+        self.request_count = 0
+        self._answers: Dict[Key, Deque[dict]] = defaultdict(deque)
+        self._last: Dict[Key, dict] = {}
+        self._lock = threading.Lock()
+        for interaction in cassette.interactions:
+            key = _key(
+                interaction["method"],
+                interaction["path"],
+                interaction["query"],
+                interaction["form"],
+            )
+            self._answers[key].append(interaction)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], **kwargs) -> "ReplayDispatcher":
+        return cls(Cassette.load(path), **kwargs)
+
+    def close(self):
+        pass
+
+    def _delay(self, interaction: dict) -> float:
+        if self.latency == "recorded":
+            return interaction["elapsed"] * self.scale
+        return float(self.latency) * self.scale
+
+    def _match(self, request: Request) -> Optional[dict]:
+        query = dict(parse_qsl(request.url.query, keep_blank_values=True))
+        key = _key(request.method, request.url.path, query, _form(request))
+        with self._lock:
+            self.request_count += 1
+            answers = self._answers.get(key)
+            if answers:
+                self._last[key] = answers.popleft()
+            return self._last.get(key)
+
+    def send(self, request: Request, timeout=None) -> Response:
+        interaction = self._match(request)
+        if interaction is None:
+            raise CassetteMismatch(
+                f"No recorded answer for {request.method} {request.url}"
+            )
+        delay = self._delay(interaction)
+        if delay:
+            time.sleep(delay)
+        return Response(
+            interaction["status"],
+            request=request,
+            headers=[tuple(h) for h in interaction["headers"]],
+            content=interaction["body"].encode(),
+        )
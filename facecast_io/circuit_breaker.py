@@ -0,0 +1,182 @@
+"""Per base url and endpoint circuit breakers of `ServerConnector`.
+
+After `failure_threshold` consecutive failures (transport errors and 5xx
+answers) the circuit opens and requests to that endpoint are rejected with
+`CircuitOpenError` right away, without the usual retries and their sleeps.
+After `reset_timeout` one probe request is let through (half-open), its
+outcome closes the circuit or opens it again.
+"""
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from retry.api import retry_call  # type: ignore
+
+from .errors import CircuitOpenError
+from .logger_setup import logger
+
+__all__ = ["CircuitBreaker", "CircuitBreakers", "CLOSED", "OPEN", "HALF_OPEN", "retry"]
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.times_opened = 0
+        self.on_state_change: List[Callable[["CircuitBreaker", str], None]] = []
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"CircuitBreaker <{self.name} - {self.state}>"
+
+    @property
+    def retry_after(self) -> float:
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def _set_state(self, state: str) -> str:
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(
+                "Circuit for %s opened after %s failures", self.name, self.failures
+            )
+        elif state == CLOSED:
+            logger.info("Circuit for %s closed", self.name)
+        return previous
+
+    def _notify(self, previous: Optional[str]):
+        # called without the lock, callbacks may use the breaker
+        if previous is None:
+            return
+        for callback in list(self.on_state_change):
+            callback(self, previous)
+
+    def before_call(self):
+        """Raises `CircuitOpenError` unless the request may go out"""
+        previous = None
+        try:
+            with self._lock:
+                if self.state == OPEN and not self.retry_after:
+                    previous = self._set_state(HALF_OPEN)
+                if self.state == HALF_OPEN and not self._probing:
+                    self._probing = True
+                    return
+                if self.state != CLOSED:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.retry_after)
+        finally:
+            self._notify(previous)
+
+    def end_call(self):
+        """Frees the half-open probe, whatever the call ended with"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        previous = None
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                previous = self._set_state(CLOSED)
+        self._notify(previous)
+
+    def record_failure(self):
+        previous = None
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self._probing = False
+                previous = self._set_state(OPEN)
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                previous = self._set_state(OPEN)
+        self._notify(previous)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "retry_after": self.retry_after,
+        }
+
+
+class CircuitBreakers:
+    """Lazily created breakers, one per (base url, endpoint)"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change: List[Callable[[CircuitBreaker, str], None]] = []
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return iter(list(self._breakers.values()))
+
+    def get(self, base_url: str, endpoint: str) -> CircuitBreaker:
+        key = (base_url, endpoint.split("?")[0])
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        f"{base_url.rstrip('/')}/{key[1]}",
+                        self.failure_threshold,
+                        self.reset_timeout,
+                    )
+                    # the list is shared, so callbacks added later apply too
+                    breaker.on_state_change = self.on_state_change
+                    self._breakers[key] = breaker
+        return breaker
+
+    def stats(self) -> Dict[str, dict]:
+        return {b.name: b.stats() for b in self}
+
+
+class _Rejected(Exception):
+    # carries CircuitOpenError through retry_call, which would retry it otherwise
+    def __init__(self, error: CircuitOpenError):
+        self.error = error
+
+
+def retry(exceptions, **params):
+    """`retry.retry` which gives up at once when a circuit is open"""
+
+    def decorator(fn):
+        def attempt(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except CircuitOpenError as e:
+                raise _Rejected(e)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return retry_call(
+                    attempt, fargs=args, fkwargs=kwargs, exceptions=exceptions, **params
+                )
+            except _Rejected as e:
+                raise e.error from None
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,885 @@
+import fileinput
+import os
+from functools import lru_cache
+from getpass import getpass
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+import click
+import typer
+from pydantic import BaseModel, BaseSettings
+
+from facecast_io.daemon import SOCKET_PATH
+
+if TYPE_CHECKING:
+    from facecast_io import FacecastAPI
+    from facecast_io.sharding import ShardedFleet
+
+# Modules behind the commands (httpx, pyquery, tld, email-validator, ...) are
+# imported inside of them, so `--help` and forwarding to the daemon stay fast.
+
+
+class Stream(BaseModel):
+    channel_name: str
+    server_url: str
+    stream_key: str
+    post_urls: List[str]
+
+    def __str__(self):
+        return f"{short_output(self.server_url)} - {self.channel_name}"
+
+
+class ChannelStream(BaseModel):
+    __root__: List[Stream]
+
+    def __iter__(self) -> List[Stream]:
+        yield from self.__root__
+
+
+class Config(BaseSettings):
+    facecast_username: str
+    facecast_password: str
+
+
+def bctext(text):
+    return typer.style(text, fg=typer.colors.BRIGHT_CYAN, bold=True)
+
+
+def rtext(text):
+    return typer.style(text, fg=typer.colors.RED, bold=True)
+
+
+def btext(text):
+    return typer.style(text, fg=typer.colors.BLUE, bold=True)
+
+
+def gtext(text):
+    return typer.style(text, fg=typer.colors.GREEN, bold=True)
+
+
+def short_output(url) -> str:
+    pattern = {
+        "facebook": "FB",
+        "vk": "VK",
+        "youtube": "YT",
+        "ok": "OK",
+    }
+    from tld import get_tld
+    from tld.exceptions import TldBadUrl
+
+    try:
+        domain = get_tld(url, as_object=True).domain
+    except TldBadUrl:
+        return ""
+    return pattern.get(domain, "")
+
+
+def get_device_outputs(device):
+    live_txt = typer.style("Live", fg=typer.colors.GREEN, bold=True)
+    offline_txt = typer.style("Offline", fg=typer.colors.RED, bold=True)
+    result = ""
+    for i, o in enumerate(device.outputs):
+        out = o.output
+        conn_text = offline_txt
+        if out.enabled:
+            if out.cloud:
+                conn_text = live_txt
+            else:
+                conn_text = rtext("Connection issues. Check correctness of stream url")
+        result += f"\n\t\t{i}. {short_output(out.server_url)} {typer.style(out.title, bold=True)} - {conn_text}"
+    return result if result else "No outputs"
+
+
+def display_device_status(device):
+    name_txt = bctext(device.name)
+    live_txt = typer.style("Live", fg=typer.colors.GREEN, bold=True)
+    offline_txt = typer.style("Offline", fg=typer.colors.RED, bold=True)
+    outputs_text = get_device_outputs(device)
+    text = (
+        f"Device: {name_txt}"
+        f"\n\tInput signal status: {live_txt if device.is_online else offline_txt}"
+        f"\n\tOutput status: {outputs_text}"
+    )
+    typer.echo(text)
+
+
+def display_device_input(device):
+    text = (
+        f"Device: {bctext(device.name)}"
+        f"\n\tMain: {btext(device.main_server_url)}"
+        f"\n\tBackup: {btext(device.backup_server_url)}"
+        f"\n\tShared key: {rtext(device.shared_key)}"
+    )
+    typer.echo(text)
+
+
+app = typer.Typer()
+devices_app = typer.Typer()
+app.add_typer(devices_app, name="devices")
+template_app = typer.Typer()
+app.add_typer(template_app, name="template")
+
+
+@app.callback()
+def callback(
+    ctx: typer.Context,
+    trace: Optional[Path] = typer.Option(
+        None, help="Save Chrome trace of the command and print its span tree"
+    ),
+    processes: int = typer.Option(
+        1,
+        help="Update and poll devices in this many processes, for very large "
+        "accounts on machines with as many cores",
+    ),
+):
+    # per invocation, the daemon runs commands concurrently
+    ctx.ensure_object(dict)["processes"] = processes
+    if trace is None:
+        return
+    from contextlib import ExitStack
+
+    from facecast_io.tracing import tracing
+
+    stack = ExitStack()
+    command_trace = stack.enter_context(tracing(ctx.invoked_subcommand or "facecast"))
+
+    def finish():
+        stack.close()
+        command_trace.save_chrome(trace)
+        typer.echo(command_trace.format_tree(), err=True)
+        typer.echo(f"Trace is saved to {trace}", err=True)
+
+    ctx.call_on_close(finish)
+
+
+_api: Optional["FacecastAPI"] = None
+
+
+def _options() -> dict:
+    ctx = click.get_current_context(silent=True)
+    return (ctx.obj if ctx is not None else None) or {}
+
+
+def _processes() -> int:
+    return _options().get("processes", 1)
+
+
+def get_api() -> "FacecastAPI":
+    from facecast_io import FacecastAPI
+
+    api = _options().get("api")
+    if api is not None:
+        # the daemon passes its warm API with every command
+        return api
+    global _api
+    if _api is None:
+        _api = FacecastAPI()
+    return _api
+
+
+@lru_cache()
+def login_model():
+    from pydantic import EmailStr
+
+    class FacecastLogin(BaseModel):
+        username: EmailStr
+        password: str
+
+    return FacecastLogin
+
+
+def _login(force=False, update=True) -> "FacecastAPI":
+    FacecastLogin = login_model()
+    api = get_api()
+    if api.is_authorized and not force:
+        return api
+    config_path = Path().home() / ".facecast.json"
+    if config_path.exists() and not force:
+        config = FacecastLogin.parse_file(config_path)
+    else:
+        config = FacecastLogin(
+            username=input("Username: "), password=getpass("Password: ")
+        )
+        with open(config_path, "w") as f:
+            f.write(config.json())
+
+    if update and _processes() > 1:
+        from facecast_io.sharding import ShardedFleet
+
+        api.server_connector.do_auth(config.username, config.password)
+        with ShardedFleet(api.devices, processes=_processes()) as fleet:
+            fleet.update()
+    elif update:
+        api.do_auth(config.username, config.password)
+    else:
+        # commands which fetch only what they need skip the full devices update
+        api.server_connector.do_auth(config.username, config.password)
+    return api
+
+
+@app.command()
+def login(force: bool = typer.Option(False)):
+    api = _login(force)
+    typer.echo(gtext(f"Authorized: {api.is_authorized}"))
+
+
+@app.command()
+def logout():
+    config_path = Path().home() / ".facecast.json"
+    if config_path.exists():
+        os.remove(config_path)
+    typer.echo("Logout successfully")
+
+
+def _preflight(targets) -> bool:
+    from facecast_io.preflight import PreflightChecker
+
+    checker = PreflightChecker()
+    try:
+        failed = [c for c in checker.check_targets(targets) if not c.ok]
+    finally:
+        checker.close()
+    for check in failed:
+        typer.echo(rtext(f"Unreachable {check.url} ({check.stage}): {check.error}"))
+    return not failed
+
+
+def _select_devices(api: "FacecastAPI", names: List[str], all_devices: bool):
+    """Devices by names and globs (`EN*`), exits when a name matches nothing"""
+    from fnmatch import fnmatchcase
+
+    if not len(api.devices):
+        # the daemon keeps them, a fresh process lists them once
+        api.devices._add_new_devices()
+    if all_devices:
+        return [d for d in api.devices]
+    selected = []
+    # "EN DE" in one argument as well
+    for name in (n for arg in names for n in arg.split()):
+        matched = [d for d in api.devices if fnmatchcase(d.name, name)]
+        if not matched:
+            typer.echo(rtext(f"Device not found: {name}"))
+            raise typer.Exit(1)
+        selected.extend(d for d in matched if d not in selected)
+    return selected
+
+
+def _device_result(device, action: str) -> dict:
+    result = {"device": device.name, "rtmp_id": device.rtmp_id, "action": action}
+    if device._status is not None:
+        result["online"] = device.is_online
+        if action == "input":
+            result.update(device.input_params)
+    result["outputs"] = [
+        {
+            "id": o.output.id,
+            "title": o.output.title,
+            "server_url": o.output.server_url,
+            "enabled": o.output.enabled,
+            "live": o.output.enabled and o.output.cloud,
+        }
+        for o in device.outputs
+    ]
+    return result
+
+
+def _summary(result: dict) -> str:
+    outputs = result["outputs"]
+    text = f"{sum(o['live'] for o in outputs)}/{len(outputs)} outputs live"
+    if "online" in result:
+        text = f"input {'live' if result['online'] else 'offline'}, {text}"
+    return text
+
+
+def _run_devices(devices, action: str, fn, *, workers: int, json_output: bool):
+    """Runs `fn(device)` concurrently, prints a progress table (or JSON lines)
+    with a result per device and returns the results"""
+    import contextvars
+    import json
+    import time
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from facecast_io.progress import ProgressTable
+
+    table = None if json_output else ProgressTable([d.name for d in devices])
+    results = []
+
+    def run(device) -> dict:
+        started = time.perf_counter()
+        if table is not None:
+            table.update(device.name, f"{action}...")
+        try:
+            fn(device)
+        except Exception as e:
+            result = _device_result(device, action)
+            result.update(ok=False, error=str(e) or repr(e))
+        else:
+            result = _device_result(device, action)
+            result.update(ok=True, error=None)
+        result["elapsed"] = round(time.perf_counter() - started, 3)
+        return result
+
+    with ThreadPoolExecutor(max(1, min(workers, len(devices)))) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, run, d) for d in devices
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if json_output:
+                typer.echo(json.dumps(result))
+            elif result["ok"]:
+                table.update(result["device"], "done", _summary(result), ok=True)
+            else:
+                table.update(result["device"], "failed", result["error"], ok=False)
+    return results
+
+
+@app.command()
+def device(
+    names: Optional[List[str]] = typer.Argument(None, help="Device names or globs"),
+    all_devices: bool = typer.Option(False, "--all", help="Every device"),
+    start: bool = typer.Option(False),
+    stop: bool = typer.Option(False),
+    input: bool = typer.Option(False),
+    preflight: bool = typer.Option(True, help="Check output targets before start"),
+    workers: int = typer.Option(16, help="Devices handled concurrently"),
+    json_output: bool = typer.Option(False, "--json", help="JSON line per device"),
+):
+    if not names and not all_devices:
+        typer.echo(rtext("No devices, give names or --all"))
+        raise typer.Exit(1)
+    api = _login(update=False)
+    devices = _select_devices(api, names or [], all_devices)
+
+    checker = None
+    if start and preflight:
+        from facecast_io.preflight import PreflightChecker
+
+        # shared, every host is probed once for all devices
+        checker = PreflightChecker()
+
+    def run(device):
+        if device._status is None:
+            device.update()
+        if start:
+            if checker is not None:
+                targets = [(o.output.server_url, None) for o in device.outputs]
+                checker.ensure(targets)
+            device.start_outputs()
+        elif stop:
+            device.stop_outputs()
+
+    action = "start" if start else "stop" if stop else "input" if input else "status"
+    try:
+        results = _run_devices(
+            devices, action, run, workers=workers, json_output=json_output
+        )
+    finally:
+        if checker is not None:
+            checker.close()
+    if not json_output and len(devices) == 1 and results[0]["ok"]:
+        if input:
+            display_device_input(devices[0])
+        else:
+            display_device_status(devices[0])
+    elif not json_output and input:
+        for d in devices:
+            display_device_input(d)
+    if not all(r["ok"] for r in results):
+        raise typer.Exit(1)
+
+
+@devices_app.command("list")
+def list():
+    api = _login()
+    result = ""
+    for i, device in enumerate(api.devices):
+        result += f"\t{i}. {bctext(device.name)}\n"
+    typer.echo(f"Devices: \n{result}")
+
+
+@devices_app.command("create")
+def create(name: str):
+    api = _login()
+    device = api.devices.create_device(name)
+    typer.echo(f"Device created: {bctext(device.name)} - {device.outputs}")
+    display_device_input(device)
+
+
+def _run_journal(api, journal, on_done=None, max_workers=1):
+    from facecast_io.errors import FacecastAPIError
+
+    try:
+        journal.run(api.server_connector, on_done, max_workers=max_workers)
+    except (FacecastAPIError, KeyboardInterrupt) as e:
+        typer.echo(rtext(f"Job {journal.job_id} stopped: {e!r}"))
+        typer.echo(f"Continue it with: python -m facecast_io resume {journal.job_id}")
+        raise typer.Exit(1)
+
+
+@devices_app.command("delete")
+def delete(
+    names: Optional[List[str]] = typer.Argument(None, help="Device names or globs"),
+    all_devices: bool = typer.Option(False, "--all", help="Every device"),
+    yes: bool = typer.Option(False, "--yes", help="Don't ask for confirmation"),
+    workers: int = typer.Option(16, help="Devices deleted concurrently"),
+    json_output: bool = typer.Option(False, "--json", help="JSON line per device"),
+):
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+
+    from facecast_io.journal import Journal
+    from facecast_io.progress import ProgressTable
+
+    if not names and not all_devices:
+        typer.echo(rtext("No devices, give names or --all"))
+        raise typer.Exit(1)
+    api = _login(update=False)
+    devices = _select_devices(api, names or [], all_devices)
+    if not yes:
+        listed = ", ".join(bctext(d.name) for d in devices)
+        typer.confirm(f"Are you sure to delete {listed}?", abort=True)
+
+    sc = api.server_connector
+    with ThreadPoolExecutor(max(1, min(workers, len(devices)))) as pool:
+        outputs = pool.map(lambda d: sc.get_outputs(d.rtmp_id), devices)
+        operations = []
+        for d, device_outputs in zip(devices, outputs):
+            for o in device_outputs:
+                params = {"rtmp_id": d.rtmp_id, "output_id": o.id, "name": d.name}
+                operations.append((f"{d.name}/output:{o.id}", "delete_output", params))
+            params = {"rtmp_id": d.rtmp_id, "name": d.name}
+            operations.append((f"{d.name}/device", "delete_device", params))
+    journal = Journal.create("delete", operations, names=[d.name for d in devices])
+
+    table = None if json_output else ProgressTable([d.name for d in devices])
+    by_rtmp_id = {d.rtmp_id: d for d in devices}
+
+    def report(op):
+        name = op.params["name"]
+        if op.action != "delete_device":
+            if table is not None:
+                table.update(name, "deleting...", f"output:{op.params['output_id']}")
+            return
+        with api.devices._lock:
+            api.devices._devices.remove(by_rtmp_id[op.params["rtmp_id"]])
+        if json_output:
+            typer.echo(json.dumps({"device": name, "action": "delete", "ok": True}))
+        else:
+            table.update(name, "deleted", ok=True)
+
+    try:
+        _run_journal(api, journal, report, max_workers=workers)
+    finally:
+        for op in journal.pending:
+            if op.error is None:
+                continue
+            name = op.params["name"]
+            if json_output:
+                result = {"device": name, "action": "delete", "ok": False}
+                typer.echo(json.dumps(dict(result, error=op.error)))
+            else:
+                table.update(name, "failed", op.error, ok=False)
+
+
+@devices_app.command("provision")
+def provision(
+    lang_code: str,
+    preflight: bool = typer.Option(True, help="Check output targets first"),
+):
+    text = ""
+    for line in fileinput.input("-"):
+        text += line
+    if not text:
+        typer.echo(rtext("No any input data"))
+        return
+    streams_data = ChannelStream.parse_raw(text)
+    if not streams_data:
+        typer.echo(rtext("No input data"))
+        return
+
+    # before logging in, nothing is created for unreachable targets
+    targets = [(stream.server_url, stream.stream_key) for stream in streams_data]
+    if preflight and not _preflight(targets):
+        raise typer.Exit(1)
+
+    api = _login()
+    device = api.get_or_create_device(lang_code)
+    if device.outputs:
+        typer.confirm("Are you sure you want to continue?", abort=True)
+
+    from facecast_io.journal import Journal
+
+    streams = {f"output:{i}": stream for i, stream in enumerate(streams_data)}
+    operations = [
+        (
+            op_id,
+            "create_output",
+            {
+                "rtmp_id": device.rtmp_id,
+                "title": stream.channel_name,
+                "server_url": stream.server_url,
+                "shared_key": stream.stream_key,
+            },
+        )
+        for op_id, stream in streams.items()
+    ]
+    journal = Journal.create("provision", operations, device=lang_code)
+    _run_journal(
+        api, journal, lambda op: typer.echo(gtext(f"Added {streams[op.id]}"))
+    )
+
+
+@app.command()
+def resume(
+    job: Optional[str] = typer.Argument(None, help="Job id, the latest by default"),
+    list_jobs: bool = typer.Option(False, "--list", help="Show unfinished jobs"),
+):
+    from facecast_io.journal import JOURNAL_DIR, Journal, unfinished_jobs
+
+    jobs = unfinished_jobs()
+    if list_jobs:
+        for j in jobs:
+            typer.echo(f"{bctext(j.job_id)}: {len(j.pending)} operations left")
+        return
+    if job is not None:
+        journal = Journal(JOURNAL_DIR / f"{job}.jsonl")
+        if not journal.operations:
+            typer.echo(rtext(f"Job {job} not found"))
+            raise typer.Exit(1)
+    elif jobs:
+        journal = jobs[-1]
+    else:
+        typer.echo("No unfinished jobs")
+        return
+    api = _login(update=False)
+    typer.echo(f"Resuming {bctext(journal.job_id)}: {len(journal.pending)} left")
+    _run_journal(api, journal, lambda op: typer.echo(gtext(f"Done {op.id}")))
+    typer.echo(gtext(f"Job {journal.job_id} finished"))
+
+
+def _template_path(name: str) -> Path:
+    from facecast_io.templates import TEMPLATE_DIR
+
+    return TEMPLATE_DIR / f"{name}.json"
+
+
+@template_app.command("copy")
+def template_copy(device_name: str, name: str):
+    from facecast_io.templates import Template
+
+    api = _login()
+    template = Template.from_outputs(name, api.devices[device_name].outputs)
+    template.save(_template_path(name))
+    typer.echo(f"Template {bctext(name)} is saved to {_template_path(name)}")
+    typer.echo(f"Parameters: {', '.join(template.fields)}")
+
+
+@template_app.command("apply")
+def template_apply(
+    name: str,
+    params_file: str = typer.Argument(
+        "-", help='JSON {"DEVICE": {"param": "value"}}, stdin by default'
+    ),
+    replace: bool = typer.Option(False, help="Delete existing outputs first"),
+    workers: int = typer.Option(16, help="Outputs created concurrently"),
+    preflight: bool = typer.Option(True, help="Check output targets first"),
+):
+    import json
+
+    from facecast_io.errors import DeviceNotFound, TemplateError
+    from facecast_io.templates import Template, plan_fan_out, run_fan_out
+
+    template = Template.load(_template_path(name))
+    params = json.loads("".join(fileinput.input(params_file)))
+    try:
+        rendered = [template.render(n, p) for n, p in params.items()]
+    except TemplateError as e:
+        typer.echo(rtext(str(e)))
+        raise typer.Exit(1)
+    targets = [(s.server_url, s.shared_key) for streams in rendered for s in streams]
+    if preflight and not _preflight(targets):
+        raise typer.Exit(1)
+
+    api = _login(update=False)
+    try:
+        journal = plan_fan_out(
+            api.server_connector, template, params, replace=replace, max_workers=workers
+        )
+    except DeviceNotFound as e:
+        typer.echo(rtext(f"Device not found: {e}"))
+        raise typer.Exit(1)
+    results = run_fan_out(api.server_connector, journal, max_workers=workers)
+    for result in results:
+        if result.ok:
+            typer.echo(f"{bctext(result.device_name)}: {len(result.outputs)} outputs")
+        else:
+            errors = ", ".join(f"{k} {e}" for k, e in result.errors.items())
+            typer.echo(f"{bctext(result.device_name)}: {rtext(errors)}")
+    if journal.pending:
+        typer.echo(f"Continue it with: python -m facecast_io resume {journal.job_id}")
+    if not all(r.ok for r in results):
+        raise typer.Exit(1)
+
+
+def _fleet(api: "FacecastAPI") -> Optional["ShardedFleet"]:
+    """Worker processes reading for pollers, with the global --processes"""
+    if _processes() <= 1:
+        return None
+    from facecast_io.sharding import ShardedFleet
+
+    return ShardedFleet(api.devices, processes=_processes())
+
+
+@app.command()
+def supervise(
+    interval: float = typer.Option(5.0, help="Seconds between polls"),
+    workers: int = typer.Option(16, help="Devices polled concurrently"),
+    history: bool = typer.Option(False, help="Record output states for `report`"),
+):
+    from facecast_io.history import HistoryStore
+    from facecast_io.supervisor import OutputSupervisor
+
+    api = _login()
+    # a few missed polls make a gap of unknown states
+    store = HistoryStore(max_gap=3 * interval) if history else None
+    fleet = _fleet(api)
+    supervisor = OutputSupervisor(
+        api.devices,
+        interval=interval,
+        max_workers=workers,
+        history=store,
+        fleet=fleet,
+    )
+    typer.echo(f"Supervising outputs of {len(api.devices)} devices, Ctrl-C to stop")
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        supervisor.stop()
+    finally:
+        if store is not None:
+            store.close()
+        if fleet is not None:
+            fleet.close()
+    stats = supervisor.stats()
+    typer.echo(
+        f"Recovered: {gtext(stats['recovered'])}, still failing: {rtext(stats['open'])}"
+        f", mean time to recovery: {stats['mean_time_to_recovery']:.1f}s"
+    )
+
+
+@app.command()
+def record(
+    interval: float = typer.Option(5.0, help="Seconds between polls"),
+    workers: int = typer.Option(16, help="Devices polled concurrently"),
+    db: Optional[Path] = typer.Option(None, help="~/.facecast/history.db by default"),
+):
+    from facecast_io.history import HistoryRecorder, HistoryStore
+
+    api = _login()
+    fleet = _fleet(api)
+    with HistoryStore(db, max_gap=3 * interval) as store:
+        recorder = HistoryRecorder(
+            api.devices, store, interval=interval, max_workers=workers, fleet=fleet
+        )
+        typer.echo(f"Recording {len(api.devices)} devices to {store.path}")
+        try:
+            recorder.run()
+        except KeyboardInterrupt:
+            recorder.stop()
+        finally:
+            if fleet is not None:
+                fleet.close()
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+@app.command()
+def report(
+    names: Optional[List[str]] = typer.Argument(None, help="Devices, all by default"),
+    since: str = typer.Option("-86400", help="-SECONDS, HH:MM[:SS] or ISO datetime"),
+    until: str = typer.Option("+0", help="-SECONDS, HH:MM[:SS] or ISO datetime"),
+    outages: bool = typer.Option(False, help="List every outage"),
+    db: Optional[Path] = typer.Option(None, help="~/.facecast/history.db by default"),
+):
+    import time
+
+    from facecast_io.golive import parse_time
+    from facecast_io.history import INPUT, HistoryStore
+
+    start, end = parse_time(since), parse_time(until)
+    typer.echo(f"{time.ctime(start)} - {time.ctime(end)}")
+    with HistoryStore(db) as store:
+        reports = store.report(start, end, names or None)
+    for r in reports:
+        title = "input" if r.output_id == INPUT else r.title
+        uptime = "no data" if r.uptime is None else f"{r.uptime * 100:.2f}%"
+        down = sum(o.duration for o in r.outages)
+        line = (
+            f"{bctext(r.device_name)} {title}: up {uptime}"
+            f", {len(r.outages)} outages, down {_duration(down)}"
+        )
+        if r.bitrate is not None:
+            line += (
+                f", {r.bitrate.min_kbps}/{r.bitrate.mean_kbps:.0f}"
+                f"/{r.bitrate.max_kbps} kbps min/mean/max"
+            )
+        typer.echo(rtext(line) if r.outages else line)
+        if outages:
+            for o in r.outages:
+                typer.echo(
+                    f"\t{time.ctime(o.start)} - {time.ctime(o.end)}"
+                    f" ({_duration(o.duration)})"
+                )
+
+
+@app.command()
+def export(
+    names: Optional[List[str]] = typer.Argument(None, help="Devices, all by default"),
+    format: str = typer.Option("json", help="json, csv, ffmpeg or obs"),
+    output: Optional[Path] = typer.Option(
+        None, help="File (directory of profiles for obs), stdout by default"
+    ),
+    workers: int = typer.Option(32, help="Devices fetched concurrently"),
+):
+    import sys
+
+    from facecast_io.errors import DeviceNotFound
+    from facecast_io.export import FORMATS, export_input_params, save_obs_profiles
+
+    if format not in FORMATS:
+        typer.echo(rtext(f"Unknown format {format}"))
+        raise typer.Exit(1)
+    api = _login(update=False)
+    errors: dict = {}
+    try:
+        params = export_input_params(
+            api.server_connector,
+            api.devices.server_catalog,
+            names=names or None,
+            max_workers=workers,
+            errors=errors,
+        )
+    except DeviceNotFound as e:
+        typer.echo(rtext(f"Device not found: {e}"))
+        raise typer.Exit(1)
+    if output is None:
+        FORMATS[format](params, sys.stdout)
+    elif format == "obs":
+        count = save_obs_profiles(params, output)
+        typer.echo(f"Saved {count} OBS profiles to {output}", err=True)
+    else:
+        with open(output, "w", newline="") as f:
+            FORMATS[format](params, f)
+    if errors:
+        typer.echo(rtext(f"Not exported: {', '.join(sorted(errors))}"), err=True)
+        raise typer.Exit(1)
+
+
+@app.command()
+def golive(
+    at: str = typer.Argument(..., help="+SECONDS, HH:MM[:SS] or ISO datetime"),
+    names: Optional[List[str]] = typer.Argument(None, help="Devices, all by default"),
+    warmup: float = typer.Option(30.0, help="Seconds to prepare before go-live"),
+    workers: int = typer.Option(64, help="Outputs started concurrently"),
+):
+    import time
+
+    from facecast_io.golive import GoLive, parse_time
+
+    api = _login()
+    go_live = GoLive(
+        api.devices,
+        parse_time(at),
+        names=names or None,
+        warmup=warmup,
+        max_workers=workers,
+    )
+    typer.echo(f"Going live at {time.ctime(go_live.at)}, Ctrl-C to cancel")
+    report = go_live.run()
+    for start in sorted(report.starts, key=lambda s: s.sent_at):
+        status = gtext("started") if start.ok else rtext(start.error)
+        typer.echo(
+            f"{bctext(start.device_name)} {start.title}: {status}"
+            f", skew {start.skew(report.at) * 1000:+.1f}ms"
+        )
+    typer.echo(
+        f"Max skew: {report.max_skew * 1000:.1f}ms"
+        f", spread: {report.spread * 1000:.1f}ms, failed: {len(report.failed)}"
+    )
+    if report.failed:
+        raise typer.Exit(1)
+
+
+@app.command()
+def failover(
+    switch_server: bool = typer.Option(False, help="Select backup server as main"),
+    restart_outputs: bool = typer.Option(False, help="Restart enabled outputs"),
+    interval: float = typer.Option(2.0, help="Seconds between polls"),
+    workers: int = typer.Option(16, help="Devices polled concurrently"),
+):
+    from facecast_io.failover import FailoverPolicy, InputFailover
+
+    api = _login()
+
+    def report(event):
+        typer.echo(
+            f"{bctext(event.device_name)}: main input lost, "
+            f"detected within {event.detection_latency:.1f}s"
+            + (f", switched in {event.switch_latency:.2f}s" if event.switched_at else "")
+        )
+
+    policy = FailoverPolicy(
+        switch_server=switch_server, restart_outputs=restart_outputs, callbacks=[report]
+    )
+    fleet = _fleet(api)
+    watcher = InputFailover(
+        api.devices, policy, interval=interval, max_workers=workers, fleet=fleet
+    )
+    typer.echo(f"Watching input of {len(api.devices)} devices, Ctrl-C to stop")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    finally:
+        if fleet is not None:
+            fleet.close()
+
+
+@app.command("daemon")
+def run_daemon(
+    refresh: float = typer.Option(30.0, help="Seconds between background refreshes"),
+):
+    from facecast_io.daemon import FacecastDaemon
+
+    api = _login()
+    typer.echo(f"Serving {len(api.devices)} devices on {SOCKET_PATH}")
+    daemon = FacecastDaemon(api, app, refresh_interval=refresh)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        typer.echo("Daemon stopped")
+
+
+@app.command()
+def gateway(
+    host: str = typer.Option("127.0.0.1"),
+    port: int = typer.Option(8787),
+    refresh: float = typer.Option(15.0, help="Seconds between background refreshes"),
+):
+    from facecast_io.gateway import Gateway
+
+    api = _login()
+    server = Gateway(api, host, port, refresh_interval=refresh)
+    typer.echo(f"Serving {len(api.devices)} devices on http://{host}:{port}/devices")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        typer.echo("Gateway stopped")
+
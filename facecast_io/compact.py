@@ -0,0 +1,192 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .entities import DeviceOutput, DeviceStatusFull
+from .errors import DeviceNotFound
+from .models import Device, Devices
+from .server_catalog import ServerCatalog
+from .server_connector import ServerConnector
+
+__all__ = ["CompactServer", "CompactOutput", "CompactDevice", "CompactFleet"]
+
+
+class CompactServer:
+    __slots__ = ("id", "name", "url")
+
+    def __init__(self, id: int, name: str, url: str):
+        self.id = id
+        self.name = name
+        self.url = url
+
+    def __repr__(self):
+        return f"CompactServer <{self.id} - {self.url}>"
+
+
+class CompactOutput:
+    __slots__ = ("id", "title", "server_url", "enabled", "cloud")
+
+    def __init__(self, id: int, title: str, server_url: str, enabled: bool, cloud: bool):
+        self.id = id
+        self.title = title
+        self.server_url = server_url
+        self.enabled = enabled
+        self.cloud = cloud
+
+    def __repr__(self):
+        return f"CompactOutput <{self.title}>"
+
+
+class CompactDevice:
+    """Only what the API reads from a device, servers are shared with the fleet"""
+
+    __slots__ = (
+        "rtmp_id",
+        "name",
+        "shared_key",
+        "is_online",
+        "main_server",
+        "backup_server",
+        "outputs",
+    )
+
+    def __init__(self, rtmp_id: int, name: str):
+        self.rtmp_id = rtmp_id
+        self.name = name
+        self.shared_key = ""
+        self.is_online = False
+        self.main_server: Optional[CompactServer] = None
+        self.backup_server: Optional[CompactServer] = None
+        self.outputs: Tuple[CompactOutput, ...] = ()
+
+    def __repr__(self):
+        return f"CompactDevice <{self.name} - {self.rtmp_id}>"
+
+    @property
+    def main_server_url(self) -> str:
+        return self.main_server.url if self.main_server else ""
+
+    @property
+    def backup_server_url(self) -> str:
+        return self.backup_server.url if self.backup_server else ""
+
+    @property
+    def input_params(self) -> Dict[str, str]:
+        return {
+            "lang_code": self.name,
+            "main_server_url": self.main_server_url,
+            "backup_server_url": self.backup_server_url,
+            "shared_key": self.shared_key,
+        }
+
+
+class CompactFleet:
+    """Memory-lean view of all devices of an account.
+
+    Full pydantic models are dropped right after conversion, `raw()` fetches
+    them again for a single device when they are really needed.
+    """
+
+    def __init__(
+        self, server_connector: ServerConnector, server_catalog: ServerCatalog = None
+    ):
+        self._server_connector = server_connector
+        if server_catalog is None:
+            server_catalog = ServerCatalog(server_connector)
+        self.server_catalog = server_catalog
+        self._devices: Dict[int, CompactDevice] = {}
+        self._servers: Dict[Tuple[int, str], CompactServer] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_devices(cls, devices: Devices) -> "CompactFleet":
+        fleet = cls(devices._server_connector, devices.server_catalog)
+        for d in devices:
+            device = fleet._devices[d.rtmp_id] = CompactDevice(d.rtmp_id, d.name)
+            if d._status is not None:
+                fleet._apply_status(device, d._status)
+            fleet._apply_outputs(device, (o.output for o in d.outputs))
+        return fleet
+
+    def __repr__(self):
+        return f"CompactFleet <{len(self._devices)}>"
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self) -> Iterator[CompactDevice]:
+        yield from list(self._devices.values())
+
+    def __getitem__(self, item) -> CompactDevice:
+        if isinstance(item, int) and item in self._devices:
+            return self._devices[item]
+        for device in self._devices.values():
+            if device.name == item:
+                return device
+        raise DeviceNotFound(f"{item}")
+
+    @property
+    def input_params(self) -> List[Dict[str, str]]:
+        return [d.input_params for d in self]
+
+    def update(self, max_workers: int = 16):
+        devices = self._server_connector.get_devices()
+        known = {d.rtmp_id for d in devices}
+        for d in devices:
+            if d.rtmp_id not in self._devices:
+                self._devices[d.rtmp_id] = CompactDevice(d.rtmp_id, sys.intern(d.name))
+        for rtmp_id in set(self._devices) - known:
+            del self._devices[rtmp_id]
+        with ThreadPoolExecutor(max_workers) as pool:
+            list(pool.map(self.update_device, list(self._devices.values())))
+
+    def update_device(self, device: CompactDevice):
+        status = self._server_connector.get_status(device.rtmp_id)
+        self.server_catalog.get(device.rtmp_id)
+        self._apply_status(device, status)
+        self._apply_outputs(device, self._server_connector.get_outputs(device.rtmp_id))
+
+    def raw(self, item) -> Device:
+        """Full `Device` with all pydantic models, fetched on demand"""
+        compact = self[item]
+        device = Device(
+            self._server_connector,
+            compact.name,
+            compact.rtmp_id,
+            server_catalog=self.server_catalog,
+        )
+        # keep the server selection which is already in place
+        device._stream_server_selected = True
+        device.update()
+        return device
+
+    def _server(self, server_id: int, name: str, url: str) -> CompactServer:
+        key = (server_id, url)
+        server = self._servers.get(key)
+        if server is None:
+            with self._lock:
+                server = self._servers.setdefault(
+                    key, CompactServer(server_id, sys.intern(name), sys.intern(url))
+                )
+        return server
+
+    def _apply_status(self, device: CompactDevice, status: DeviceStatusFull):
+        s = status.status
+        device.shared_key = s.shared_key
+        device.is_online = s.is_online
+        device.main_server = self._server(s.server_id, s.server_name, s.input_url)
+        backup_id = status.backup_server_id
+        if backup_id and backup_id in self.server_catalog:
+            backup = self.server_catalog[backup_id]
+            device.backup_server = self._server(backup.id, backup.name, backup.url)
+        else:
+            device.backup_server = None
+
+    def _apply_outputs(self, device: CompactDevice, outputs: Iterable[DeviceOutput]):
+        device.outputs = tuple(
+            CompactOutput(
+                o.id, sys.intern(o.title), sys.intern(o.server_url), o.enabled, o.cloud
+            )
+            for o in outputs
+        )
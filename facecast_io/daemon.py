@@ -0,0 +1,214 @@
+"""Warm `FacecastAPI` kept in a background process and shared by CLI calls.
+
+The daemon listens on a Unix socket. Every request is one JSON line with the
+CLI arguments, the answer is one JSON line with exit code and output.
+"""
+import io
+import json
+import os
+import re
+import socket
+import socketserver
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Optional, Sequence, TextIO, Tuple
+
+from .logger_setup import logger
+
+__all__ = ["SOCKET_PATH", "FacecastDaemon", "call", "run_forwarded"]
+
+SOCKET_PATH = Path(os.getenv("FACECAST_SOCKET", Path.home() / ".facecast.sock"))
+
+# Non-interactive commands which are safe to run inside the daemon
+FORWARDED_COMMANDS = [("device",), ("devices", "list"), ("devices", "create")]
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def is_forwarded(argv: Sequence[str]) -> bool:
+    if "--help" in argv:
+        return False
+    return any(tuple(argv[: len(c)]) == c for c in FORWARDED_COMMANDS)
+
+
+def call(
+    argv: List[str], path: Path = SOCKET_PATH, timeout: float = 300
+) -> Optional[Tuple[int, str]]:
+    """Run CLI command in the daemon, None if the daemon isn't running"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps({"argv": argv}).encode() + b"\n")
+        response = json.loads(sock.makefile("rb").readline())
+    finally:
+        sock.close()
+    return response["exit_code"], response["output"]
+
+
+def run_forwarded(argv: List[str], path: Path = SOCKET_PATH) -> Optional[int]:
+    """Print output of the command executed by the daemon and return its exit code"""
+    if not is_forwarded(argv):
+        return None
+    response = call(argv, path)
+    if response is None:
+        return None
+    exit_code, output = response
+    if not sys.stdout.isatty():
+        output = ANSI_ESCAPE.sub("", output)
+    sys.stdout.write(output)
+    sys.stdout.flush()
+    return exit_code
+
+
+class _CapturedOutput(io.TextIOBase):
+    """Replacement of sys.stdout/sys.stderr writing to the buffer captured in the
+    current context, so concurrent commands don't mix their output"""
+
+    encoding = "utf-8"
+    errors = "strict"
+    _buffer: ContextVar[Optional[TextIO]] = ContextVar("output_buffer", default=None)
+    _lock = threading.Lock()
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    @classmethod
+    def install(cls):
+        with cls._lock:
+            if not isinstance(sys.stdout, cls):
+                sys.stdout = cls(sys.stdout)
+            if not isinstance(sys.stderr, cls):
+                sys.stderr = cls(sys.stderr)
+
+    @classmethod
+    def uninstall(cls):
+        with cls._lock:
+            if isinstance(sys.stdout, cls):
+                sys.stdout = sys.stdout.stream
+            if isinstance(sys.stderr, cls):
+                sys.stderr = sys.stderr.stream
+
+    @classmethod
+    @contextmanager
+    def capture(cls, buffer: TextIO):
+        # something may have put its own stream in place since the last command
+        cls.install()
+        token = cls._buffer.set(buffer)
+        try:
+            yield buffer
+        finally:
+            cls._buffer.reset(token)
+
+    def _target(self) -> TextIO:
+        return self._buffer.get() or self.stream
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+    def isatty(self) -> bool:
+        return self._target().isatty()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        exit_code, output = self.server.facecast_daemon.execute(request["argv"])
+        self.wfile.write(
+            json.dumps({"exit_code": exit_code, "output": output}).encode() + b"\n"
+        )
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class FacecastDaemon:
+    def __init__(self, api, app, path: Path = SOCKET_PATH, refresh_interval: float = 30):
+        import typer
+
+        self.api = api
+        self.app = app
+        self._command = typer.main.get_command(app)
+        self.path = Path(path)
+        self.refresh_interval = refresh_interval
+        self._stop_event = threading.Event()
+        self._server: Optional[_Server] = None
+
+    def execute(self, argv: List[str]) -> Tuple[int, str]:
+        """Run CLI command, commands run concurrently while the daemon is serving"""
+        if not is_forwarded(argv):
+            # interactive and long running commands would take over the daemon
+            return 2, f"Command isn't served by the daemon: {' '.join(argv)}\n"
+        exit_code = 0
+        with _CapturedOutput.capture(io.StringIO()) as output:
+            try:
+                self._command.main(
+                    args=argv, prog_name="facecast", color=True, obj={"api": self.api}
+                )
+            except SystemExit as e:
+                if e.code is not None and not isinstance(e.code, int):
+                    output.write(f"{e.code}\n")
+                    exit_code = 1
+                else:
+                    exit_code = e.code or 0
+            except Exception as e:
+                logger.error("Command %s failed: %r", argv, e)
+                exit_code = 1
+        return exit_code, output.getvalue()
+
+    def refresh(self):
+        for update in self.api.devices.refresh():
+            if not update.ok:
+                logger.warning(
+                    "Refresh of %s failed: %r", update.device.name, update.error
+                )
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Background refresh failed")
+
+    def _remove_stale_socket(self):
+        if not self.path.exists():
+            return
+        if call(["--help"], self.path, timeout=5) is not None:
+            raise RuntimeError(f"Daemon is already running on {self.path}")
+        self.path.unlink()
+
+    def serve_forever(self):
+        self._remove_stale_socket()
+        # the socket is created owner only, there is no window to connect to it
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(str(self.path), _Handler)
+        finally:
+            os.umask(umask)
+        _CapturedOutput.install()
+        self._server.facecast_daemon = self  # type: ignore
+        refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        refresher.start()
+        logger.info("Facecast daemon is listening on %s", self.path)
+        try:
+            self._server.serve_forever()
+        finally:
+            _CapturedOutput.uninstall()
+            self._stop_event.set()
+            self._server.server_close()
+            if self.path.exists():
+                self.path.unlink()
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
@@ -12,3 +12,16 @@ class DeviceNotFound(FacecastAPIError):
 
 class DeviceNotCreated(FacecastAPIError):
     ...
+
+
+class CircuitOpenError(FacecastAPIError):
+    def __init__(self, endpoint: str, retry_after: float):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuit for {endpoint} is open, retry in {retry_after:.1f} seconds"
+        )
+
+
+class TemplateError(FacecastAPIError):
+    ...
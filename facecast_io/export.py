@@ -0,0 +1,186 @@
+"""Bulk export of encoder input parameters.
+
+Only the status of every device is fetched (one request per device, run
+concurrently) plus the shared server catalog for backup urls, instead of
+the full `Devices.update()`. Results are written in the order they arrive,
+devices which failed are left out and collected in `errors`:
+
+    errors = {}
+    params = export_input_params(
+        api.server_connector, api.devices.server_catalog, errors=errors
+    )
+    write_csv(params, sys.stdout)
+"""
+import csv
+import json
+import re
+import shlex
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+)
+
+from .entities import BaseDevice, DeviceStatusFull
+from .errors import DeviceNotFound
+from .logger_setup import logger
+from .server_catalog import ServerCatalog
+from .server_connector import ServerConnector
+
+__all__ = [
+    "FIELDS",
+    "FORMATS",
+    "export_input_params",
+    "input_params",
+    "obs_service",
+    "profile_name",
+    "save_obs_profiles",
+    "write_csv",
+    "write_ffmpeg",
+    "write_json",
+    "write_obs",
+]
+
+FIELDS = ("lang_code", "main_server_url", "backup_server_url", "shared_key")
+
+
+def input_params(
+    name: str, status: DeviceStatusFull, server_catalog: ServerCatalog
+) -> Dict[str, str]:
+    """Same as `Device.input_params`, built from the status alone"""
+    backup_id = status.backup_server_id
+    backup_url = server_catalog[backup_id].url if backup_id in server_catalog else ""
+    return {
+        "lang_code": name,
+        "main_server_url": status.main_server_url,
+        "backup_server_url": backup_url,
+        "shared_key": status.shared_key,
+    }
+
+
+def export_input_params(
+    server_connector: ServerConnector,
+    server_catalog: ServerCatalog = None,
+    names: Sequence[str] = None,
+    max_workers: int = 32,
+    errors: Dict[str, BaseException] = None,
+) -> Iterator[Dict[str, str]]:
+    """Input params of all (or `names`) devices, as soon as each one is fetched.
+
+    Devices are listed right away, unknown `names` raise DeviceNotFound. A
+    device whose status can't be fetched is skipped and put into `errors`.
+    """
+    if server_catalog is None:
+        server_catalog = ServerCatalog(server_connector)
+    devices = list(server_connector.get_devices())
+    if names is not None:
+        missing = set(names) - {d.name for d in devices}
+        if missing:
+            raise DeviceNotFound(", ".join(sorted(missing)))
+        devices = [d for d in devices if d.name in set(names)]
+    return _export(server_connector, server_catalog, devices, max_workers, errors)
+
+
+def _export(
+    server_connector: ServerConnector,
+    server_catalog: ServerCatalog,
+    devices: List[BaseDevice],
+    max_workers: int,
+    errors: Optional[Dict[str, BaseException]],
+) -> Iterator[Dict[str, str]]:
+    if not devices:
+        return
+    server_catalog.get(devices[0].rtmp_id)
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        futures = {
+            pool.submit(server_connector.get_status, d.rtmp_id): d for d in devices
+        }
+        for future in as_completed(futures):
+            name = futures[future].name
+            error = future.exception()
+            if error is not None:
+                logger.error("Export of %s failed: %r", name, error)
+                if errors is not None:
+                    errors[name] = error
+                continue
+            yield input_params(name, future.result(), server_catalog)
+
+
+def write_json(params: Iterable[Dict[str, str]], stream: TextIO):
+    """One JSON object per line"""
+    for p in params:
+        stream.write(json.dumps(p) + "\n")
+
+
+def write_csv(params: Iterable[Dict[str, str]], stream: TextIO):
+    writer = csv.DictWriter(stream, FIELDS)
+    writer.writeheader()
+    for p in params:
+        writer.writerow(p)
+
+
+def write_ffmpeg(params: Iterable[Dict[str, str]], stream: TextIO):
+    """ffmpeg command per device pushing "$INPUT" to both ingest servers"""
+    for p in params:
+        targets = [
+            f"[f=flv:onfail=ignore]{url.rstrip('/')}/{p['shared_key']}"
+            for url in (p["main_server_url"], p["backup_server_url"])
+            if url
+        ]
+        stream.write(
+            f"# {p['lang_code']}\n"
+            'ffmpeg -re -i "$INPUT" -map 0 -c copy -f tee '
+            f"{shlex.quote('|'.join(targets))}\n"
+        )
+
+
+def obs_service(p: Dict[str, str]) -> dict:
+    """Content of `service.json` in OBS profile directory"""
+    return {
+        "type": "rtmp_custom",
+        "settings": {
+            "server": p["main_server_url"],
+            "key": p["shared_key"],
+            "use_auth": False,
+            "bwtest": False,
+        },
+    }
+
+
+def write_obs(params: Iterable[Dict[str, str]], stream: TextIO):
+    """OBS service settings of every device keyed by device name, one per line"""
+    for p in params:
+        stream.write(json.dumps({p["lang_code"]: obs_service(p)}) + "\n")
+
+
+def profile_name(name: str) -> str:
+    """Device name usable as a directory name, no separators or `..`"""
+    return re.sub(r"[^\w\- ]", "_", name).strip() or "_"
+
+
+def save_obs_profiles(params: Iterable[Dict[str, str]], directory: Path) -> int:
+    """Writes `<directory>/<lang_code>/service.json` profiles"""
+    count = 0
+    for p in params:
+        profile = Path(directory) / profile_name(p["lang_code"])
+        profile.mkdir(parents=True, exist_ok=True)
+        with open(profile / "service.json", "w") as f:
+            json.dump(obs_service(p), f, indent=4)
+        count += 1
+    return count
+
+
+FORMATS: Dict[str, Callable[[Iterable[Dict[str, str]], TextIO], None]] = {
+    "json": write_json,
+    "csv": write_csv,
+    "ffmpeg": write_ffmpeg,
+    "obs": write_obs,
+}
@@ -0,0 +1,174 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from attr import dataclass, attrib
+
+from .entities import DeviceStatusFull
+from .logger_setup import logger
+from .models import Device, Devices
+from .polling import FleetPoller
+
+if TYPE_CHECKING:
+    from .sharding import ShardedFleet
+
+__all__ = ["FailoverEvent", "FailoverPolicy", "InputFailover", "input_signals"]
+
+
+@dataclass
+class FailoverEvent:
+    device_name: str
+    rtmp_id: int
+    last_seen_live_at: float
+    detected_at: float
+    actions: List[str] = attrib(factory=list)
+    switched_at: Optional[float] = None
+    restored_at: Optional[float] = None
+    # all actions succeeded, failed ones are retried on the next polls
+    done: bool = False
+
+    @property
+    def detection_latency(self) -> float:
+        # upper bound: signal was lost somewhere between the two polls
+        return self.detected_at - self.last_seen_live_at
+
+    @property
+    def switch_latency(self) -> Optional[float]:
+        if self.switched_at is None:
+            return None
+        return self.switched_at - self.detected_at
+
+
+@dataclass
+class FailoverPolicy:
+    switch_server: bool = False
+    restart_outputs: bool = False
+    callbacks: List[Callable[[FailoverEvent], None]] = attrib(factory=list)
+    # consecutive polls without main signal before reacting
+    confirm_polls: int = 1
+
+
+@dataclass
+class _InputState:
+    last_seen_live_at: float
+    # main server before the failover, a switch moves it to the backup slot
+    server_id: Optional[int] = None
+    lost_polls: int = 0
+    event: Optional[FailoverEvent] = None
+
+
+def input_signals(status: DeviceStatusFull) -> Tuple[bool, bool]:
+    if status.input is not None:
+        return status.input.main.ok, status.input.backup.ok
+    return status.is_online, status.status.backup_server.input_signal
+
+
+def _server_signal(status: DeviceStatusFull, server_id: int) -> Optional[bool]:
+    main_live, backup_live = input_signals(status)
+    if status.main_server_id == server_id:
+        return main_live
+    if status.backup_server_id == server_id:
+        return backup_live
+    return None
+
+
+class InputFailover(FleetPoller):
+    """Reacts on lost main input signal while the backup server still receives one"""
+
+    reads = ("status",)
+
+    def __init__(
+        self,
+        devices: Devices,
+        policy: FailoverPolicy = None,
+        *,
+        interval: float = 2,
+        max_workers: int = 16,
+        fleet: "ShardedFleet" = None,
+    ):
+        super().__init__(
+            devices, interval=interval, max_workers=max_workers, fleet=fleet
+        )
+        self.policy = policy or FailoverPolicy()
+        self.events: List[FailoverEvent] = []
+        self._states: Dict[int, _InputState] = {}
+        self._lock = threading.Lock()
+
+    def poll_device(self, device: Device):
+        status = self._get_status(device.rtmp_id)
+        main_live, backup_live = input_signals(status)
+        now = time.time()
+        with self._lock:
+            state = self._states.setdefault(device.rtmp_id, _InputState(now))
+        if state.event is None:
+            state.server_id = status.main_server_id
+
+        if _server_signal(status, state.server_id):
+            if state.event is not None:
+                state.event.restored_at = now
+                logger.info("Main input of %s is back", device.name)
+            state.last_seen_live_at, state.lost_polls, state.event = now, 0, None
+            return
+
+        if state.event is not None:
+            if not state.event.done:
+                self._react(device, status, state.event, state.server_id)
+            return
+        state.lost_polls += 1
+        if state.lost_polls < self.policy.confirm_polls:
+            return
+        if not backup_live:
+            logger.error("%s lost input signal on both servers", device.name)
+            return
+
+        event = FailoverEvent(
+            device_name=device.name,
+            rtmp_id=device.rtmp_id,
+            last_seen_live_at=state.last_seen_live_at,
+            detected_at=now,
+        )
+        state.event = event
+        with self._lock:
+            self.events.append(event)
+        logger.warning("Main input of %s lost, backup is live", device.name)
+        self._react(device, status, event, state.server_id)
+
+    def _react(
+        self,
+        device: Device,
+        status: DeviceStatusFull,
+        event: FailoverEvent,
+        server_id: int,
+    ):
+        """Runs the actions not done yet, a failed one raises and is retried"""
+        sc = self._server_connector
+        if self.policy.switch_server and status.main_server_id == server_id:
+            sc.select_server(device.rtmp_id, status.backup_server_id)
+            event.actions.append(f"select_server:{status.backup_server_id}")
+        if self.policy.restart_outputs:
+            for output in sc.get_outputs(device.rtmp_id):
+                action = f"restart_output:{output.id}"
+                if output.enabled and action not in event.actions:
+                    sc.stop_output(device.rtmp_id, output.id)
+                    sc.start_output(device.rtmp_id, output.id)
+                    event.actions.append(action)
+        event.done = True
+        if event.actions:
+            event.switched_at = time.time()
+            logger.info(
+                "Failover of %s done in %.2fs: %s",
+                device.name,
+                event.switch_latency,
+                ", ".join(event.actions),
+            )
+        for callback in self.policy.callbacks:
+            callback(event)
+
+    def stats(self) -> Dict[str, float]:
+        detections = [e.detection_latency for e in self.events]
+        switches = [e.switch_latency for e in self.events if e.switched_at]
+        return {
+            "events": len(self.events),
+            "max_detection_latency": max(detections, default=0.0),
+            "max_switch_latency": max(switches, default=0.0),
+        }
@@ -0,0 +1,217 @@
+"""Local read-through HTTP/JSON gateway over one shared `FacecastAPI`.
+
+    GET  /devices                         names, rtmp ids and online flags
+    GET  /devices/input                   input params of all devices
+    GET  /devices/<name>                  input, status and outputs of device
+    GET  /devices/<name>/input|status|outputs
+    POST /devices/<name>/start|stop       start/stop all outputs of device
+    GET  /breakers                        circuit breaker states
+
+Reads are served from a snapshot rebuilt by one background refresh loop,
+every answer has an ETag and `If-None-Match` gets `304 Not Modified`. A
+device which failed to refresh keeps its last snapshot with an `error`.
+"""
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote
+
+from .errors import DeviceNotFound, FacecastAPIError
+from .logger_setup import logger
+from .models import Device
+
+__all__ = ["FleetCache", "Gateway", "device_snapshot"]
+
+
+def device_snapshot(device: Device) -> dict:
+    return {
+        "name": device.name,
+        "rtmp_id": device.rtmp_id,
+        "input": device.input_params,
+        "status": {
+            "is_online": device.is_online,
+            "main_server_id": device._status.main_server_id,
+            "main_server_url": device.main_server_url,
+            "backup_server_id": device._status.backup_server_id,
+            "backup_server_url": device.backup_server_url,
+        },
+        "outputs": [
+            {
+                "id": o.output.id,
+                "title": o.output.title,
+                "server_url": o.output.server_url,
+                "enabled": o.output.enabled,
+                "cloud": o.output.cloud,
+            }
+            for o in device.outputs
+        ],
+    }
+
+
+def _encode(data) -> Tuple[bytes, str]:
+    body = json.dumps(data, sort_keys=True).encode()
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+class FleetCache:
+    """Pre-rendered JSON answers, rebuilt after every refresh or mutation"""
+
+    def __init__(self, api, refresh_interval: float = 15):
+        self.api = api
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._snapshots: Dict[str, dict] = {}
+        self._responses: Dict[str, Tuple[bytes, str]] = {}
+        self._stop_event = threading.Event()
+
+    def get(self, path: str) -> Optional[Tuple[bytes, str]]:
+        path = path.rstrip("/")
+        if path == "/breakers":
+            # changes with every request, not with refreshes
+            return _encode(self.api.server_connector.breakers.stats())
+        return self._responses.get(path)
+
+    def refresh(self):
+        """Updates every device concurrently, a device which fails to update
+        keeps its last snapshot with the error"""
+        snapshots: Dict[str, dict] = {}
+        errors: Dict[str, str] = {}
+        try:
+            for update in self.api.devices.refresh():
+                name = update.device.name
+                if update.ok:
+                    snapshots[name] = device_snapshot(update.device)
+                else:
+                    logger.warning("Refresh of %s failed: %r", name, update.error)
+                    errors[name] = repr(update.error)
+        finally:
+            with self._lock:
+                for name, error in errors.items():
+                    if name in self._snapshots:
+                        snapshots[name] = dict(self._snapshots[name], error=error)
+                self._snapshots.update(snapshots)
+            self._rebuild()
+
+    def refresh_device(self, device: Device, rebuild: bool = True):
+        device.update()
+        snapshot = device_snapshot(device)
+        with self._lock:
+            self._snapshots[device.name] = snapshot
+        if rebuild:
+            self._rebuild()
+
+    def mutate(self, device: Device, action: str):
+        """Pass `start`/`stop` through to facecast and update the snapshot"""
+        getattr(device, f"{action}_outputs")()
+        snapshot = device_snapshot(device)
+        with self._lock:
+            self._snapshots[device.name] = snapshot
+        self._rebuild()
+
+    def _rebuild(self):
+        with self._lock:
+            names = {d.name for d in self.api.devices}
+            snapshots = {n: s for n, s in self._snapshots.items() if n in names}
+            self._snapshots = snapshots
+        responses = {
+            "/devices": _encode(
+                [
+                    {
+                        "name": s["name"],
+                        "rtmp_id": s["rtmp_id"],
+                        "is_online": s["status"]["is_online"],
+                        "error": s.get("error"),
+                    }
+                    for s in snapshots.values()
+                ]
+            ),
+            "/devices/input": _encode([s["input"] for s in snapshots.values()]),
+        }
+        for name, snapshot in snapshots.items():
+            prefix = f"/devices/{name}"
+            responses[prefix] = _encode(snapshot)
+            for part in ("input", "status", "outputs"):
+                responses[f"{prefix}/{part}"] = _encode(snapshot[part])
+        self._responses = responses
+
+    def run(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Gateway refresh failed")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "Gateway"
+
+    def log_message(self, format, *args):
+        logger.debug("gateway: " + format, *args)
+
+    def _send(self, status: int, body: bytes = b"", etag: str = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._send(status, json.dumps({"error": message}).encode())
+
+    def do_GET(self):
+        response = self.server.cache.get(unquote(self.path))
+        if response is None:
+            return self._error(404, "Not found")
+        body, etag = response
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, etag=etag)
+        self._send(200, body, etag)
+
+    def do_POST(self):
+        parts = unquote(self.path).strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "devices":
+            return self._error(404, "Not found")
+        if parts[2] not in ("start", "stop"):
+            return self._error(404, "Not found")
+        cache = self.server.cache
+        try:
+            device = cache.api.devices[parts[1]]
+            cache.mutate(device, parts[2])
+        except DeviceNotFound:
+            return self._error(404, f"Device {parts[1]} not found")
+        except FacecastAPIError as e:
+            return self._error(502, str(e))
+        body, etag = cache.get(f"/devices/{device.name}")  # type: ignore
+        self._send(200, body, etag)
+
+
+class Gateway(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        api,
+        host: str = "127.0.0.1",
+        port: int = 8787,
+        refresh_interval: float = 15,
+    ):
+        super().__init__((host, port), _Handler)
+        self.cache = FleetCache(api, refresh_interval)
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self.cache.refresh()
+        refresher = threading.Thread(target=self.cache.run, daemon=True)
+        refresher.start()
+        logger.info("Facecast gateway is listening on %s:%s", *self.server_address)
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.cache.stop()
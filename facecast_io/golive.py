@@ -0,0 +1,169 @@
+"""Start outputs of many devices together at a given wall-clock time.
+
+    go_live = GoLive(api.devices, at=time.time() + 120)
+    report = go_live.run()
+
+`warmup` seconds before `at` the session is checked (and renewed if it
+expired), pooled connections are opened and all rtmp_id/output id pairs are
+resolved, so at T0 only the `start` commands are left to send.
+"""
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+from attr import dataclass
+
+from .logger_setup import logger
+from .models import Devices
+
+__all__ = ["GoLive", "GoLiveReport", "OutputStart", "parse_time", "wait_until"]
+
+# sleep() overshoots by a few ms, the rest is waited out by spinning
+SPIN_THRESHOLD = 0.02
+
+
+@dataclass
+class OutputStart:
+    device_name: str
+    rtmp_id: int
+    output_id: int
+    title: str
+    sent_at: float = 0.0
+    done_at: float = 0.0
+    ok: bool = False
+    error: Optional[str] = None
+
+    def skew(self, at: float) -> float:
+        return self.sent_at - at
+
+
+@dataclass
+class GoLiveReport:
+    at: float
+    starts: List[OutputStart]
+
+    @property
+    def failed(self) -> List[OutputStart]:
+        return [s for s in self.starts if not s.ok]
+
+    @property
+    def max_skew(self) -> float:
+        return max((abs(s.skew(self.at)) for s in self.starts), default=0.0)
+
+    @property
+    def spread(self) -> float:
+        """Time between the first and the last `start` sent"""
+        if not self.starts:
+            return 0.0
+        sent = [s.sent_at for s in self.starts]
+        return max(sent) - min(sent)
+
+
+def parse_time(value: str, now: datetime = None) -> float:
+    """`+SECONDS`, `-SECONDS`, `HH:MM[:SS]` (today, local time) or ISO datetime"""
+    now = now or datetime.now()
+    if value[:1] in ("+", "-"):
+        return now.timestamp() + float(value)
+    for fmt in ("%H:%M", "%H:%M:%S"):
+        try:
+            clock = datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+        return datetime.combine(now.date(), clock).timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+def wait_until(at: float):
+    remaining = at - time.time()
+    if remaining > SPIN_THRESHOLD:
+        time.sleep(remaining - SPIN_THRESHOLD)
+    while time.time() < at:
+        pass
+
+
+class GoLive:
+    def __init__(
+        self,
+        devices: Devices,
+        at: float,
+        *,
+        names: Sequence[str] = None,
+        warmup: float = 30,
+        max_workers: int = 64,
+        on_start: Callable[[OutputStart], None] = None,
+    ):
+        self.devices = devices
+        self.at = at
+        self.names = names
+        self.warmup = warmup
+        self.max_workers = max_workers
+        self.on_start = on_start
+        self.starts: List[OutputStart] = []
+        self._server_connector = devices._server_connector
+
+    def _selected(self):
+        if self.names is None:
+            return list(self.devices)
+        return [self.devices[name] for name in self.names]
+
+    def prepare(self) -> List[OutputStart]:
+        sc = self._server_connector
+        # goes through re-authentication (and a new form_sign) if session expired
+        sc.get_devices()
+        devices = self._selected()
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            # as many parallel requests as there will be at T0 open the connections
+            outputs = list(pool.map(lambda d: sc.get_outputs(d.rtmp_id), devices))
+        self.starts = [
+            OutputStart(d.name, d.rtmp_id, o.id, o.title)
+            for d, device_outputs in zip(devices, outputs)
+            for o in device_outputs
+        ]
+        logger.info(
+            "Go-live of %s outputs on %s devices is prepared",
+            len(self.starts),
+            len(devices),
+        )
+        return self.starts
+
+    def _start(self, start: OutputStart, go: threading.Event):
+        go.wait()
+        start.sent_at = time.time()
+        try:
+            result = self._server_connector.start_output(start.rtmp_id, start.output_id)
+            start.ok = bool(result.ok)
+            if not result.ok:
+                start.error = "Facecast refused to start output"
+        except Exception as e:
+            start.error = repr(e)
+        start.done_at = time.time()
+        if self.on_start is not None:
+            self.on_start(start)
+
+    def fire(self) -> GoLiveReport:
+        """Wait for `at` and send all prepared `start` commands concurrently"""
+        go = threading.Event()
+        workers = max(1, min(self.max_workers, len(self.starts)))
+        with ThreadPoolExecutor(workers) as pool:
+            for start in self.starts:
+                pool.submit(self._start, start, go)
+            wait_until(self.at)
+            go.set()
+        report = GoLiveReport(self.at, self.starts)
+        logger.info(
+            "Started %s/%s outputs, max skew %.3fs",
+            len(self.starts) - len(report.failed),
+            len(self.starts),
+            report.max_skew,
+        )
+        return report
+
+    def run(self) -> GoLiveReport:
+        wait_until(self.at - self.warmup)
+        self.prepare()
+        if time.time() > self.at:
+            logger.warning("Go-live preparation finished after the target time")
+        return self.fire()
+
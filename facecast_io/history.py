@@ -0,0 +1,428 @@
+"""SQLite history of input and output states.
+
+    store = HistoryStore("~/.facecast/history.db")
+    recorder = HistoryRecorder(api.devices, store)
+    recorder.start()
+    ...
+    store.uptime(rtmp_id, output_id, start, end)
+
+Only changes are stored: a row is added when the state of an input (output
+id 0) or an output changes, or when the input bitrate moves by more than
+`kbps_tolerance`. Rows are written in batches, a state holds until the next
+row of its series or until the series was seen last. Time between the
+last sighting and the next recording is UNKNOWN when the recording process
+restarted, a poll of the device failed (`mark_unknown`) or the sightings
+are more than `max_gap` seconds apart. Gaps don't count as up or down.
+Queries seek by the (rtmp_id, output_id, time) index, a report over
+months reads only the changes in its range. Reports can run next to a
+recording process.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from attr import dataclass
+
+from .entities import DeviceOutput, DeviceStatusFull
+from .models import Device, Devices
+from .polling import FleetPoller
+from .timeseries import to_number
+
+if TYPE_CHECKING:
+    from .sharding import ShardedFleet
+
+__all__ = [
+    "BitrateSummary",
+    "HISTORY_PATH",
+    "HistoryRecorder",
+    "HistoryStore",
+    "Interval",
+    "SeriesReport",
+    "INPUT",
+    "OFF",
+    "UP",
+    "DOWN",
+    "UNKNOWN",
+]
+
+HISTORY_PATH = Path(
+    os.getenv("FACECAST_HISTORY", Path.home() / ".facecast" / "history.db")
+)
+
+# output id of the input series of a device
+INPUT = 0
+
+OFF = 0
+UP = 1
+DOWN = 2
+UNKNOWN = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS states (
+    rtmp_id INTEGER NOT NULL,
+    output_id INTEGER NOT NULL,
+    time REAL NOT NULL,
+    state INTEGER NOT NULL,
+    kbps INTEGER
+);
+CREATE INDEX IF NOT EXISTS states_series_time ON states (rtmp_id, output_id, time);
+CREATE TABLE IF NOT EXISTS series (
+    rtmp_id INTEGER NOT NULL,
+    output_id INTEGER NOT NULL,
+    device_name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    time REAL NOT NULL,
+    state INTEGER NOT NULL,
+    kbps INTEGER,
+    PRIMARY KEY (rtmp_id, output_id)
+);
+"""
+
+Key = Tuple[int, int]
+
+
+@dataclass
+class Interval:
+    start: float
+    end: float
+    state: int
+    kbps: Optional[int] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class BitrateSummary:
+    min_kbps: int
+    mean_kbps: float
+    max_kbps: int
+    duration: float
+
+
+@dataclass
+class SeriesReport:
+    rtmp_id: int
+    output_id: int
+    device_name: str
+    title: str
+    uptime: Optional[float]
+    outages: List[Interval]
+    bitrate: Optional[BitrateSummary] = None
+
+
+@dataclass
+class _Series:
+    device_name: str
+    title: str
+    time: float
+    state: int
+    kbps: Optional[int]
+
+
+def output_state(output: DeviceOutput) -> int:
+    if not output.enabled:
+        return OFF
+    return UP if output.cloud else DOWN
+
+
+class HistoryStore:
+    def __init__(
+        self,
+        path: Path = None,
+        *,
+        batch_size: int = 500,
+        flush_interval: float = 5,
+        kbps_tolerance: float = 0.1,
+        max_gap: float = None,
+    ):
+        self.path = Path(path or HISTORY_PATH).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.kbps_tolerance = kbps_tolerance
+        self.max_gap = max_gap
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, int, float, int, Optional[int]]] = []
+        self._dirty: Dict[Key, _Series] = {}
+        self._flushed_at = time.monotonic()
+        self._series: Dict[Key, _Series] = {
+            (r[0], r[1]): _Series(*r[2:])
+            for r in self._db.execute("SELECT * FROM series")
+        }
+        self._recorded: Set[Key] = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            for key in self._recorded:
+                s = self._series[key]
+                if s.state != UNKNOWN:
+                    self._change(key, s, s.time, UNKNOWN, None)
+            self._flush()
+        self._db.close()
+
+    def _change(
+        self, key: Key, s: _Series, at: float, state: int, kbps: Optional[int]
+    ):
+        s.state, s.kbps = state, kbps
+        self._pending.append((key[0], key[1], at, state, kbps))
+        self._dirty[key] = s
+
+    def _kbps_changed(self, old: Optional[int], new: Optional[int]) -> bool:
+        if old is None or new is None:
+            return old != new
+        return abs(new - old) > self.kbps_tolerance * max(old, 1)
+
+    def record(
+        self,
+        rtmp_id: int,
+        output_id: int,
+        state: int,
+        *,
+        kbps: int = None,
+        device_name: str = "",
+        title: str = "",
+        at: float = None,
+    ):
+        at = time.time() if at is None else at
+        key = (rtmp_id, output_id)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = _Series(device_name, title, at, UNKNOWN, None)
+            # nothing is known about the time since the series was seen last
+            # by an earlier process or long ago
+            gap = self.max_gap is not None and at - s.time > self.max_gap
+            if (key not in self._recorded or gap) and s.state != UNKNOWN:
+                self._change(key, s, s.time, UNKNOWN, None)
+            self._recorded.add(key)
+            s.time = at
+            s.device_name, s.title = device_name or s.device_name, title or s.title
+            if s.state != state or self._kbps_changed(s.kbps, kbps):
+                self._change(key, s, at, state, kbps)
+            else:
+                self._dirty[key] = s
+            if (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._flushed_at >= self.flush_interval
+            ):
+                self._flush()
+
+    def mark_unknown(self, rtmp_id: int):
+        """States of the device are unknown since it was seen last, e.g. its
+        poll failed"""
+        with self._lock:
+            for key in self._recorded:
+                s = self._series[key]
+                if key[0] == rtmp_id and s.state != UNKNOWN:
+                    self._change(key, s, s.time, UNKNOWN, None)
+
+    def record_status(
+        self, device_name: str, rtmp_id: int, status: DeviceStatusFull, at: float = None
+    ):
+        s = status.status.s
+        self.record(
+            rtmp_id,
+            INPUT,
+            UP if status.is_online else DOWN,
+            kbps=int(to_number(s.bw_in) / 1000) if s is not None else None,
+            device_name=device_name,
+            at=at,
+        )
+
+    def record_outputs(
+        self,
+        device_name: str,
+        rtmp_id: int,
+        outputs: Iterable[DeviceOutput],
+        at: float = None,
+    ):
+        for o in outputs:
+            self.record(
+                rtmp_id,
+                o.id,
+                output_state(o),
+                device_name=device_name,
+                title=o.title,
+                at=at,
+            )
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._pending and not self._dirty:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO states VALUES (?, ?, ?, ?, ?)", self._pending
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (k[0], k[1], s.device_name, s.title, s.time, s.state, s.kbps)
+                    for k, s in self._dirty.items()
+                ],
+            )
+        self._pending.clear()
+        self._dirty.clear()
+
+    def series(self) -> List[Tuple[int, int, str, str]]:
+        """(rtmp_id, output_id, device name, output title) of every series"""
+        self.flush()
+        with self._lock:
+            return list(
+                self._db.execute(
+                    "SELECT rtmp_id, output_id, device_name, title FROM series"
+                    " ORDER BY device_name, output_id"
+                )
+            )
+
+    def intervals(
+        self, rtmp_id: int, output_id: int, start: float, end: float
+    ) -> List[Interval]:
+        """States within `start` and `end`, the last one ends when the series
+        was seen last"""
+        self.flush()
+        with self._lock:
+            first = self._db.execute(
+                "SELECT time, state, kbps FROM states"
+                " WHERE rtmp_id = ? AND output_id = ? AND time <= ?"
+                " ORDER BY time DESC, rowid DESC LIMIT 1",
+                (rtmp_id, output_id, start),
+            ).fetchone()
+            rows = self._db.execute(
+                "SELECT time, state, kbps FROM states"
+                " WHERE rtmp_id = ? AND output_id = ? AND time > ? AND time < ?"
+                " ORDER BY time, rowid",
+                (rtmp_id, output_id, start, end),
+            ).fetchall()
+            seen = self._db.execute(
+                "SELECT time FROM series WHERE rtmp_id = ? AND output_id = ?",
+                (rtmp_id, output_id),
+            ).fetchone()
+        points = ([(start,) + tuple(first[1:])] if first else []) + rows
+        stop = min(end, seen[0]) if seen else start
+        intervals = []
+        for (at, state, kbps), following in zip(points, points[1:] + [(stop,)]):
+            until = min(following[0], stop)
+            if until > at:
+                intervals.append(Interval(at, until, state, kbps))
+        return intervals
+
+    def uptime(
+        self, rtmp_id: int, output_id: int, start: float, end: float
+    ) -> Optional[float]:
+        """Share of the time known to be up or down which was up"""
+        return _uptime(self.intervals(rtmp_id, output_id, start, end))
+
+    def outages(
+        self, rtmp_id: int, output_id: int, start: float, end: float
+    ) -> List[Interval]:
+        return _outages(self.intervals(rtmp_id, output_id, start, end))
+
+    def bitrate(
+        self, rtmp_id: int, start: float, end: float
+    ) -> Optional[BitrateSummary]:
+        """Time-weighted input bitrate while the input was up"""
+        return _bitrate(self.intervals(rtmp_id, INPUT, start, end))
+
+    def report(
+        self, start: float, end: float, names: Iterable[str] = None
+    ) -> List[SeriesReport]:
+        wanted = set(names) if names is not None else None
+        reports = []
+        for rtmp_id, output_id, device_name, title in self.series():
+            if wanted is not None and device_name not in wanted:
+                continue
+            intervals = self.intervals(rtmp_id, output_id, start, end)
+            reports.append(
+                SeriesReport(
+                    rtmp_id,
+                    output_id,
+                    device_name,
+                    title,
+                    _uptime(intervals),
+                    _outages(intervals),
+                    _bitrate(intervals) if output_id == INPUT else None,
+                )
+            )
+        return reports
+
+
+def _uptime(intervals: List[Interval]) -> Optional[float]:
+    up = sum(i.duration for i in intervals if i.state == UP)
+    down = sum(i.duration for i in intervals if i.state == DOWN)
+    return up / (up + down) if up + down else None
+
+
+def _outages(intervals: List[Interval]) -> List[Interval]:
+    outages: List[Interval] = []
+    for i in intervals:
+        if i.state != DOWN:
+            continue
+        if outages and outages[-1].end == i.start:
+            # bitrate rows split one state
+            outages[-1] = Interval(outages[-1].start, i.end, DOWN)
+        else:
+            outages.append(Interval(i.start, i.end, DOWN))
+    return outages
+
+
+def _bitrate(intervals: List[Interval]) -> Optional[BitrateSummary]:
+    measured = [i for i in intervals if i.state == UP and i.kbps is not None]
+    duration = sum(i.duration for i in measured)
+    if not duration:
+        return None
+    return BitrateSummary(
+        min_kbps=min(i.kbps for i in measured),
+        mean_kbps=sum(i.kbps * i.duration for i in measured) / duration,
+        max_kbps=max(i.kbps for i in measured),
+        duration=duration,
+    )
+
+
+class HistoryRecorder(FleetPoller):
+    """Records input status and outputs of every device into `store`"""
+
+    reads = ("status", "outputs")
+
+    def __init__(
+        self,
+        devices: Devices,
+        store: HistoryStore,
+        *,
+        interval: float = 5,
+        max_workers: int = 16,
+        fleet: "ShardedFleet" = None,
+    ):
+        super().__init__(
+            devices, interval=interval, max_workers=max_workers, fleet=fleet
+        )
+        self.store = store
+
+    def poll_device(self, device: Device):
+        try:
+            status = self._get_status(device.rtmp_id)
+            outputs = self._get_outputs(device.rtmp_id)
+        except Exception:
+            # the last states would otherwise hold through the outage
+            self.store.mark_unknown(device.rtmp_id)
+            raise
+        self.store.record_status(device.name, device.rtmp_id, status)
+        self.store.record_outputs(device.name, device.rtmp_id, outputs)
@@ -0,0 +1,290 @@
+"""Append-only JSON-lines journal of bulk connector mutations.
+
+A job is planned upfront as a list of operations, then every operation
+gets an `intent` record before its request goes out and a `done` record
+after it. When a job dies halfway, `Journal.run()` on the same file only
+runs what isn't done. Operations which were started but not confirmed are
+checked against facecast first, so e.g. an output is never created twice:
+the intent lists the outputs the device had, an output which is not among
+them is the one created, its id is kept with the `done` record.
+
+    journal = Journal.create("provision", operations, device="EN")
+    journal.run(api.server_connector)
+    ...
+    Journal(path).run(api.server_connector)  # after a crash
+
+Journals hold shared keys, files are created readable by the owner only.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from attr import dataclass
+
+from .errors import FacecastAPIError
+from .logger_setup import logger
+from .server_connector import ServerConnector
+
+__all__ = [
+    "ACTIONS",
+    "JOURNAL_DIR",
+    "Journal",
+    "Operation",
+    "unfinished_jobs",
+]
+
+JOURNAL_DIR = Path(
+    os.getenv("FACECAST_JOURNAL_DIR", Path.home() / ".facecast" / "journal")
+)
+
+PENDING = "pending"
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Operation:
+    id: str
+    action: str
+    params: dict
+    state: str = PENDING
+    error: Optional[str] = None
+    # recorded with the intent, before the request
+    intent: Optional[dict] = None
+    result: Optional[dict] = None
+
+
+def _existing_outputs(sc: ServerConnector, p: dict) -> dict:
+    return {"existing": [o.id for o in sc.get_outputs(p["rtmp_id"])]}
+
+
+def _new_output_id(outputs, p: dict, intent: dict) -> Optional[int]:
+    for o in outputs:
+        if o.id in intent.get("existing", ()):
+            continue
+        if o.title == p["title"] and o.server_url == p["server_url"]:
+            return o.id
+    return None
+
+
+def _create_output(sc: ServerConnector, p: dict, intent: dict) -> dict:
+    result = sc.create_output(
+        p["rtmp_id"],
+        server_url=p["server_url"],
+        shared_key=p["shared_key"],
+        title=p["title"],
+    )
+    if not result.ok:
+        raise FacecastAPIError(f"Output {p['title']} is not created")
+    return {"output_id": _new_output_id(result.outputs, p, intent)}
+
+
+def _output_created(sc: ServerConnector, p: dict, intent: dict) -> Optional[dict]:
+    output_id = _new_output_id(sc.get_outputs(p["rtmp_id"]), p, intent)
+    return None if output_id is None else {"output_id": output_id}
+
+
+def _delete_output(sc: ServerConnector, p: dict, intent: dict) -> dict:
+    sc.delete_output(p["rtmp_id"], p["output_id"])
+    return {}
+
+
+def _output_deleted(sc: ServerConnector, p: dict, intent: dict) -> Optional[dict]:
+    if any(o.id == p["output_id"] for o in sc.get_outputs(p["rtmp_id"])):
+        return None
+    return {}
+
+
+def _delete_device(sc: ServerConnector, p: dict, intent: dict) -> dict:
+    if not sc.delete_device(p["rtmp_id"]):
+        raise FacecastAPIError(f"Device {p['rtmp_id']} is not deleted")
+    return {}
+
+
+def _device_deleted(sc: ServerConnector, p: dict, intent: dict) -> Optional[dict]:
+    if any(d.rtmp_id == p["rtmp_id"] for d in sc.get_devices()):
+        return None
+    return {}
+
+
+def _nothing(sc: ServerConnector, p: dict) -> dict:
+    return {}
+
+
+Prepare = Callable[[ServerConnector, dict], dict]
+Action = Callable[[ServerConnector, dict, dict], dict]
+Check = Callable[[ServerConnector, dict, dict], Optional[dict]]
+
+# action: (state recorded with the intent, run, result if it was already applied)
+ACTIONS: Dict[str, Tuple[Prepare, Action, Check]] = {
+    "create_output": (_existing_outputs, _create_output, _output_created),
+    "delete_output": (_nothing, _delete_output, _output_deleted),
+    "delete_device": (_nothing, _delete_device, _device_deleted),
+}
+
+
+class Journal:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.job: dict = {}
+        self.operations: Dict[str, Operation] = OrderedDict()
+        self.finished = False
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self._load()
+
+    def __repr__(self):
+        return f"Journal <{self.job_id}: {len(self.pending)}/{len(self.operations)}>"
+
+    @property
+    def job_id(self) -> str:
+        return self.path.stem
+
+    @property
+    def pending(self) -> List[Operation]:
+        return [o for o in self.operations.values() if o.state != DONE]
+
+    @classmethod
+    def create(
+        cls,
+        kind: str,
+        operations: Sequence[Tuple[str, str, dict]],
+        directory: Path = None,
+        **args,
+    ) -> "Journal":
+        """New journal with planned (id, action, params) operations"""
+        directory = Path(directory or JOURNAL_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        # jobs of the same kind started within a second get different ids
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        job_id = f"{stamp}-{kind}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        journal = cls(directory / f"{job_id}.jsonl")
+        journal.job = {"kind": kind, "args": args, "created_at": time.time()}
+        journal._append(dict(journal.job, type="job"))
+        for op_id, action, params in operations:
+            if action not in ACTIONS:
+                raise ValueError(f"Unknown action {action}")
+            journal.operations[op_id] = Operation(op_id, action, params)
+            journal._append(
+                {"type": "plan", "op": op_id, "action": action, "params": params}
+            )
+        return journal
+
+    def _append(self, record: dict):
+        record["at"] = time.time()
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            with os.fdopen(fd, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the process died in the middle of writing the last line
+                    logger.warning("Skipping broken line of %s", self.path)
+                    continue
+                kind = record["type"]
+                if kind == "job":
+                    self.job = record
+                elif kind == "plan":
+                    self.operations[record["op"]] = Operation(
+                        record["op"], record["action"], record["params"]
+                    )
+                elif kind == "finished":
+                    self.finished = True
+                else:
+                    op = self.operations[record["op"]]
+                    op.state = {"intent": STARTED, "done": DONE, "failed": FAILED}[kind]
+                    op.error = record.get("error")
+                    if kind == "intent":
+                        op.intent = record.get("state", {})
+                    elif kind == "done":
+                        op.result = record.get("result", {})
+
+    def run(
+        self,
+        server_connector: ServerConnector,
+        on_done: Callable[[Operation], None] = None,
+        *,
+        max_workers: int = 1,
+    ):
+        """Runs pending operations in order, stops at the first failure.
+
+        With `max_workers` operations of different devices (rtmp_id) run
+        concurrently, a device stops at its first failure and the first
+        error is raised when all devices are done.
+        """
+        devices: Dict[Optional[int], List[Operation]] = OrderedDict()
+        for op in self.pending:
+            devices.setdefault(op.params.get("rtmp_id"), []).append(op)
+        if max_workers <= 1 or len(devices) <= 1:
+            for operations in devices.values():
+                self._run(server_connector, operations, on_done)
+        else:
+            with ThreadPoolExecutor(min(max_workers, len(devices))) as pool:
+                futures = [
+                    pool.submit(
+                        contextvars.copy_context().run,
+                        self._run,
+                        server_connector,
+                        operations,
+                        on_done,
+                    )
+                    for operations in devices.values()
+                ]
+            errors = [f.exception() for f in futures if f.exception() is not None]
+            if errors:
+                raise errors[0]
+        if not self.finished:
+            self.finished = True
+            self._append({"type": "finished"})
+
+    def _run(
+        self,
+        server_connector: ServerConnector,
+        operations: List[Operation],
+        on_done: Optional[Callable[[Operation], None]],
+    ):
+        for op in operations:
+            prepare, run, check = ACTIONS[op.action]
+            result = None
+            if op.state in (STARTED, FAILED):
+                result = check(server_connector, op.params, op.intent)
+            if result is not None:
+                logger.info("%s: %s was already applied", self.job_id, op.id)
+            else:
+                op.intent = prepare(server_connector, op.params)
+                self._append({"type": "intent", "op": op.id, "state": op.intent})
+                op.state = STARTED
+                try:
+                    result = run(server_connector, op.params, op.intent)
+                except Exception as e:
+                    op.state, op.error = FAILED, repr(e)
+                    self._append({"type": "failed", "op": op.id, "error": op.error})
+                    raise
+            op.state, op.result = DONE, result
+            self._append({"type": "done", "op": op.id, "result": result})
+            if on_done is not None:
+                on_done(op)
+
+
+def unfinished_jobs(directory: Path = None) -> List[Journal]:
+    """Oldest first"""
+    directory = Path(directory or JOURNAL_DIR)
+    if not directory.exists():
+        return []
+    journals = (Journal(p) for p in sorted(directory.glob("*.jsonl")))
+    return [j for j in journals if not j.finished]
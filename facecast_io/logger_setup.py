@@ -1,7 +1,12 @@
+import atexit
+import copy
+import json
 import logging
-import urllib3  # type: ignore
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
 
-urllib3.disable_warnings()
+STRUCTURED_FIELDS = ("endpoint", "rtmp_id", "duration")
 
 
 class CustomFormatter(logging.Formatter):
@@ -24,16 +29,92 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: bold_red + _format + reset,
     }
 
+    def __init__(self):
+        super().__init__()
+        self._formatters = {
+            level: logging.Formatter(fmt) for level, fmt in self.FORMATS.items()
+        }
+        self._default = logging.Formatter(self._format)
+
+    def format(self, record):
+        return self._formatters.get(record.levelno, self._default).format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, request fields (endpoint, rtmp_id, duration) included"""
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
+        data = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            if hasattr(record, field):
+                data[field] = getattr(record, field)
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The queue never leaves the process: render only the message here,
+        # args may change before the listener gets to them, and leave the
+        # formatting and writing to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 
 logger = logging.getLogger("facecast_io")
 logger.setLevel(logging.INFO)
+# handlers added here, setup_logging replaces only these
+_handlers: List[logging.Handler] = []
 if not logger.handlers:
     ch = logging.StreamHandler()
     ch.setLevel(logging.DEBUG)
     ch.setFormatter(CustomFormatter())
     logger.addHandler(ch)
+    _handlers.append(ch)
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = None, *, structured: bool = False, queued: bool = True):
+    """Reconfigure `facecast_io` logger.
+
+    With `queued` the request threads only enqueue records and a background
+    listener formats and writes them. `structured` switches to JSON lines.
+    """
+    global _listener
+    stop_logging()
+    while _handlers:
+        logger.removeHandler(_handlers.pop())
+    if level is not None:
+        logger.setLevel(level)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if structured else CustomFormatter())
+    if not queued:
+        logger.addHandler(stream_handler)
+        _handlers.append(stream_handler)
+        return
+
+    records: queue.Queue = queue.Queue(-1)
+    queue_handler = _DeferredQueueHandler(records)
+    logger.addHandler(queue_handler)
+    _handlers.append(queue_handler)
+    _listener = QueueListener(records, stream_handler)
+    _listener.start()
+
+
+@atexit.register
+def stop_logging():
+    """Flush records still waiting in the queue and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
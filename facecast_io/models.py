@@ -1,6 +1,19 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence, List, Dict
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
 from attr import dataclass
 from retry.api import retry_call
@@ -13,7 +26,9 @@ from .entities import (
     DeviceInfo,
 )
 from .logger_setup import logger
+from .server_catalog import ServerCatalog
 from .server_connector import ServerConnector
+from .tracing import traced
 
 
 @dataclass
@@ -73,10 +88,10 @@ class DeviceOutputs(Sequence[DeviceOutput]):
 
     def update_outputs(self):
         device_outputs = self._server_connector.get_outputs(self.rtmp_id)
-        self._outputs.clear()
-        for o in device_outputs:
-            do = DeviceOutput(device=self._device, output=o)
-            self._outputs.append(do)
+        # swapped at once, readers in other threads never see a partial list
+        self._outputs = [
+            DeviceOutput(device=self._device, output=o) for o in device_outputs
+        ]
 
     def start_outputs(self):
         for o in self:
@@ -89,9 +104,32 @@ class DeviceOutputs(Sequence[DeviceOutput]):
         return True
 
 
+@dataclass
+class DeviceUpdate:
+    device: Device
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def device_name(device: Device, *args, **kwargs) -> str:
+    return device.name
+
+
 class Device:
-    def __init__(self, server_connector: ServerConnector, name: str, rtmp_id: int):
+    def __init__(
+        self,
+        server_connector: ServerConnector,
+        name: str,
+        rtmp_id: int,
+        server_catalog: ServerCatalog = None,
+    ):
         self._server_connector = server_connector
+        if server_catalog is None:
+            server_catalog = ServerCatalog(server_connector)
+        self._server_catalog = server_catalog
         self.name = name
         self.rtmp_id = rtmp_id
 
@@ -115,7 +153,7 @@ class Device:
     def backup_server_url(self) -> str:
         if self._status.backup_server_id == 0:
             return ""
-        return self._available_servers[self._status.backup_server_id].url
+        return self._server_catalog[self._status.backup_server_id].url
 
     @property
     def shared_key(self):
@@ -141,10 +179,9 @@ class Device:
         self.outputs.update_outputs()
 
     def _update_available_servers(self):
-        self._available_servers = self._server_connector.get_available_servers(
-            self.rtmp_id
-        )
+        self._available_servers = self._server_catalog.get(self.rtmp_id)
 
+    @traced(label=device_name)
     def update(self):
         self._info = self._server_connector.get_device(self.rtmp_id)
         self._update_device_status()
@@ -153,6 +190,7 @@ class Device:
         if not self._stream_server_selected:
             self.select_fastest_server()
 
+    @traced(label=device_name)
     def create_output(self, name, server_url, shared_key, audio=0) -> bool:
         device_output = self._server_connector.create_output(
             self.rtmp_id,
@@ -167,18 +205,21 @@ class Device:
         self._update_outputs()
         return True
 
+    @traced(label=device_name)
     def start_outputs(self):
         logger.debug(f"start_outputs: {self.name}")
         self.outputs.start_outputs()
         self._update_outputs()
         return True
 
+    @traced(label=device_name)
     def stop_outputs(self):
         logger.debug(f"stop_outputs: {self.name}")
         self.outputs.stop_outputs()
         self._update_outputs()
         return True
 
+    @traced(label=device_name)
     def delete_outputs(self):
         logger.debug(f"delete_outputs: {self.name}")
         for o in self.outputs:
@@ -186,20 +227,23 @@ class Device:
         self._update_outputs()
         return True
 
+    @traced(label=device_name)
     def delete(self):
         logger.debug(f"delete_device: {self.name}")
         self.delete_outputs()
         self._server_connector.delete_device(self.rtmp_id)
         return True
 
+    @traced(label=device_name)
     def select_server(self, server_id: int):
         self._update_available_servers()
-        if self._available_servers and server_id not in self._available_servers:
+        if self._available_servers and server_id not in self._server_catalog:
             raise FacecastAPIError("Not allowed server_id")
         if self._server_connector.select_server(self.rtmp_id, server_id):
             self._update_device_status()
             self._stream_server_selected = True
 
+    @traced(label=device_name)
     def select_fastest_server(self):
         self._update_available_servers()
         if self._server_connector.select_server(
@@ -212,7 +256,10 @@ class Device:
 class Devices(Sequence[Device]):
     def __init__(self, server_connector):
         self._server_connector = server_connector
+        self.server_catalog = ServerCatalog(server_connector)
         self._devices: List[Device] = []
+        # guards the list of devices, which workers of a workflow extend
+        self._lock = threading.RLock()
 
     def __repr__(self):
         return f"Devices <{self._devices}>"
@@ -245,11 +292,13 @@ class Devices(Sequence[Device]):
         except DeviceNotFound:
             return False
 
+    @traced()
     def get_device(self, name: str):
         self.update()
         device = self[name]
         return device
 
+    @traced()
     def delete_device(self, name: str):
         dev = self.get_device(name)
         outputs = self._server_connector.get_outputs(dev.rtmp_id)
@@ -265,6 +314,7 @@ class Devices(Sequence[Device]):
             d.delete()
         self._devices.clear()
 
+    @traced()
     def create_device(self, name: str) -> Device:
         if self._server_connector.create_device(name):
             device = retry_call(
@@ -273,6 +323,7 @@ class Devices(Sequence[Device]):
                 exceptions=DeviceNotFound,
                 tries=3,
                 delay=4,
+                logger=logger,
             )
             return device
         raise FacecastAPIError("Some error happened during creation")
@@ -287,17 +338,92 @@ class Devices(Sequence[Device]):
             d.stop_outputs()
             logger.debug(f"Stopped for device {d.name}")
 
-    def _add_new_devices(self):
-        new_devices = self._server_connector.get_devices()
-        for d in new_devices:
-            if d.rtmp_id not in self:
-                device = Device(
-                    server_connector=self._server_connector,
-                    name=d.name,
-                    rtmp_id=d.rtmp_id,
-                )
-                self._devices.append(device)
+    def _select(self, items: Iterable[Union[str, int]] = None) -> List[Device]:
+        if items is None:
+            return list(self._devices)
+        return [self[item] for item in items]
 
+    def iter_updated(
+        self, items: Iterable[Union[str, int]] = None, *, max_workers: int = 16
+    ) -> Iterator[DeviceUpdate]:
+        """Updates all (or `items`, names or rtmp ids) devices concurrently and
+        yields every one as soon as it is done, errors are yielded in place.
+
+        On the first iteration the device list is refreshed, then `items` are
+        looked up, unknown ones raise DeviceNotFound.
+        """
+        self._add_new_devices()
+        devices = self._select(items)
+        yield from self._update_concurrently(devices, max_workers)
+
+    def refresh(self, *, max_workers: int = 16) -> Iterator[DeviceUpdate]:
+        """Drops devices deleted from the account, adds new ones and updates all
+        concurrently, yielding each as soon as it's done with its error if any"""
+        self._add_new_devices(prune=True)
+        return self._update_concurrently(self._select(), max_workers)
+
+    def _update_concurrently(
+        self, devices: List[Device], max_workers: int
+    ) -> Iterator[DeviceUpdate]:
+        with ThreadPoolExecutor(max_workers) as pool:
+            # every task gets its own context, so tracing spans stay nested
+            futures = {
+                pool.submit(contextvars.copy_context().run, d.update): d
+                for d in devices
+            }
+            try:
+                for future in as_completed(futures):
+                    yield DeviceUpdate(futures[future], future.exception())
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    async def aiter_updated(
+        self, items: Iterable[Union[str, int]] = None, *, max_workers: int = 16
+    ) -> AsyncIterator[DeviceUpdate]:
+        """Same as `iter_updated`, the blocking requests are run in threads"""
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers)
+        try:
+            await loop.run_in_executor(pool, self._add_new_devices)
+            devices = self._select(items)
+
+            async def update(device: Device) -> DeviceUpdate:
+                context = contextvars.copy_context()
+                try:
+                    await loop.run_in_executor(pool, context.run, device.update)
+                except Exception as e:
+                    return DeviceUpdate(device, e)
+                return DeviceUpdate(device)
+
+            tasks = [loop.create_task(update(d)) for d in devices]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+        finally:
+            # waiting for the threads would block the event loop
+            pool.shutdown(wait=False)
+
+    def _add_new_devices(self, prune: bool = False):
+        new_devices = self._server_connector.get_devices()
+        with self._lock:
+            if prune:
+                listed = {d.rtmp_id for d in new_devices}
+                self._devices[:] = [d for d in self._devices if d.rtmp_id in listed]
+            for d in new_devices:
+                if d.rtmp_id not in self:
+                    device = Device(
+                        server_connector=self._server_connector,
+                        name=d.name,
+                        rtmp_id=d.rtmp_id,
+                        server_catalog=self.server_catalog,
+                    )
+                    self._devices.append(device)
+
+    @traced()
     def update(self):
         self._add_new_devices()
         for d in self:
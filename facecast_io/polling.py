@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .entities import DeviceOutputs, DeviceStatusFull
+from .logger_setup import logger
+from .models import Device, Devices
+
+if TYPE_CHECKING:
+    from .sharding import DeviceReads, ShardedFleet
+
+__all__ = ["FleetPoller"]
+
+
+class FleetPoller:
+    """Base for watchers which poll every device of the fleet concurrently.
+
+    Subclasses implement `poll_device`, it's called from worker threads for
+    each device once per `interval` seconds. They read through `_get_status`
+    and `_get_outputs` and list those in `reads`: with a `fleet` the reads
+    of the whole cycle are done upfront by its worker processes.
+    """
+
+    reads: Tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        devices: Devices,
+        *,
+        interval: float = 5,
+        max_workers: int = 16,
+        fleet: "ShardedFleet" = None,
+    ):
+        self.devices = devices
+        self._server_connector = devices._server_connector
+        self.interval = interval
+        self.max_workers = max_workers
+        self.fleet = fleet
+        self._prefetched: Dict[int, "DeviceReads"] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def poll_device(self, device: Device):
+        raise NotImplementedError
+
+    def _get_status(self, rtmp_id: int) -> DeviceStatusFull:
+        reads = self._prefetched.get(rtmp_id)
+        if reads is None or reads.status is None:
+            return self._server_connector.get_status(rtmp_id)
+        return reads.status
+
+    def _get_outputs(self, rtmp_id: int) -> DeviceOutputs:
+        reads = self._prefetched.get(rtmp_id)
+        if reads is None or reads.outputs is None:
+            return self._server_connector.get_outputs(rtmp_id)
+        return reads.outputs
+
+    def _prefetch(self, devices):
+        if self.fleet is None or not self.reads:
+            return
+        try:
+            self._prefetched = self.fleet.read([d.rtmp_id for d in devices], self.reads)
+        except Exception:
+            # failed devices are read again from the threads
+            logger.exception("Sharded reads failed")
+
+    def poll_once(self):
+        devices = list(self.devices)
+        self._prefetch(devices)
+        pool = self._pool or ThreadPoolExecutor(self.max_workers)
+        try:
+            futures = {pool.submit(self.poll_device, d): d for d in devices}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("Polling of %s failed", futures[future].name)
+        finally:
+            self._prefetched = {}
+            if pool is not self._pool:
+                pool.shutdown()
+
+    def run(self):
+        self._stop_event.clear()
+        self._pool = ThreadPoolExecutor(self.max_workers)
+        try:
+            while not self._stop_event.is_set():
+                started = time.monotonic()
+                self.poll_once()
+                self._stop_event.wait(
+                    max(0.0, self.interval - (time.monotonic() - started))
+                )
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
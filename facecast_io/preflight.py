@@ -0,0 +1,161 @@
+"""Pre-flight reachability checks of output RTMP targets.
+
+    checker = PreflightChecker(timeout=3)
+    checks = checker.check_urls(["rtmp://a.rtmp.youtube.com/live2"])
+    failed = [c for c in checks if not c.ok]
+
+Every target goes through DNS resolution, TCP connect (plus TLS for rtmps)
+and the first half of the RTMP handshake (C0+C1 out, S0 back). Results are
+cached per host and port, concurrent checks of one host share a single probe.
+"""
+import os
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import attr
+from attr import dataclass
+
+from .errors import FacecastAPIError
+from .logger_setup import logger
+from .models import Device
+from .single_flight import SingleFlight
+
+__all__ = ["PreflightChecker", "PreflightError", "TargetCheck", "parse_target"]
+
+DEFAULT_PORTS = {"rtmp": 1935, "rtmps": 443}
+RTMP_VERSION = 3
+HANDSHAKE_SIZE = 1536
+
+
+class PreflightError(FacecastAPIError):
+    def __init__(self, checks: Sequence["TargetCheck"]):
+        self.checks = list(checks)
+        super().__init__(
+            "Unreachable targets: "
+            + ", ".join(f"{c.url} ({c.stage}: {c.error})" for c in self.checks)
+        )
+
+
+@dataclass
+class TargetCheck:
+    url: str
+    host: str
+    port: int
+    ok: bool
+    stage: str  # url, key, dns, connect, tls or rtmp, where the check ended
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    cached: bool = False
+
+
+def parse_target(url: str) -> Tuple[str, str, int]:
+    """Scheme, host and port of a rtmp(s) url, ValueError when it isn't one"""
+    parts = urlsplit(url.strip())
+    if parts.scheme not in DEFAULT_PORTS:
+        raise ValueError(f"Unsupported scheme {parts.scheme!r}")
+    if not parts.hostname:
+        raise ValueError("No host")
+    return parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS[parts.scheme]
+
+
+def _handshake(sock: socket.socket):
+    c1 = bytes(8) + os.urandom(HANDSHAKE_SIZE - 8)
+    sock.sendall(bytes([RTMP_VERSION]) + c1)
+    s0 = sock.recv(1)
+    if not s0:
+        raise ConnectionError("Connection closed during handshake")
+    if s0[0] != RTMP_VERSION:
+        raise ConnectionError(f"Not a RTMP server, got version {s0[0]}")
+
+
+class PreflightChecker:
+    def __init__(self, *, timeout: float = 3, ttl: float = 300, max_workers: int = 32):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._cache: Dict[Tuple[str, str, int], Tuple[float, TargetCheck]] = {}
+        self._single_flight = SingleFlight()
+        # getaddrinfo() has no timeout of its own
+        self._resolver = ThreadPoolExecutor(max_workers, thread_name_prefix="resolver")
+
+    def close(self):
+        self._resolver.shutdown(wait=False)
+
+    def _resolve(self, host: str, port: int) -> tuple:
+        future = self._resolver.submit(
+            socket.getaddrinfo, host, port, type=socket.SOCK_STREAM
+        )
+        return future.result(self.timeout)[0][4]
+
+    def _probe(self, scheme: str, host: str, port: int) -> TargetCheck:
+        started = time.perf_counter()
+        stage = "dns"
+        try:
+            address = self._resolve(host, port)
+            stage = "connect"
+            sock = socket.create_connection(address[:2], self.timeout)
+            try:
+                if scheme == "rtmps":
+                    stage = "tls"
+                    context = ssl.create_default_context()
+                    sock = context.wrap_socket(sock, server_hostname=host)
+                stage = "rtmp"
+                _handshake(sock)
+            finally:
+                sock.close()
+        except (OSError, TimeoutError) as e:
+            error: Optional[str] = str(e) or e.__class__.__name__
+        else:
+            error = None
+        elapsed = time.perf_counter() - started
+        return TargetCheck("", host, port, error is None, stage, error, elapsed)
+
+    def check_host(self, scheme: str, host: str, port: int) -> TargetCheck:
+        key = (scheme, host.lower(), port)
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        check = self._single_flight.do(key, self._probe, scheme, host, port)
+        self._cache[key] = (time.monotonic(), check)
+        if not check.ok:
+            logger.warning(
+                "%s:%s failed at %s: %s", host, port, check.stage, check.error
+            )
+        return check
+
+    def check(self, url: str, shared_key: str = None) -> TargetCheck:
+        try:
+            scheme, host, port = parse_target(url)
+        except ValueError as e:
+            return TargetCheck(url, "", 0, False, "url", str(e))
+        if shared_key is not None and (
+            not shared_key or shared_key.strip() != shared_key
+        ):
+            return TargetCheck(url, host, port, False, "key", "Empty or padded key")
+        was_cached = (scheme, host.lower(), port) in self._cache
+        check = self.check_host(scheme, host, port)
+        return attr.evolve(check, url=url, cached=was_cached)
+
+    def check_targets(
+        self, targets: Iterable[Tuple[str, Optional[str]]]
+    ) -> List[TargetCheck]:
+        """Checks (server_url, shared_key) pairs concurrently, in the given order"""
+        targets = list(targets)
+        workers = max(1, min(self.max_workers, len(targets)))
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(lambda t: self.check(*t), targets))
+
+    def check_urls(self, urls: Iterable[str]) -> List[TargetCheck]:
+        return self.check_targets((url, None) for url in urls)
+
+    def check_device(self, device: Device) -> List[TargetCheck]:
+        return self.check_urls(o.output.server_url for o in device.outputs)
+
+    def ensure(self, targets: Iterable[Tuple[str, Optional[str]]]):
+        failed = [c for c in self.check_targets(targets) if not c.ok]
+        if failed:
+            raise PreflightError(failed)
@@ -0,0 +1,63 @@
+"""Live table of per-device results of a CLI command.
+
+On a terminal the table is redrawn in place while devices finish, otherwise
+(pipes, the daemon) a line is printed for every finished device.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, TextIO, Tuple
+
+import typer
+
+__all__ = ["ProgressTable"]
+
+WAITING = "waiting"
+
+CLEAR_LINE = "\x1b[2K"
+
+
+def _cursor_up(lines: int) -> str:
+    return f"\x1b[{lines}A" if lines else ""
+
+
+class ProgressTable:
+    def __init__(
+        self, names: Sequence[str], *, stream: TextIO = None, live: bool = None
+    ):
+        self.stream = stream or sys.stdout
+        self.live = self.stream.isatty() if live is None else live
+        self.width = max((len(n) for n in names), default=0)
+        # name: (status, detail, ok), ok is None while running
+        self.rows: Dict[str, Tuple[str, str, Optional[bool]]] = OrderedDict(
+            (n, (WAITING, "", None)) for n in names
+        )
+        self._drawn = 0
+        self._lock = threading.Lock()
+
+    def _format(self, name: str) -> str:
+        status, detail, ok = self.rows[name]
+        if ok is not None:
+            color = typer.colors.GREEN if ok else typer.colors.RED
+            status = typer.style(status, fg=color, bold=True)
+        text = f"{typer.style(name.ljust(self.width), bold=True)}  {status}"
+        return f"{text}  {detail}" if detail else text
+
+    def _draw(self):
+        lines = [CLEAR_LINE + self._format(name) for name in self.rows]
+        self.stream.write(_cursor_up(self._drawn) + "\n".join(lines) + "\n")
+        self.stream.flush()
+        self._drawn = len(lines)
+
+    def update(self, name: str, status: str, detail: str = "", ok: bool = None):
+        with self._lock:
+            self.rows[name] = (status, detail, ok)
+            if self.live:
+                self._draw()
+            elif ok is not None:
+                self.stream.write(self._format(name) + "\n")
+                self.stream.flush()
+
+    @property
+    def failed(self) -> int:
+        return sum(ok is False for _, _, ok in self.rows.values())
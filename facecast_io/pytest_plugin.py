@@ -0,0 +1,152 @@
+"""Pytest plugin checking facecast flows on recorded traffic.
+
+Enable it with `pytest_plugins = ["facecast_io.pytest_plugin"]` in conftest:
+
+    def test_update(facecast_flow):
+        api = facecast_flow.api("devices_update")
+        with facecast_flow.measure("devices_update"):
+            api.devices.update()
+
+Flows replay `cassettes/<name>.json` next to the test module. The request
+count of every measured block is compared with the baseline, a flow making
+more requests fails the test. Wall times are compared by
+`benchmarks/replay_flows.py`, not by tests.
+
+    pytest --facecast-record           record cassettes against facecast.io
+    pytest --facecast-update-baseline  accept the current numbers
+"""
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+
+from .api import FacecastAPI, find_available_server, make_client
+from .cassette import REDACTED, RecordingDispatcher, ReplayDispatcher
+from .testing import FAKE_BASE_URL
+
+__all__ = ["FlowBenchmark"]
+
+BASELINE_FILE = "baseline.json"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("facecast")
+    group.addoption(
+        "--facecast-record",
+        action="store_true",
+        help="record cassettes against the live service, "
+        "credentials are taken from FACECAST_USERNAME/FACECAST_PASSWORD",
+    )
+    group.addoption(
+        "--facecast-latency",
+        default="0",
+        help="replay latency: 'recorded' or seconds per request",
+    )
+    group.addoption(
+        "--facecast-update-baseline",
+        action="store_true",
+        help="write measured request counts to the baseline",
+    )
+
+
+def pytest_configure(config):
+    config._facecast_results = {}
+
+
+def pytest_sessionfinish(session):
+    results: Dict[Path, Dict[str, dict]] = session.config._facecast_results
+    if not session.config.getoption("--facecast-update-baseline"):
+        return
+    for path, flows in results.items():
+        baseline = _load_baseline(path)
+        baseline.update(flows)
+        with open(path, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+def _load_baseline(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+class FlowBenchmark:
+    def __init__(self, config, cassette_dir: Path):
+        self.config = config
+        self.cassette_dir = cassette_dir
+        self.recording = config.getoption("--facecast-record")
+        latency = config.getoption("--facecast-latency")
+        self.latency = latency if latency == "recorded" else float(latency)
+        self.baseline_path = cassette_dir / BASELINE_FILE
+        self.baseline = _load_baseline(self.baseline_path)
+        self._dispatchers: Dict[str, object] = {}
+
+    def cassette_path(self, name: str) -> Path:
+        return self.cassette_dir / f"{name}.json"
+
+    def client(self, name: str):
+        if self.recording:
+            live = make_client(find_available_server())
+            dispatcher = RecordingDispatcher(live.dispatch)
+            self._dispatchers[name] = dispatcher
+            return make_client(str(live.base_url), dispatch=dispatcher)
+        path = self.cassette_path(name)
+        if not path.exists():
+            pytest.skip(f"No cassette {path}, record it with --facecast-record")
+        dispatcher = ReplayDispatcher.load(path, latency=self.latency)
+        self._dispatchers[name] = dispatcher
+        return make_client(FAKE_BASE_URL, dispatch=dispatcher)
+
+    def api(self, name: str) -> FacecastAPI:
+        client = self.client(name)
+        if self.recording:
+            username = os.environ["FACECAST_USERNAME"]
+            password = os.environ["FACECAST_PASSWORD"]
+        else:
+            username = password = REDACTED
+        return FacecastAPI(username, password, client=client)
+
+    def request_count(self, name: str) -> int:
+        return self._dispatchers[name].request_count  # type: ignore
+
+    @contextmanager
+    def measure(self, name: str, flow: Optional[str] = None):
+        """Count requests of the block, `flow` defaults to `name`"""
+        flow = flow or name
+        requests = self.request_count(name)
+        yield
+        result = {"requests": self.request_count(name) - requests}
+        self.config._facecast_results.setdefault(self.baseline_path, {})[flow] = result
+        self._check(flow, result)
+
+    def _check(self, flow: str, result: dict):
+        expected = self.baseline.get(flow)
+        if expected is None or self.recording:
+            return
+        if self.config.getoption("--facecast-update-baseline"):
+            return
+        if result["requests"] > expected["requests"]:
+            pytest.fail(
+                f"{flow} made {result['requests']} requests, "
+                f"baseline is {expected['requests']}"
+            )
+
+    def save(self):
+        if not self.recording:
+            return
+        for name, dispatcher in self._dispatchers.items():
+            dispatcher.cassette.save(self.cassette_path(name))  # type: ignore
+
+
+@pytest.fixture
+def facecast_flow(request):
+    benchmark = FlowBenchmark(
+        request.config, Path(str(request.fspath.dirpath())) / "cassettes"
+    )
+    yield benchmark
+    benchmark.save()
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from .entities import AvailableServers, SelectServer
+from .logger_setup import logger
+from .server_connector import ServerConnector
+
+__all__ = ["ServerCatalog"]
+
+
+class ServerCatalog:
+    """Account wide list of stream servers shared by all devices.
+
+    Facecast returns the same servers page for every device of an account,
+    so it is scraped once per `ttl` seconds instead of once per device.
+    """
+
+    def __init__(self, server_connector: ServerConnector, ttl: float = 300):
+        self._server_connector = server_connector
+        self.ttl = ttl
+        self._servers: Optional[AvailableServers] = None
+        self._by_id: Dict[int, SelectServer] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ServerCatalog <{list(self._by_id)}>"
+
+    def __getitem__(self, server_id: int) -> SelectServer:
+        try:
+            return self._by_id[server_id]
+        except KeyError:
+            raise ValueError(f"Not available server with id {server_id}")
+
+    def __contains__(self, server_id: int) -> bool:
+        return server_id in self._by_id
+
+    def __len__(self):
+        return len(self._by_id)
+
+    @property
+    def is_stale(self) -> bool:
+        return self._servers is None or time.monotonic() - self._fetched_at > self.ttl
+
+    @property
+    def fastest(self) -> SelectServer:
+        servers = self._servers
+        if servers is None:
+            raise ValueError("Server catalog is not loaded, call get() first")
+        return servers.fastest
+
+    def get(self, rtmp_id: int) -> AvailableServers:
+        with self._lock:
+            if self.is_stale:
+                self._refresh(rtmp_id)
+            return self._servers
+
+    def invalidate(self):
+        with self._lock:
+            self._servers = None
+
+    def _refresh(self, rtmp_id: int):
+        servers = self._server_connector.get_available_servers(rtmp_id)
+        self._servers = servers
+        self._by_id = {s.id: s for s in servers}
+        self._fetched_at = time.monotonic()
+        logger.debug("Server catalog refreshed: %d servers", len(self._by_id))
@@ -1,7 +1,12 @@
+import logging
 import re
+import threading
+import time
 from copy import copy
+from typing import Optional, Tuple
 
 import httpx
+import urllib3  # type: ignore
 from pydantic import ValidationError
 
 try:
@@ -10,8 +15,6 @@ except ImportError:
     from typing_extensions import Literal  # type:ignore
 
 from httpx import Client
-from pyquery import PyQuery as pq  # type:ignore
-from retry import retry  # type: ignore
 
 
 from facecast_io.logger_setup import logger
@@ -30,10 +33,17 @@ from .entities import (
 )
 from .errors import (
     AuthError,
+    CircuitOpenError,
     DeviceNotFound,
     DeviceNotCreated,
     FacecastAPIError,
 )
+from .circuit_breaker import OPEN, CircuitBreakers, retry
+from .single_flight import SingleFlight, coalesced, invalidates
+from .tracing import span
+
+# clients of Facecast are built with verify=False, whoever builds them
+urllib3.disable_warnings()
 
 BASE_URL = "https://b1.facecast.io/"
 POSSIBLE_BASE_URLS = [
@@ -61,21 +71,27 @@ RETRY_PARAMS = dict(tries=3, delay=5, jitter=(2, 7), logger=logger)
 
 
 class ServerConnector:
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, breakers: CircuitBreakers = None):
         self.client = client
+        self.breakers = breakers if breakers is not None else CircuitBreakers()
         self.is_authorized: bool = False
         self.form_sign = None
+        self._auth_lock = threading.RLock()
+        self._auth_generation = 0
+        self._credentials: Optional[Tuple[str, str]] = None
+        self._single_flight = SingleFlight()
 
     def __repr__(self):
         return f"ServerConnector<{self.form_sign}>"
 
     def _update_from_sign(self):
-        r = self.client.get("en/main")
-        match = re.search(r"form_sign: \'(\w+)\'", r.text)
-        if match:
-            self.form_sign = match.group(1)
-            return
-        raise AuthError("Failed to fetch form_sign")
+        with self._auth_lock:
+            r = self.client.get("en/main")
+            match = re.search(r"form_sign: \'(\w+)\'", r.text)
+            if match:
+                self.form_sign = match.group(1)
+                return
+            raise AuthError("Failed to fetch form_sign")
 
     def _fetch_signature(self, text):
         match = re.search(r"signature: \'(\w+)\'", text)
@@ -87,40 +103,124 @@ class ServerConnector:
         if not self.is_authorized:
             raise FacecastAPIError("Need to authorize first")
 
+    @staticmethod
+    def _is_session_expired(r: httpx.Response) -> bool:
+        # ajaj endpoints answer with plain "No auth", pages fall back to login form
+        if r.text == "No auth":
+            return True
+        is_page = r.url is not None and not r.url.path.endswith("/ajaj")
+        return is_page and "signature: '" in r.text
+
+    def _reauthenticate(self, auth_generation: int):
+        with self._auth_lock:
+            if self._auth_generation != auth_generation:
+                # somebody else has already logged in again while we were waiting
+                return
+            if self._credentials is None:
+                self.is_authorized = False
+                raise AuthError("Session expired")
+            logger.info("Session expired, re-authenticating")
+            self.do_auth(*self._credentials)
+
+    def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        breaker = self.breakers.get(str(self.client.base_url), url)
+        breaker.before_call()
+        started = time.perf_counter()
+        try:
+            with span(f"{method} {url}", "request"):
+                r = self.client.request(method, url, **kwargs)
+        except Exception as e:
+            breaker.record_failure()
+            if breaker.state == OPEN:
+                # no point in sleeping before a retry which would be rejected
+                raise CircuitOpenError(breaker.name, breaker.retry_after) from e
+            raise
+        else:
+            if r.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        finally:
+            # KeyboardInterrupt and the like record nothing
+            breaker.end_call()
+        if logger.isEnabledFor(logging.DEBUG):
+            duration = time.perf_counter() - started
+            rtmp_id = (kwargs.get("params") or kwargs.get("data") or {}).get("rtmp_id")
+            logger.debug(
+                "%s %s -> %s in %.3fs",
+                method,
+                url,
+                r.status_code,
+                duration,
+                extra={"endpoint": url, "rtmp_id": rtmp_id, "duration": duration},
+            )
+        return r
+
+    def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        auth_generation = self._auth_generation
+        r = self._send(method, url, **kwargs)
+        if not self._is_session_expired(r):
+            return r
+
+        self._reauthenticate(auth_generation)
+        if kwargs.get("data"):
+            kwargs["data"] = {
+                k: self.form_sign if k == "sign" or k.endswith("[sign]") else v
+                for k, v in kwargs["data"].items()
+            }
+        r = self._send(method, url, **kwargs)
+        if self._is_session_expired(r):
+            raise AuthError("Session expired and re-authentication didn't help")
+        return r
+
+    def _get(self, url: str, **kwargs) -> httpx.Response:
+        return self._request("GET", url, **kwargs)
+
+    def _post(self, url: str, **kwargs) -> httpx.Response:
+        return self._request("POST", url, **kwargs)
+
     @retry(httpx.HTTPError, **RETRY_PARAMS)
     def do_auth(self, username: str, password: str) -> bool:
-        r = self.client.get("en/main")
-        if r.url == "en/main":
-            self.is_authorized = True
-            return True
-        signature = self._fetch_signature(r.text)
-        r = self.client.post(
-            "en/login",
-            params={"mode": "ajaj"},
-            data={"login": username, "pass": password, "signature": signature},
-            headers=AJAX_HEADERS,
-        )
-        if r.status_code == 200 and r.json().get("ok"):  # type: ignore
-            self.is_authorized = True
-            self._update_from_sign()
-            logger.debug("Auth successful")
-            return True
-        self.is_authorized = False
-        raise AuthError("AuthService error")
+        with self._auth_lock:
+            r = self.client.get("en/main")
+            if r.url == "en/main":
+                self.is_authorized = True
+                self._credentials = (username, password)
+                return True
+            signature = self._fetch_signature(r.text)
+            r = self.client.post(
+                "en/login",
+                params={"mode": "ajaj"},
+                data={"login": username, "pass": password, "signature": signature},
+                headers=AJAX_HEADERS,
+            )
+            if r.status_code == 200 and r.json().get("ok"):  # type: ignore
+                self.is_authorized = True
+                self._credentials = (username, password)
+                self._update_from_sign()
+                self._auth_generation += 1
+                logger.debug("Auth successful")
+                return True
+            self.is_authorized = False
+            raise AuthError("AuthService error")
 
+    @coalesced("en/main")
     @retry(httpx.HTTPError, **RETRY_PARAMS)
     def get_devices(self) -> BaseDevices:
+        from pyquery import PyQuery as pq  # type:ignore
+
         self._check_auth()
-        r = self.client.get("en/main")
+        r = self._get("en/main")
         d = pq(r.text)
         devices = d(".sb-streamboxes-main-list a")
         devices_names = devices.find(".sb-streambox-item-name")
-        if devices_names:
+        if not devices_names:
+            logger.debug("No devices")
+        elif logger.isEnabledFor(logging.DEBUG):
             logger.debug(
-                f"Got devices with following names: {[d.text for d in devices_names]}"
+                "Got devices with following names: %s",
+                [d.text for d in devices_names],
             )
-        else:
-            logger.debug("No devices")
         return BaseDevices.parse_obj(
             BaseDevice(
                 rtmp_id=device.attrib["href"].split("=")[1], name=device_name.text,
@@ -128,10 +228,11 @@ class ServerConnector:
             for device, device_name in zip(devices, devices_names)
         )
 
+    @coalesced("en/rtmp")
     @retry(httpx.HTTPError, **RETRY_PARAMS)
     def get_device(self, rtmp_id: int) -> DeviceInfo:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/rtmp",
             data={"action": "get_info"},
             params={"rtmp_id": rtmp_id},
@@ -140,13 +241,14 @@ class ServerConnector:
         if r.url and r.url.path == "/en/main":
             raise DeviceNotFound(f"{rtmp_id} isn't available")
         data = DeviceInfo.parse_raw(r.content)
-        logger.debug(f"Got device: {data}")
+        logger.debug("Got device: %s", data)
         return data
 
+    @invalidates
     @retry((httpx.HTTPError, DeviceNotCreated), **RETRY_PARAMS)
     def create_device(self, name: str, stream_type: Literal["rtmp"] = "rtmp") -> bool:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/main_add/ajaj",
             data={
                 "cmd": "add_restreamer",
@@ -161,15 +263,16 @@ class ServerConnector:
             raise DeviceNotCreated(f"{name} wasn't created")
 
         if r.status_code == 200:
-            logger.debug(f"Device {name} was created")
+            logger.debug("Device %s was created", name)
             return True
-        logger.debug(f"Device {name} was not created")
+        logger.debug("Device %s was not created", name)
         return False
 
+    @invalidates
     @retry(httpx.HTTPError, **RETRY_PARAMS)
     def delete_device(self, rtmp_id: int) -> bool:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/rtmp_popup_menu/ajaj",
             data={
                 "cmd": "delete_rtmp_source",
@@ -178,15 +281,16 @@ class ServerConnector:
             },
         )
         if r.status_code == 200:
-            logger.debug(f"Device {rtmp_id} was deleted")
+            logger.debug("Device %s was deleted", rtmp_id)
             return True
-        logger.debug(f"Device {rtmp_id} was not deleted")
+        logger.debug("Device %s was not deleted", rtmp_id)
         return False
 
+    @coalesced("en/rtmp/ajaj")
     @retry(httpx.HTTPError, **RETRY_PARAMS)
     def get_status(self, rtmp_id: int) -> DeviceStatusFull:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/rtmp/ajaj",
             data={
                 "sign": self.form_sign,
@@ -202,22 +306,24 @@ class ServerConnector:
             headers=AJAX_HEADERS,
         )
         data = DeviceStatusFull.parse_raw(r.content)
-        logger.debug(f"Got device status: {data}")
+        logger.debug("Got device status: %s", data)
         return data
 
+    @coalesced("en/rtmp_outputs/ajaj")
     @retry((httpx.HTTPError, FacecastAPIError, ValidationError), **RETRY_PARAMS)
     def get_outputs(self, rtmp_id: int) -> DeviceOutputs:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/rtmp_outputs/ajaj",
             data={"cmd": "getlist", "rtmp_id": rtmp_id, "sign": self.form_sign},
             params={"rtmp_id": rtmp_id},
             headers=AJAX_HEADERS,
         )
         data = DeviceOutputs.parse_raw(r.content)
-        logger.debug(f"Got device outputs: {data}")
+        logger.debug("Got device outputs: %s", data)
         return data
 
+    @invalidates
     @retry((httpx.HTTPError, FacecastAPIError), **RETRY_PARAMS)
     def update_output(
         self,
@@ -229,7 +335,7 @@ class ServerConnector:
         audio: int = 0,
     ) -> DeviceOutput:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/out_rtmp_rtmp/ajaj",
             data={
                 "cmd": "update",
@@ -245,9 +351,10 @@ class ServerConnector:
             headers=AJAX_HEADERS,
         )
         data = DeviceOutput.parse_raw(r.content)
-        logger.debug(f"Updated device output: {data}")
+        logger.debug("Updated device output: %s", data)
         return data
 
+    @invalidates
     @retry((httpx.HTTPError, FacecastAPIError), **RETRY_PARAMS)
     def create_output(
         self,
@@ -259,7 +366,7 @@ class ServerConnector:
         stream_type: Literal["rtmp", "mpegts"] = "rtmp",
     ) -> DeviceOutputStatus:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/out_rtmp_rtmp/ajaj",
             data={
                 "cmd": "add",
@@ -275,16 +382,15 @@ class ServerConnector:
             },
             headers=AJAX_HEADERS,
         )
-        if r.text == "No auth":
-            raise AuthError
         data = DeviceOutputStatus.parse_raw(r.content)
-        logger.debug(f"Updated device output: {data}")
+        logger.debug("Updated device output: %s", data)
         return data
 
+    @invalidates
     @retry((httpx.HTTPError, FacecastAPIError), **RETRY_PARAMS)
     def delete_output(self, rtmp_id: int, oid: int) -> DeviceOutputStatus:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/out_rtmp_rtmp/ajaj",
             data={
                 "cmd": "delete",
@@ -295,13 +401,14 @@ class ServerConnector:
             headers=AJAX_HEADERS,
         )
         data = DeviceOutputStatus.parse_raw(r.content)
-        logger.debug(f"Deleted device output: {data}")
+        logger.debug("Deleted device output: %s", data)
         return data
 
+    @invalidates
     @retry((httpx.HTTPError, FacecastAPIError), **RETRY_PARAMS)
     def _output_management(self, rtmp_id: int, oid: int, cmd: str):
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/out_rtmp_rtmp/ajaj",
             data={
                 "cmd": cmd,
@@ -322,21 +429,23 @@ class ServerConnector:
     def stop_output(self, rtmp_id: int, oid: int) -> OutputStatus:
         return OutputStatus.parse_raw(self._output_management(rtmp_id, oid, "stop"))
 
+    @coalesced("en/rtmp_server")
     @retry((httpx.HTTPError, FacecastAPIError), **RETRY_PARAMS)
     def get_available_servers(self, rtmp_id: int) -> AvailableServers:
         self._check_auth()
-        r = self.client.post("en/rtmp_server?mode=", data={"rtmp_id": rtmp_id})
+        r = self._post("en/rtmp_server?mode=", data={"rtmp_id": rtmp_id})
         match = re.search(r"var servers = '(\[.*\])';", r.text)
         if match:
             data = AvailableServers.parse_raw(match.group(1))
-            logger.debug(f"Got next servers list {data}")
+            logger.debug("Got next servers list %s", data)
             return data
         raise FacecastAPIError("Failed to get available servers")
 
+    @invalidates
     @retry((httpx.HTTPError, FacecastAPIError), **RETRY_PARAMS)
     def select_server(self, rtmp_id: int, server_id: int) -> bool:
         self._check_auth()
-        r = self.client.post(
+        r = self._post(
             "en/rtmp_server/ajaj",
             data={
                 "cmd": "set_server",
@@ -349,6 +458,6 @@ class ServerConnector:
         )
         data = BaseResponse.parse_raw(r.content)
         if data.ok:
-            logger.debug(f"Server {server_id} selected for {rtmp_id}")
+            logger.debug("Server %s selected for %s", server_id, rtmp_id)
             return True
         raise FacecastAPIError(f"Failed to select server {rtmp_id} - {data}")
@@ -0,0 +1,302 @@
+"""Fleet updates and polling reads sharded over a process pool.
+
+    with ShardedFleet(api.devices, processes=8) as fleet:
+        updates = fleet.update()
+        supervisor = OutputSupervisor(api.devices, fleet=fleet)
+
+Parsing facecast pages and validating their models takes more CPU than one
+process has for thousands of devices. Devices are partitioned by rtmp_id
+over worker processes. Each worker has its own connector with the cookies
+and form_sign of the parent's session and updates its share of devices
+from a few threads. The fetched models go back and are merged into the
+parent's `Devices`, so the rest of the code works with them as usual.
+Pollers (`FleetPoller`) given a fleet get the statuses and outputs of every
+cycle from the workers the same way, their decisions stay in the parent.
+
+It only pays off with as many free cores as processes: the work is moved,
+not reduced, and answers are pickled on the way back. On one core it is
+slower than the threads of a single process.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import httpx
+from attr import attrib, dataclass
+
+from .entities import (
+    AvailableServers,
+    DeviceInfo,
+    DeviceOutput,
+    DeviceOutputs,
+    DeviceStatusFull,
+)
+from .errors import FacecastAPIError
+from .logger_setup import logger
+from .models import Device, DeviceOutput as ModelDeviceOutput, Devices, DeviceUpdate
+from .server_catalog import ServerCatalog
+from .server_connector import ServerConnector
+
+__all__ = ["DeviceReads", "DeviceSnapshot", "Session", "ShardedFleet", "partition"]
+
+READS = ("status", "outputs")
+
+ClientFactory = Callable[[str], httpx.Client]
+
+
+def partition(rtmp_ids: Sequence[int], shards: int) -> List[List[int]]:
+    """Stable assignment, a device stays in its shard while others come and go"""
+    result: List[List[int]] = [[] for _ in range(shards)]
+    for rtmp_id in rtmp_ids:
+        result[rtmp_id % shards].append(rtmp_id)
+    return [shard for shard in result if shard]
+
+
+@dataclass
+class Session:
+    """What a worker needs to act as the parent's logged in connector"""
+
+    base_url: str
+    cookies: List[Tuple[str, str, str, str]]
+    form_sign: str
+    credentials: Optional[Tuple[str, str]] = None
+
+    @classmethod
+    def from_connector(cls, server_connector: ServerConnector) -> "Session":
+        if not server_connector.is_authorized:
+            raise FacecastAPIError("Need to authorize first")
+        cookies = [
+            (c.name, c.value, c.domain, c.path)
+            for c in server_connector.client.cookies.jar
+        ]
+        return cls(
+            str(server_connector.client.base_url),
+            cookies,
+            server_connector.form_sign,
+            server_connector._credentials,
+        )
+
+    def connector(self, client_factory: ClientFactory) -> ServerConnector:
+        client = client_factory(self.base_url)
+        for name, value, domain, path in self.cookies:
+            client.cookies.set(name, value, domain=domain, path=path)
+        sc = ServerConnector(client)
+        sc.form_sign = self.form_sign
+        sc.is_authorized = True
+        # a worker whose session expires logs in on its own
+        sc._credentials = self.credentials
+        return sc
+
+
+@dataclass
+class DeviceSnapshot:
+    rtmp_id: int
+    info: Optional[DeviceInfo] = None
+    status: Optional[DeviceStatusFull] = None
+    outputs: List[DeviceOutput] = attrib(factory=list)
+    available_servers: Optional[AvailableServers] = None
+    server_selected: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class DeviceReads:
+    """Answers of the connector reads a poller asked for"""
+
+    rtmp_id: int
+    status: Optional[DeviceStatusFull] = None
+    outputs: Optional[DeviceOutputs] = None
+    error: Optional[str] = None
+
+
+def _default_client(base_url: str) -> httpx.Client:
+    from .api import make_client
+
+    return make_client(base_url)
+
+
+class _Worker:
+    """Connector state of a worker process, kept between shards"""
+
+    def __init__(self, client_factory: ClientFactory, threads: int):
+        self.client_factory = client_factory
+        self.threads = threads
+        self.session: Optional[Session] = None
+        self.server_connector: Optional[ServerConnector] = None
+        self.server_catalog: Optional[ServerCatalog] = None
+
+    def connect(self, session: Session):
+        # a worker which logged in again itself keeps its own newer session
+        if session != self.session:
+            self.session = session
+            self.server_connector = session.connector(self.client_factory)
+            self.server_catalog = ServerCatalog(self.server_connector)
+
+    def update(self, rtmp_id: int, name: str, server_selected: bool) -> DeviceSnapshot:
+        device = Device(self.server_connector, name, rtmp_id, self.server_catalog)
+        device._stream_server_selected = server_selected
+        try:
+            device.update()
+        except Exception as e:
+            logger.error("Update of %s failed: %r", name, e)
+            return DeviceSnapshot(
+                rtmp_id, server_selected=device._stream_server_selected, error=repr(e)
+            )
+        return DeviceSnapshot(
+            rtmp_id,
+            info=device._info,
+            status=device._status,
+            outputs=[o.output for o in device.outputs],
+            available_servers=device._available_servers,
+            server_selected=device._stream_server_selected,
+        )
+
+    def read(self, rtmp_id: int, reads: Sequence[str]) -> DeviceReads:
+        sc = self.server_connector
+        try:
+            status = sc.get_status(rtmp_id) if "status" in reads else None
+            outputs = sc.get_outputs(rtmp_id) if "outputs" in reads else None
+        except Exception as e:
+            return DeviceReads(rtmp_id, error=repr(e))
+        return DeviceReads(rtmp_id, status, outputs)
+
+
+_worker: Optional[_Worker] = None
+
+
+def _init_worker(client_factory: ClientFactory, threads: int):
+    global _worker
+    _worker = _Worker(client_factory, threads)
+
+
+def _update_shard(
+    session: Session, devices: List[Tuple[int, str, bool]]
+) -> List[DeviceSnapshot]:
+    _worker.connect(session)
+    with ThreadPoolExecutor(_worker.threads) as pool:
+        return list(pool.map(lambda d: _worker.update(*d), devices))
+
+
+def _read_shard(
+    session: Session, rtmp_ids: List[int], reads: Sequence[str]
+) -> List[DeviceReads]:
+    _worker.connect(session)
+    with ThreadPoolExecutor(_worker.threads) as pool:
+        return list(pool.map(lambda rtmp_id: _worker.read(rtmp_id, reads), rtmp_ids))
+
+
+class ShardedFleet:
+    def __init__(
+        self,
+        devices: Devices,
+        *,
+        processes: int = None,
+        threads: int = 8,
+        client_factory: ClientFactory = None,
+        mp_context=None,
+    ):
+        self.devices = devices
+        self.processes = processes or os.cpu_count() or 1
+        self.threads = threads
+        self._server_connector = devices._server_connector
+        self._client_factory = client_factory or _default_client
+        self._mp_context = mp_context
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # workers live as long as the fleet, their connections are reused
+                self._pool = ProcessPoolExecutor(
+                    self.processes,
+                    mp_context=self._mp_context,
+                    initializer=_init_worker,
+                    initargs=(self._client_factory, self.threads),
+                )
+            return self._pool
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _apply(self, device: Device, snapshot: DeviceSnapshot):
+        device._stream_server_selected = snapshot.server_selected
+        if snapshot.error is not None:
+            return
+        device._info = snapshot.info
+        device._status = snapshot.status
+        device._available_servers = snapshot.available_servers
+        device.outputs._outputs = [
+            ModelDeviceOutput(device=device, output=o) for o in snapshot.outputs
+        ]
+
+    def update(self, items: Iterable[Union[str, int]] = None) -> List[DeviceUpdate]:
+        """`Devices.update()` of all (or the given rtmp_id or name) devices"""
+        self.devices._add_new_devices()
+        by_id: Dict[int, Device] = {d.rtmp_id: d for d in self.devices._select(items)}
+        if not by_id:
+            return []
+        # backup server urls of merged devices are looked up in it
+        self.devices.server_catalog.get(next(iter(by_id)))
+        session = Session.from_connector(self._server_connector)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(
+                _update_shard,
+                session,
+                [(i, by_id[i].name, by_id[i]._stream_server_selected) for i in shard],
+            )
+            for shard in partition(list(by_id), self.processes)
+        ]
+        updates = []
+        for future in futures:
+            for snapshot in future.result():
+                device = by_id[snapshot.rtmp_id]
+                self._apply(device, snapshot)
+                error = None
+                if snapshot.error is not None:
+                    error = FacecastAPIError(snapshot.error)
+                updates.append(DeviceUpdate(device, error))
+        logger.info(
+            "Updated %s devices in %s shards, %s failed",
+            len(updates),
+            len(futures),
+            sum(not u.ok for u in updates),
+        )
+        return updates
+
+    def read(
+        self, rtmp_ids: Sequence[int], reads: Sequence[str] = READS
+    ) -> Dict[int, DeviceReads]:
+        """Statuses and/or outputs of the devices, failed reads carry `error`"""
+        for read in reads:
+            if read not in READS:
+                raise ValueError(f"Unknown read {read}")
+        if not rtmp_ids:
+            return {}
+        session = Session.from_connector(self._server_connector)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_read_shard, session, shard, tuple(reads))
+            for shard in partition(list(rtmp_ids), self.processes)
+        ]
+        return {r.rtmp_id: r for future in futures for r in future.result()}
@@ -0,0 +1,92 @@
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from pydantic import BaseModel
+
+__all__ = ["SingleFlight", "coalesced", "invalidates"]
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, concurrent callers share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def forget(self):
+        """Calls made from now on don't join the ones already in flight"""
+        with self._lock:
+            self._calls.clear()
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+def coalesced(endpoint: str):
+    """Share one in-flight call of the decorated connector method per endpoint + params"""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (
+                endpoint,
+                tuple(str(a) for a in args),
+                tuple(sorted((k, str(v)) for k, v in kwargs.items())),
+            )
+            result = self._single_flight.do(key, method, self, *args, **kwargs)
+            if isinstance(result, BaseModel):
+                # every caller gets its own copy, sharing it leaks mutations
+                result = result.copy(deep=True)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(method):
+    """Reads issued after the decorated connector method don't join older ones"""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._single_flight.forget()
+
+    return wrapper
@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Tuple
+
+from attr import dataclass, attrib
+
+from .entities import DeviceOutput
+from .logger_setup import logger
+from .models import Device, Devices
+from .polling import FleetPoller
+
+if TYPE_CHECKING:
+    from .history import HistoryStore
+    from .sharding import ShardedFleet
+
+__all__ = ["OutputIncident", "OutputSupervisor"]
+
+
+@dataclass
+class OutputIncident:
+    device_name: str
+    rtmp_id: int
+    output_id: int
+    title: str
+    detected_at: float
+    restarts: int = 0
+    recovered_at: Optional[float] = None
+
+    @property
+    def time_to_recovery(self) -> Optional[float]:
+        if self.recovered_at is None:
+            return None
+        return self.recovered_at - self.detected_at
+
+
+@dataclass
+class _OutputState:
+    incident: OutputIncident
+    next_attempt_at: float = 0.0
+    restart_times: Deque[float] = attrib(factory=deque)
+    damped: bool = False
+
+
+class OutputSupervisor(FleetPoller):
+    """Restarts outputs which are enabled but lost connection to the cloud.
+
+    Restarts of one output are spaced with exponential backoff, and an output
+    restarted `max_restarts` times within `flap_window` seconds is left alone
+    until the window clears. Only the last `max_recovered` incidents are
+    kept in `recovered`, `stats()` covers all of them.
+    """
+
+    reads = ("outputs",)
+
+    def __init__(
+        self,
+        devices: Devices,
+        *,
+        interval: float = 5,
+        max_workers: int = 16,
+        backoff: float = 2,
+        max_backoff: float = 60,
+        max_restarts: int = 5,
+        flap_window: float = 600,
+        recheck_delay: float = 1,
+        max_recovered: int = 1000,
+        on_recovered: Callable[[OutputIncident], None] = None,
+        history: "HistoryStore" = None,
+        fleet: "ShardedFleet" = None,
+    ):
+        super().__init__(
+            devices, interval=interval, max_workers=max_workers, fleet=fleet
+        )
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_restarts = max_restarts
+        self.flap_window = flap_window
+        self.recheck_delay = recheck_delay
+        self.on_recovered = on_recovered
+        self.history = history
+        self.recovered: Deque[OutputIncident] = deque(maxlen=max_recovered)
+        self._recovered_count = 0
+        self._recovery_total = 0.0
+        self._recovery_max = 0.0
+        self._states: Dict[Tuple[int, int], _OutputState] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def open_incidents(self) -> List[OutputIncident]:
+        return [s.incident for s in self._states.values()]
+
+    def stats(self) -> Dict[str, float]:
+        count = self._recovered_count
+        return {
+            "open": len(self._states),
+            "recovered": count,
+            "mean_time_to_recovery": self._recovery_total / count if count else 0.0,
+            "max_time_to_recovery": self._recovery_max,
+        }
+
+    def poll_once(self):
+        super().poll_once()
+        # forget the incidents of devices deleted meanwhile
+        rtmp_ids = {d.rtmp_id for d in self.devices}
+        with self._lock:
+            for key in [k for k in self._states if k[0] not in rtmp_ids]:
+                del self._states[key]
+
+    def poll_device(self, device: Device):
+        outputs = self._get_outputs(device.rtmp_id)
+        if self.history is not None:
+            self.history.record_outputs(device.name, device.rtmp_id, outputs)
+        if self._check_outputs(device, outputs) and self.recheck_delay:
+            # Don't wait for the next cycle to find out whether restart helped
+            time.sleep(self.recheck_delay)
+            self._check_outputs(
+                device,
+                self._server_connector.get_outputs(device.rtmp_id),
+                restart=False,
+            )
+
+    def _check_outputs(self, device: Device, outputs, restart: bool = True) -> bool:
+        restarted = False
+        for output in outputs:
+            key = (device.rtmp_id, output.id)
+            if output.enabled and not output.cloud:
+                state = self._failed(device, output)
+                if restart and self._should_restart(state):
+                    self._restart(state)
+                    restarted = True
+            elif key in self._states:
+                self._resolved(key, output)
+        output_ids = {o.id for o in outputs}
+        with self._lock:
+            gone = [
+                k
+                for k in self._states
+                if k[0] == device.rtmp_id and k[1] not in output_ids
+            ]
+            for key in gone:
+                del self._states[key]
+        return restarted
+
+    def _failed(self, device: Device, output: DeviceOutput) -> _OutputState:
+        key = (device.rtmp_id, output.id)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                incident = OutputIncident(
+                    device_name=device.name,
+                    rtmp_id=device.rtmp_id,
+                    output_id=output.id,
+                    title=output.title,
+                    detected_at=time.time(),
+                )
+                state = self._states[key] = _OutputState(incident=incident)
+                logger.warning(
+                    "Output %s of %s has connection issues", output.title, device.name
+                )
+        return state
+
+    def _should_restart(self, state: _OutputState) -> bool:
+        now = time.monotonic()
+        while state.restart_times and now - state.restart_times[0] > self.flap_window:
+            state.restart_times.popleft()
+        if len(state.restart_times) >= self.max_restarts:
+            if not state.damped:
+                logger.error(
+                    "Output %s of %s is flapping, restarts are suspended",
+                    state.incident.title,
+                    state.incident.device_name,
+                )
+            state.damped = True
+            return False
+        state.damped = False
+        return now >= state.next_attempt_at
+
+    def _restart(self, state: _OutputState):
+        incident = state.incident
+        state.restart_times.append(time.monotonic())
+        state.next_attempt_at = time.monotonic() + min(
+            self.backoff * 2 ** incident.restarts, self.max_backoff
+        )
+        incident.restarts += 1
+        logger.info(
+            "Restarting output %s of %s (attempt %s)",
+            incident.title,
+            incident.device_name,
+            incident.restarts,
+        )
+        self._server_connector.stop_output(incident.rtmp_id, incident.output_id)
+        self._server_connector.start_output(incident.rtmp_id, incident.output_id)
+
+    def _resolved(self, key: Tuple[int, int], output: DeviceOutput):
+        with self._lock:
+            state = self._states.pop(key, None)
+        if state is None:
+            return
+        incident = state.incident
+        if not output.cloud:
+            logger.info("Output %s was stopped, incident closed", incident.title)
+            return
+        incident.recovered_at = time.time()
+        with self._lock:
+            self.recovered.append(incident)
+            self._recovered_count += 1
+            self._recovery_total += incident.time_to_recovery
+            self._recovery_max = max(self._recovery_max, incident.time_to_recovery)
+        logger.info(
+            "Output %s of %s recovered in %.1fs",
+            incident.title,
+            incident.device_name,
+            incident.time_to_recovery,
+        )
+        if self.on_recovered is not None:
+            self.on_recovered(incident)
@@ -0,0 +1,260 @@
+"""Output templates, fanned out to many devices at once.
+
+    template = Template.from_outputs("sport", api.devices["EN"].outputs)
+    results = fan_out(
+        api.server_connector,
+        template,
+        {"DE": {"key_0": "...", "key_1": "..."}, "FR": {...}},
+    )
+
+Titles, urls and keys of a template are `str.format` strings, every device
+gets its own parameters (plus `{device}`, its name). Facecast doesn't give
+shared keys of existing outputs back, a copied template has a `{key_<i>}`
+placeholder per output instead.
+
+All templates are rendered before the first request. Devices are resolved
+with one `get_devices()`, then the deletes and creates are planned as one
+journal job (see `facecast_io.journal`), so a failed or interrupted fan-out
+is resumed without creating outputs twice. Devices are worked on
+concurrently and get a single final `get_outputs()` each.
+"""
+import contextvars
+import json
+import os
+import string
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+import attr
+from attr import attrib, dataclass
+
+from .entities import DeviceOutput, Stream
+from .errors import DeviceNotFound, TemplateError
+from .journal import Journal
+from .logger_setup import logger
+from .models import DeviceOutputs
+from .server_connector import ServerConnector
+
+__all__ = [
+    "FanOutResult",
+    "OutputTemplate",
+    "TEMPLATE_DIR",
+    "Template",
+    "fan_out",
+    "plan_fan_out",
+    "run_fan_out",
+]
+
+TEMPLATE_DIR = Path(
+    os.getenv("FACECAST_TEMPLATE_DIR", Path.home() / ".facecast" / "templates")
+)
+
+
+def _fields(value: str) -> List[str]:
+    return [f for _, f, _, _ in string.Formatter().parse(value) if f]
+
+
+def _literal(value: str) -> str:
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+@dataclass
+class OutputTemplate:
+    title: str
+    server_url: str
+    shared_key: str
+
+    @property
+    def fields(self) -> List[str]:
+        return [
+            f
+            for value in (self.title, self.server_url, self.shared_key)
+            for f in _fields(value)
+        ]
+
+    def render(self, params: Mapping[str, str]) -> Stream:
+        return Stream(
+            name=self.title.format_map(params),
+            server_url=self.server_url.format_map(params),
+            shared_key=self.shared_key.format_map(params),
+        )
+
+
+@dataclass
+class Template:
+    name: str
+    outputs: List[OutputTemplate] = attrib(factory=list)
+
+    @property
+    def fields(self) -> List[str]:
+        """Parameters the template needs, in order of appearance"""
+        fields: List[str] = []
+        for o in self.outputs:
+            fields.extend(f for f in o.fields if f not in fields)
+        return fields
+
+    @classmethod
+    def from_outputs(cls, name: str, outputs: DeviceOutputs) -> "Template":
+        return cls(
+            name,
+            [
+                OutputTemplate(
+                    _literal(o.output.title),
+                    _literal(o.output.server_url),
+                    f"{{key_{i}}}",
+                )
+                for i, o in enumerate(outputs)
+            ],
+        )
+
+    def render(self, device: str, params: Mapping[str, str]) -> List[Stream]:
+        params = dict(params, device=device)
+        missing = [f for f in self.fields if f not in params]
+        if missing:
+            raise TemplateError(
+                f"{self.name}: no {', '.join(missing)} for device {device}"
+            )
+        return [o.render(params) for o in self.outputs]
+
+    @classmethod
+    def load(cls, path: Path) -> "Template":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["name"], [OutputTemplate(**o) for o in data["outputs"]])
+
+    def save(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(attr.asdict(self), f, indent=4)
+
+
+@dataclass
+class FanOutResult:
+    device_name: str
+    rtmp_id: int
+    streams: List[Stream]
+    errors: Dict[str, str] = attrib(factory=dict)
+    outputs: List[DeviceOutput] = attrib(factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def plan_fan_out(
+    server_connector: ServerConnector,
+    template: Template,
+    params: Mapping[str, Mapping[str, str]],
+    *,
+    replace: bool = False,
+    max_workers: int = 16,
+) -> Journal:
+    """Journal job creating outputs of `template` on every device of `params`
+    (device name → its parameters), deleting existing outputs first with
+    `replace`"""
+    sc = server_connector
+    rendered = {name: template.render(name, p) for name, p in params.items()}
+    rtmp_ids = {d.name: d.rtmp_id for d in sc.get_devices()}
+    missing = [name for name in rendered if name not in rtmp_ids]
+    if missing:
+        raise DeviceNotFound(", ".join(missing))
+    existing: Dict[str, List[int]] = {name: [] for name in rendered}
+    if replace:
+        with ThreadPoolExecutor(max_workers) as pool:
+            outputs = [
+                pool.submit(contextvars.copy_context().run, sc.get_outputs, rtmp_ids[n])
+                for n in rendered
+            ]
+            for name, future in zip(rendered, outputs):
+                existing[name] = [o.id for o in future.result()]
+
+    operations = []
+    for name, streams in rendered.items():
+        device = {"rtmp_id": rtmp_ids[name], "name": name}
+        for output_id in existing[name]:
+            delete = dict(device, output_id=output_id)
+            operations.append((f"{name}/delete:{output_id}", "delete_output", delete))
+        # one after another, facecast lists outputs in the order of creation
+        for i, stream in enumerate(streams):
+            create = dict(
+                device,
+                title=stream.name,
+                server_url=stream.server_url,
+                shared_key=stream.shared_key,
+            )
+            operations.append((f"{name}/create:{i}", "create_output", create))
+    return Journal.create(
+        "template", operations, template=template.name, names=list(rendered)
+    )
+
+
+def run_fan_out(
+    server_connector: ServerConnector,
+    journal: Journal,
+    *,
+    max_workers: int = 16,
+) -> List[FanOutResult]:
+    """Runs (or resumes) a job of `plan_fan_out`, a device stops at its first
+    failed operation, the others go on"""
+    sc = server_connector
+    results: Dict[str, FanOutResult] = {}
+    for op in journal.operations.values():
+        p = op.params
+        result = results.get(p["name"])
+        if result is None:
+            result = results[p["name"]] = FanOutResult(p["name"], p["rtmp_id"], [])
+        if op.action == "create_output":
+            stream = Stream(
+                name=p["title"], server_url=p["server_url"], shared_key=p["shared_key"]
+            )
+            result.streams.append(stream)
+
+    error: Optional[Exception] = None
+    try:
+        journal.run(sc, max_workers=max_workers)
+    except Exception as e:
+        error = e
+    for op in journal.pending:
+        result = results[op.params["name"]]
+        if result.ok:
+            # a device stops at its first pending operation
+            step = op.action.split("_")[0]
+            if op.action == "delete_output":
+                step = f"{step}:{op.params['output_id']}"
+            result.errors[step] = op.error or f"not run: {error!r}"
+            logger.error("%s: %s %s", result.device_name, step, result.errors[step])
+
+    def refresh(result: FanOutResult):
+        try:
+            result.outputs = list(sc.get_outputs(result.rtmp_id))
+        except Exception as e:
+            logger.error("%s: refresh failed: %r", result.device_name, e)
+            result.errors["refresh"] = repr(e)
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        # every task gets its own copy of the caller's context (tracing)
+        for r in results.values():
+            pool.submit(contextvars.copy_context().run, refresh, r)
+    logger.info(
+        "Template job %s is applied to %s/%s devices",
+        journal.job_id,
+        sum(r.ok for r in results.values()),
+        len(results),
+    )
+    return list(results.values())
+
+
+def fan_out(
+    server_connector: ServerConnector,
+    template: Template,
+    params: Mapping[str, Mapping[str, str]],
+    *,
+    replace: bool = False,
+    max_workers: int = 16,
+) -> List[FanOutResult]:
+    """Plans and runs the fan-out of `template`, see `plan_fan_out`"""
+    journal = plan_fan_out(
+        server_connector, template, params, replace=replace, max_workers=max_workers
+    )
+    return run_fan_out(server_connector, journal, max_workers=max_workers)
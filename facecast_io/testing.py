@@ -0,0 +1,328 @@
+"""In-memory imitation of the facecast.io endpoints used by `ServerConnector`.
+
+Plug it into an httpx client to run flows offline:
+
+    service = FakeFacecast(latency=0.05)
+    client = httpx.Client(base_url=FAKE_BASE_URL, dispatch=service)
+"""
+import json
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl
+
+from httpx import ConnectTimeout, Request, Response
+
+__all__ = ["FakeFacecast", "FAKE_BASE_URL", "FAKE_SERVERS"]
+
+FAKE_BASE_URL = "https://fake.facecast.io/"
+
+FAKE_SERVERS = [
+    {
+        "id": 11,
+        "name": "Frankfurt",
+        "url": "rtmp://de.facecast.io/live",
+        "geo": {"lat": 50.1, "long": 8.6},
+        "can_connect": True,
+    },
+    {
+        "id": 12,
+        "name": "Amsterdam",
+        "url": "rtmp://nl.facecast.io/live",
+        "geo": {"lat": 52.3, "long": 4.9},
+        "can_connect": True,
+    },
+]
+
+LOGIN_PAGE = "<html><script>var auth = {signature: 'fakesignature'};</script></html>"
+MAIN_PAGE = (
+    "<html><script>var app = {{form_sign: '{form_sign}'}};</script>"
+    '<div class="sb-streamboxes-main-list">{devices}</div></html>'
+)
+DEVICE_ITEM = (
+    '<a href="/en/rtmp?rtmp_id={rtmp_id}">'
+    '<span class="sb-streambox-item-name">{name}</span></a>'
+)
+SERVERS_PAGE = "<html><script>var servers = '{servers}';</script></html>"
+
+
+class FakeFacecast:
+    """Duck-typed httpx dispatcher which keeps devices and outputs in memory"""
+
+    def __init__(
+        self,
+        *,
+        username: str = "user@example.com",
+        password: str = "password",
+        latency: float = 0.0,
+    ):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.form_sign = "fakesign1"
+        self.devices: Dict[int, dict] = {}
+        self.requests: List[Tuple[str, str, Optional[str]]] = []
+        # paths which time out as if the endpoint was down
+        self.down: Set[str] = set()
+        self._sessions: Dict[str, bool] = {}
+        self._next_rtmp_id = 1000
+        self._next_output_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def request_count(self) -> int:
+        return len(self.requests)
+
+    def count(self, path: str, cmd: str = None) -> int:
+        counter = Counter(
+            (p, c) if cmd is not None else p for _, p, c in self.requests
+        )
+        return counter[(path, cmd) if cmd is not None else path]
+
+    def add_device(self, name: str, outputs: int = 0) -> int:
+        with self._lock:
+            rtmp_id = self._add_device(name)
+            for i in range(outputs):
+                self._add_output(rtmp_id, f"Output {i}", f"rtmp://out{i}.example.com/live")
+        return rtmp_id
+
+    def expire_sessions(self):
+        with self._lock:
+            self._sessions.clear()
+            self.form_sign = f"fakesign{int(self.form_sign[8:]) + 1}"
+
+    def close(self):
+        pass
+
+    def send(self, request: Request, timeout=None) -> Response:
+        if self.latency:
+            time.sleep(self.latency)
+        form = dict(parse_qsl(request.read().decode()))
+        path = request.url.path
+        query = dict(parse_qsl(request.url.query, keep_blank_values=True))
+        with self._lock:
+            self.requests.append(
+                (request.method, path, form.get("cmd") or form.get("action"))
+            )
+            if path in self.down:
+                raise ConnectTimeout(request=request)
+            status, headers, body = self._route(request, path, query, form)
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+            headers.append(("Content-Type", "application/json"))
+        return Response(
+            status, request=request, headers=headers, content=body.encode()
+        )
+
+    def _session(self, request: Request) -> Optional[str]:
+        cookies = request.headers.get("cookie", "")
+        for cookie in cookies.split(";"):
+            key, _, value = cookie.strip().partition("=")
+            if key == "sid" and value in self._sessions:
+                return value
+        return None
+
+    def _route(self, request: Request, path: str, query: dict, form: dict):
+        authorized = self._session(request) is not None
+        if path == "/en/login":
+            return self._login(form)
+        if path in ("/", "/en/main"):
+            if not authorized:
+                return 200, [], LOGIN_PAGE
+            return 200, [], self._main_page()
+        if not authorized:
+            return 200, [], "No auth"
+        if path == "/en/rtmp":
+            rtmp_id = int(query["rtmp_id"])
+            if rtmp_id not in self.devices:
+                return 302, [("Location", "/en/main")], ""
+            return 200, [], self._device_info(rtmp_id)
+        if path == "/en/rtmp_server" and query.get("mode") == "":
+            return 200, [], SERVERS_PAGE.format(servers=json.dumps(FAKE_SERVERS))
+        if form.get("sign") != self.form_sign:
+            return 200, [], "No auth"
+        if path == "/en/main_add/ajaj":
+            self._add_device(form["title"])
+            return 200, [], {"ok": True}
+        if path == "/en/rtmp_popup_menu/ajaj":
+            self.devices.pop(int(form["rtmp_id"]), None)
+            return 200, [], {"ok": True}
+        rtmp_id = int(form["rtmp_id"])
+        if rtmp_id not in self.devices:
+            return 200, [], {"ok": False, "message": "Device not found"}
+        if path == "/en/rtmp/ajaj":
+            return 200, [], self._device_status(rtmp_id)
+        if path == "/en/rtmp_outputs/ajaj":
+            return 200, [], list(self.devices[rtmp_id]["outputs"].values())
+        if path == "/en/rtmp_server/ajaj":
+            self._select_server(rtmp_id, int(form["server_id"]))
+            return 200, [], {"ok": True}
+        if path == "/en/out_rtmp_rtmp/ajaj":
+            return 200, [], self._output_command(rtmp_id, form)
+        return 404, [], "Not found"
+
+    def _login(self, form: dict):
+        if form.get("login") == self.username and form.get("pass") == self.password:
+            sid = f"session{len(self._sessions) + 1}"
+            self._sessions[sid] = True
+            return 200, [("Set-Cookie", f"sid={sid}; Path=/")], {"ok": True}
+        return 200, [], {"ok": False, "message": "Wrong login or password"}
+
+    def _main_page(self) -> str:
+        devices = "".join(
+            DEVICE_ITEM.format(rtmp_id=rtmp_id, name=d["name"])
+            for rtmp_id, d in self.devices.items()
+        )
+        return MAIN_PAGE.format(form_sign=self.form_sign, devices=devices)
+
+    def _add_device(self, name: str) -> int:
+        self._next_rtmp_id += 1
+        rtmp_id = self._next_rtmp_id
+        self.devices[rtmp_id] = {
+            "name": name,
+            "server_id": FAKE_SERVERS[0]["id"],
+            "backup_server_id": FAKE_SERVERS[1]["id"],
+            "shared_key": f"key{rtmp_id}",
+            "main_online": True,
+            "backup_online": True,
+            "bw_in": 4500000,
+            "dropped": 0,
+            "outputs": {},
+        }
+        return rtmp_id
+
+    def _select_server(self, rtmp_id: int, server_id: int):
+        device = self.devices[rtmp_id]
+        if server_id != device["backup_server_id"]:
+            device["server_id"] = server_id
+            return
+        # the signal stays with the server, the former main becomes the backup
+        device.update(
+            server_id=server_id,
+            backup_server_id=device["server_id"],
+            main_online=device["backup_online"],
+            backup_online=device["main_online"],
+        )
+
+    def _add_output(self, rtmp_id: int, title: str, server_url: str) -> dict:
+        output = {
+            "id": self._next_output_id,
+            "descr": title,
+            "enabled": False,
+            "type": "rtmp_rtmp",
+            "cloud": False,
+            "server_url": server_url,
+        }
+        self._next_output_id += 1
+        self.devices[rtmp_id]["outputs"][output["id"]] = output
+        return output
+
+    def _device_info(self, rtmp_id: int) -> dict:
+        return {
+            "rtmp_id": rtmp_id,
+            "online": self.devices[rtmp_id]["main_online"],
+            "type": "rtmp_source",
+            "lang": "en",
+            "updates": False,
+            "form_sign": self.form_sign,
+        }
+
+    def _device_status(self, rtmp_id: int) -> dict:
+        device = self.devices[rtmp_id]
+        servers = {s["id"]: s for s in FAKE_SERVERS}
+        main = servers[device["server_id"]]
+        backup = servers[device["backup_server_id"]]
+        signal = {"ok": True, "resolution": "1920x1080", "fps": 30, "status": "ok"}
+        no_signal = {"ok": False, "status": "no signal"}
+        return {
+            "get_status": {
+                "ok": True,
+                "server": main["name"],
+                "server_id": main["id"],
+                "is_online": device["main_online"],
+                "connected": True,
+                "backup_server": {
+                    "selected": True,
+                    "server_id": backup["id"],
+                    "server_name": backup["name"],
+                    "input_signal": device["backup_online"],
+                },
+                "s": self._ingest_stats(device) if device["main_online"] else None,
+                "input_url": main["url"],
+                "sharedkey": device["shared_key"],
+                "ping": True,
+                "time": time.time(),
+            },
+            "input_status": {
+                "main": signal if device["main_online"] else no_signal,
+                "backup": signal if device["backup_online"] else no_signal,
+                "time": time.time(),
+            },
+        }
+
+    def _ingest_stats(self, device: dict) -> dict:
+        bw_in = device["bw_in"]
+        return {
+            "name": device["shared_key"],
+            "time": "3600000",
+            "bw_in": str(bw_in),
+            "bytes_in": str(bw_in * 450),
+            "bw_out": "0",
+            "bytes_out": "0",
+            "bw_audio": str(min(bw_in, 128000)),
+            "bw_video": str(max(bw_in - 128000, 0)),
+            "client": [
+                {
+                    "id": "1",
+                    "address": "127.0.0.1",
+                    "time": "3600000",
+                    "flashver": "FMLE/3.0",
+                    "swfurl": "",
+                    "dropped": str(device["dropped"]),
+                    "timestamp": "3600000",
+                    "avsync": [],
+                    "active": [],
+                }
+            ],
+            "meta": {
+                "video": {
+                    "width": "1920",
+                    "height": "1080",
+                    "frame_rate": "30",
+                    "codec": "H264",
+                    "profile": "High",
+                    "compat": "0",
+                    "level": "4.1",
+                },
+                "audio": {
+                    "codec": "AAC",
+                    "profile": "LC",
+                    "channels": "2",
+                    "sample_rate": "48000",
+                },
+            },
+            "nclients": "1",
+            "publishing": [],
+            "active": [],
+        }
+
+    def _output_command(self, rtmp_id: int, form: dict) -> dict:
+        outputs = self.devices[rtmp_id]["outputs"]
+        cmd = form["cmd"]
+        if cmd == "add":
+            self._add_output(rtmp_id, form["descr"], form["server_url"])
+            return {"ok": True, "outputs": list(outputs.values())}
+        output = outputs.get(int(form["oid"]))
+        if output is None:
+            return {"ok": False, "message": "Output not found", "outputs": []}
+        if cmd == "delete":
+            del outputs[output["id"]]
+            return {"ok": True, "outputs": list(outputs.values())}
+        if cmd == "update":
+            output.update(descr=form["title"], server_url=form["server_url"])
+            return output
+        if cmd in ("start", "stop"):
+            output["enabled"] = output["cloud"] = cmd == "start"
+            return {"ok": True, "enabled": output["enabled"]}
+        return {"ok": False, "message": f"Unknown command {cmd}"}
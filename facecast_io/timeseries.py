@@ -0,0 +1,371 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from attr import dataclass
+
+from .entities import InputDeviceStatusS
+from .models import Device, Devices
+from .polling import FleetPoller
+
+if TYPE_CHECKING:
+    from .sharding import ShardedFleet
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # numpy is optional, stats fall back to pure python
+    np = None
+
+__all__ = [
+    "RingBuffer",
+    "Rollup",
+    "IngestSeries",
+    "IngestStats",
+    "IngestCollector",
+    "to_number",
+]
+
+UINT16_MAX = 0xFFFF
+UINT32_MAX = 0xFFFFFFFF
+# (bucket seconds, retention seconds) of the averaged tiers behind raw samples
+ROLLUPS: Sequence[Tuple[int, float]] = ((60, 3 * 3600), (300, 24 * 3600))
+
+
+def to_number(value: Optional[str]) -> float:
+    try:
+        return float(value)  # type: ignore
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RingBuffer:
+    """Fixed-size circular buffer over a typed `array`"""
+
+    __slots__ = ("_data", "_capacity", "_head", "_size")
+
+    def __init__(self, capacity: int, typecode: str = "I"):
+        self._data = array(typecode, bytes(capacity * array(typecode).itemsize))
+        self._capacity = capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.itemsize * self._capacity
+
+    def append(self, value):
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+
+    def values(self, last: int = None) -> array:
+        """Copy of the `last` (all by default) values, oldest first"""
+        size = self._size if last is None else min(last, self._size)
+        start = (self._head - size) % self._capacity
+        if start + size <= self._capacity:
+            return self._data[start : start + size]
+        return self._data[start:] + self._data[: self._head]
+
+
+@dataclass
+class IngestStats:
+    samples: int
+    min_kbps: float
+    mean_kbps: float
+    p95_kbps: float
+    dropped: int
+    drop_rate: float  # dropped frames per second
+
+
+def _percentile_index(size: int, q: float) -> int:
+    return min(size - 1, int(round(q / 100 * (size - 1))))
+
+
+class Rollup:
+    """Ingest samples averaged into `step` seconds buckets.
+
+    Every bucket takes 14 bytes: start time, samples count, min and mean
+    kbit/s of total ingest and the frames dropped within the bucket.
+    """
+
+    def __init__(self, step: int, capacity: int):
+        self.step = step
+        self.time = RingBuffer(capacity, "I")
+        self.count = RingBuffer(capacity, "H")
+        self.bw_min = RingBuffer(capacity, "H")
+        self.bw_mean = RingBuffer(capacity, "H")
+        self.dropped = RingBuffer(capacity, "I")
+        self._bucket: Optional[int] = None
+        self._count = self._sum = self._dropped = 0
+        self._min = UINT16_MAX
+
+    def __len__(self):
+        return len(self.time) + (1 if self._count else 0)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            b.nbytes
+            for b in (self.time, self.count, self.bw_min, self.bw_mean, self.dropped)
+        )
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.time) == self.time._capacity
+
+    def add(self, at: int, bw_in: int, dropped: int):
+        bucket = at // self.step
+        if bucket != self._bucket:
+            self._flush()
+            self._bucket = bucket
+        self._count += 1
+        self._sum += bw_in
+        self._min = min(self._min, bw_in)
+        self._dropped += dropped
+
+    def _flush(self):
+        if not self._count:
+            return
+        self.time.append(self._bucket * self.step)
+        self.count.append(min(self._count, UINT16_MAX))
+        self.bw_min.append(self._min)
+        self.bw_mean.append(self._sum // self._count)
+        self.dropped.append(min(self._dropped, UINT32_MAX))
+        self._count = self._sum = self._dropped = 0
+        self._min = UINT16_MAX
+
+    def buckets(self) -> List[Tuple[int, int, int, int, int]]:
+        """(time, count, min, mean, dropped) of every bucket, oldest first,
+        the bucket being filled included"""
+        buckets = list(
+            zip(
+                self.time.values(),
+                self.count.values(),
+                self.bw_min.values(),
+                self.bw_mean.values(),
+                self.dropped.values(),
+            )
+        )
+        if self._count:
+            buckets.append(
+                (
+                    self._bucket * self.step,
+                    self._count,
+                    self._min,
+                    self._sum // self._count,
+                    self._dropped,
+                )
+            )
+        return buckets
+
+    def stats(self, window: float = None) -> Optional[IngestStats]:
+        """Approximate stats of the buckets started within the last `window`
+        seconds, p95 is taken over the bucket means"""
+        buckets = self.buckets()
+        if window is not None and buckets:
+            since = buckets[-1][0] - window
+            buckets = [b for b in buckets if b[0] > since]
+        if not buckets:
+            return None
+        samples = sum(b[1] for b in buckets)
+        means = sorted(b[3] for b in buckets)
+        total_dropped = sum(b[4] for b in buckets)
+        duration = max(buckets[-1][0] - buckets[0][0] + self.step, 1)
+        return IngestStats(
+            samples=samples,
+            min_kbps=float(min(b[2] for b in buckets)),
+            mean_kbps=sum(b[1] * b[3] for b in buckets) / samples,
+            p95_kbps=float(means[_percentile_index(len(means), 95)]),
+            dropped=total_dropped,
+            drop_rate=total_dropped / duration,
+        )
+
+
+class IngestSeries:
+    """Compact ingest samples of one device.
+
+    Every sample takes 12 bytes: time (seconds since `epoch`), kbit/s of
+    total/video/audio ingest (uint16, capped at ~65 Mbit/s) and frames
+    dropped since the previous sample. The last `capacity` samples are kept
+    as is, older ones only survive averaged in the `rollups`.
+    """
+
+    def __init__(
+        self, capacity: int, epoch: float, rollups: Sequence[Tuple[int, int]] = ()
+    ):
+        self.epoch = epoch
+        self.rollups = [Rollup(step, size) for step, size in rollups]
+        self.time = RingBuffer(capacity, "I")
+        self.bw_in = RingBuffer(capacity, "H")
+        self.bw_video = RingBuffer(capacity, "H")
+        self.bw_audio = RingBuffer(capacity, "H")
+        self.dropped = RingBuffer(capacity, "H")
+        self.meta: Dict[str, str] = {}
+        self._last_dropped = 0
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            b.nbytes
+            for b in (self.time, self.bw_in, self.bw_video, self.bw_audio, self.dropped)
+        ) + sum(r.nbytes for r in self.rollups)
+
+    def add(self, s: Optional[InputDeviceStatusS], at: float = None):
+        at = time.time() if at is None else at
+        seconds = min(int(at - self.epoch), UINT32_MAX)
+        self.time.append(seconds)
+        bw_in, dropped = self._add(s)
+        for rollup in self.rollups:
+            rollup.add(seconds, bw_in, dropped)
+
+    def _add(self, s: Optional[InputDeviceStatusS]) -> Tuple[int, int]:
+        if s is None:
+            for buffer in (self.bw_in, self.bw_video, self.bw_audio, self.dropped):
+                buffer.append(0)
+            self._last_dropped = 0
+            return 0, 0
+
+        bw_in = min(int(to_number(s.bw_in) / 1000), UINT16_MAX)
+        self.bw_in.append(bw_in)
+        self.bw_video.append(min(int(to_number(s.bw_video) / 1000), UINT16_MAX))
+        self.bw_audio.append(min(int(to_number(s.bw_audio) / 1000), UINT16_MAX))
+        dropped = int(sum(to_number(c.dropped) for c in s.client))
+        # counter starts over when the encoder reconnects
+        delta = dropped - self._last_dropped if dropped >= self._last_dropped else dropped
+        delta = min(delta, UINT16_MAX)
+        self.dropped.append(delta)
+        self._last_dropped = dropped
+        video, audio = s.meta.video, s.meta.audio
+        self.meta = {
+            "video_codec": video.codec,
+            "resolution": f"{video.width}x{video.height}",
+            "frame_rate": video.frame_rate,
+            "audio_codec": audio.codec,
+            "sample_rate": audio.sample_rate,
+        }
+        return bw_in, delta
+
+    def _window(self, window: Optional[float]) -> int:
+        if window is None or not len(self):
+            return len(self)
+        times = self.time.values()
+        return len(times) - bisect_left(times, times[-1] - window)
+
+    def stats(self, window: float = None) -> Optional[IngestStats]:
+        """Bitrate and drop statistics over the last `window` seconds, windows
+        longer than the raw samples are answered from the rollups"""
+        if self.rollups and self._beyond_raw(window):
+            return self._rollup_for(window).stats(window)
+        return self._raw_stats(window)
+
+    def _rollup_for(self, window: Optional[float]) -> Rollup:
+        if window is not None:
+            for rollup in self.rollups:
+                if not rollup.is_full or rollup.step * len(rollup.time) >= window:
+                    return rollup
+        return self.rollups[-1]
+
+    def _beyond_raw(self, window: Optional[float]) -> bool:
+        if len(self.time) < self.time._capacity:
+            return False
+        times = self.time.values()
+        return window is None or times[-1] - times[0] < window
+
+    def _raw_stats(self, window: float = None) -> Optional[IngestStats]:
+        count = self._window(window)
+        if not count:
+            return None
+        times = self.time.values(count)
+        duration = max(times[-1] - times[0], 1)
+        bw_in, dropped = self.bw_in.values(count), self.dropped.values(count)
+        if np is not None:
+            bw = np.frombuffer(bw_in, dtype=np.uint16)
+            total_dropped = int(np.frombuffer(dropped, dtype=np.uint16).sum())
+            return IngestStats(
+                samples=count,
+                min_kbps=float(bw.min()),
+                mean_kbps=float(bw.mean()),
+                p95_kbps=float(np.sort(bw)[_percentile_index(count, 95)]),
+                dropped=total_dropped,
+                drop_rate=total_dropped / duration,
+            )
+        total_dropped = sum(dropped)
+        return IngestStats(
+            samples=count,
+            min_kbps=float(min(bw_in)),
+            mean_kbps=sum(bw_in) / count,
+            p95_kbps=float(sorted(bw_in)[_percentile_index(count, 95)]),
+            dropped=total_dropped,
+            drop_rate=total_dropped / duration,
+        )
+
+
+class IngestCollector(FleetPoller):
+    """Keeps `retention` seconds of ingest samples for every device.
+
+    Raw samples are kept for `raw_retention` seconds, older ones as 1 and 5
+    minutes averages (`rollups`): 24 h of 5 s samples take ~9 KB per device.
+    """
+
+    reads = ("status",)
+
+    def __init__(
+        self,
+        devices: Devices,
+        *,
+        interval: float = 5,
+        retention: float = 24 * 3600,
+        raw_retention: float = 900,
+        rollups: Sequence[Tuple[int, float]] = ROLLUPS,
+        max_workers: int = 16,
+        fleet: "ShardedFleet" = None,
+    ):
+        super().__init__(
+            devices, interval=interval, max_workers=max_workers, fleet=fleet
+        )
+        raw_retention = min(raw_retention, retention)
+        self.capacity = int(raw_retention // interval)
+        self.rollups = [
+            (step, int(min(kept, retention) // step))
+            for step, kept in rollups
+            if step > interval and kept > raw_retention
+        ]
+        self.epoch = time.time()
+        self.series: Dict[int, IngestSeries] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self.series.values())
+
+    def get_series(self, rtmp_id: int) -> IngestSeries:
+        with self._lock:
+            series = self.series.get(rtmp_id)
+            if series is None:
+                series = self.series[rtmp_id] = IngestSeries(
+                    self.capacity, self.epoch, self.rollups
+                )
+            return series
+
+    def poll_device(self, device: Device):
+        status = self._get_status(device.rtmp_id)
+        self.get_series(device.rtmp_id).add(status.status.s)
+
+    def stats(
+        self, window: float = None, rtmp_ids: Iterable[int] = None
+    ) -> Dict[int, IngestStats]:
+        rtmp_ids = list(self.series) if rtmp_ids is None else rtmp_ids
+        result = {}
+        for rtmp_id in rtmp_ids:
+            stats = self.series[rtmp_id].stats(window)
+            if stats is not None:
+                result[rtmp_id] = stats
+        return result
@@ -0,0 +1,181 @@
+"""Opt-in tracing of composite operations.
+
+    with tracing() as trace:
+        api.create_device_and_outputs(name, streams)
+    print(trace.format_tree())
+    trace.save_chrome("trace.json")  # chrome://tracing or ui.perfetto.dev
+
+Every `@traced` call and every HTTP request becomes a span, retry sleeps are
+picked up from the warnings the `retry` package writes before sleeping.
+Nothing is recorded (and almost nothing is paid) outside of `tracing()`.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Union
+
+from .logger_setup import logger
+
+__all__ = ["Span", "Trace", "span", "traced", "tracing"]
+
+# message which `retry` logs right before sleeping
+RETRY_MESSAGE = "%s, retrying in %s seconds..."
+
+_current_span = contextvars.ContextVar(
+    "facecast_span", default=None
+)  # type: contextvars.ContextVar[Optional[Span]]
+
+
+class Span:
+    __slots__ = ("name", "kind", "start", "end", "thread_id", "attrs", "children")
+
+    def __init__(self, name: str, kind: str = "call", **attrs):
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+        self.children: List["Span"] = []
+
+    def __repr__(self):
+        return f"Span <{self.name} - {self.duration:.3f}s>"
+
+    @property
+    def duration(self) -> float:
+        end = time.perf_counter() if self.end is None else self.end
+        return end - self.start
+
+    @property
+    def requests(self) -> int:
+        own = 1 if self.kind == "request" else 0
+        return own + sum(c.requests for c in self.children)
+
+    @property
+    def sleep(self) -> float:
+        own = self.duration if self.kind == "sleep" else 0.0
+        return own + sum(c.sleep for c in self.children)
+
+    def walk(self, depth: int = 0) -> Iterator[tuple]:
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+class _RetrySleepHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord):
+        parent = _current_span.get()
+        if parent is None or record.msg != RETRY_MESSAGE:
+            return
+        error, delay = record.args  # type: ignore
+        sleep = Span(f"retry sleep after {error!r}", "sleep")
+        sleep.end = sleep.start + float(delay)
+        parent.children.append(sleep)
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.root = Span(name)
+        self._epoch = self.root.start
+
+    def format_tree(self) -> str:
+        lines = []
+        for depth, s in self.root.walk():
+            line = f"{'  ' * depth}{s.name}  {s.duration * 1000:.1f}ms"
+            if s.kind == "call":
+                line += f"  requests={s.requests}"
+                if s.sleep:
+                    line += f"  sleep={s.sleep * 1000:.1f}ms"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_chrome(self) -> dict:
+        pid = os.getpid()
+        events = []
+        for _, s in self.root.walk():
+            args = dict(s.attrs, requests=s.requests, sleep=round(s.sleep, 6))
+            events.append(
+                {
+                    "name": s.name,
+                    "cat": s.kind,
+                    "ph": "X",
+                    "ts": round((s.start - self._epoch) * 1e6, 1),
+                    "dur": round(s.duration * 1e6, 1),
+                    "pid": pid,
+                    "tid": s.thread_id,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome(self, path: Union[str, Path]):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome(), f)
+
+
+_handler = _RetrySleepHandler()
+_active = 0
+_active_lock = threading.Lock()
+
+
+@contextmanager
+def tracing(name: str = "trace") -> Iterator[Trace]:
+    global _active
+    trace = Trace(name)
+    with _active_lock:
+        if not _active:
+            logger.addHandler(_handler)
+        _active += 1
+    token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(token)
+        trace.root.end = time.perf_counter()
+        with _active_lock:
+            _active -= 1
+            if not _active:
+                logger.removeHandler(_handler)
+
+
+@contextmanager
+def span(name: str, kind: str = "call", **attrs) -> Iterator[Optional[Span]]:
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, kind, **attrs)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def traced(name: str = None, label: Callable[..., str] = None):
+    """Record calls as spans, `label(*args, **kwargs)` is appended to the name"""
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            full_name = span_name
+            if label is not None:
+                full_name = f"{span_name} {label(*args, **kwargs)}"
+            with span(full_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
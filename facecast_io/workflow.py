@@ -0,0 +1,299 @@
+"""Dependency graphs of steps, pipelined across many devices.
+
+    executor = WorkflowExecutor(max_workers=16)
+    results = executor.run(
+        [device_setup(api.devices, name, streams, start=True) for name, streams in plan]
+    )
+
+Steps of all workflows share one thread pool, a step is submitted as soon
+as the steps it requires are done, so one device can be creating outputs
+while another is still waiting to appear. A failed step skips everything
+that depends on it, other workflows go on.
+"""
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from attr import attrib, dataclass
+
+from .entities import BaseDevice, Stream
+from .errors import DeviceNotCreated, FacecastAPIError
+from .logger_setup import logger
+from .models import Device, Devices
+from .server_connector import ServerConnector
+
+__all__ = [
+    "Step",
+    "Workflow",
+    "WorkflowExecutor",
+    "WorkflowResult",
+    "device_setup",
+    "poll_until",
+    "wait_for_device",
+]
+
+
+@dataclass
+class Step:
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    requires: Tuple[str, ...] = ()
+
+
+@dataclass
+class WorkflowResult:
+    name: str
+    context: Dict[str, Any]
+    errors: Dict[str, BaseException] = attrib(factory=dict)
+    skipped: List[str] = attrib(factory=list)
+    timings: Dict[str, float] = attrib(factory=dict)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.skipped
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+
+class Workflow:
+    """Steps get the shared `context`, their results are stored in it by name"""
+
+    def __init__(self, name: str, context: Dict[str, Any] = None):
+        self.name = name
+        self.context: Dict[str, Any] = context if context is not None else {}
+        self.steps: Dict[str, Step] = {}
+
+    def __repr__(self):
+        return f"Workflow <{self.name}: {list(self.steps)}>"
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any]], Any],
+        requires: Sequence[str] = (),
+    ) -> "Workflow":
+        if name in self.steps:
+            raise ValueError(f"Step {name} is already in {self.name}")
+        for required in requires:
+            if required not in self.steps:
+                # steps are added in order, which also rules out cycles
+                raise ValueError(f"Unknown step {required} required by {name}")
+        self.steps[name] = Step(name, fn, tuple(requires))
+        return self
+
+    def dependents(self, name: str) -> List[Step]:
+        return [s for s in self.steps.values() if name in s.requires]
+
+
+class WorkflowExecutor:
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _run_step(workflow: Workflow, step: Step, result: WorkflowResult):
+        started = time.perf_counter()
+        try:
+            workflow.context[step.name] = step.fn(workflow.context)
+        finally:
+            result.timings[step.name] = time.perf_counter() - started
+
+    def run(self, workflows: Sequence[Workflow]) -> List[WorkflowResult]:
+        results = [WorkflowResult(w.name, w.context) for w in workflows]
+        waiting: List[Dict[str, int]] = [
+            {s.name: len(s.requires) for s in w.steps.values()} for w in workflows
+        ]
+        futures: Dict[Future, Tuple[int, Step]] = {}
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+
+            def submit(index: int, step: Step):
+                # each step gets its own copy of the caller's context (tracing)
+                run = contextvars.copy_context().run
+                future = pool.submit(
+                    run, self._run_step, workflows[index], step, results[index]
+                )
+                futures[future] = (index, step)
+
+            for index, workflow in enumerate(workflows):
+                results[index].started_at = time.time()
+                for step in workflow.steps.values():
+                    if not step.requires:
+                        submit(index, step)
+
+            while futures:
+                done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, step = futures.pop(future)
+                    workflow, result = workflows[index], results[index]
+                    error = future.exception()
+                    if error is not None:
+                        logger.error(
+                            "%s: step %s failed: %r", workflow.name, step.name, error
+                        )
+                        result.errors[step.name] = error
+                        result.skipped.extend(self._skip(workflow, step.name))
+                    else:
+                        for dependent in workflow.dependents(step.name):
+                            waiting[index][dependent.name] -= 1
+                            if waiting[index][dependent.name] == 0:
+                                submit(index, dependent)
+                    if all(i != index for i, _ in futures.values()):
+                        result.finished_at = time.time()
+        return results
+
+    @staticmethod
+    def _skip(workflow: Workflow, failed: str) -> List[str]:
+        skipped: List[str] = []
+        stack = [failed]
+        while stack:
+            for dependent in workflow.dependents(stack.pop()):
+                if dependent.name not in skipped:
+                    skipped.append(dependent.name)
+                    stack.append(dependent.name)
+        return skipped
+
+
+def poll_until(
+    fn: Callable[[], Any],
+    *,
+    timeout: float = 30,
+    interval: float = 0.25,
+    factor: float = 1.5,
+    max_interval: float = 2,
+):
+    """Calls `fn` until it returns something truthy, with growing intervals,
+    None on timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = fn()
+        if result:
+            return result
+        if time.monotonic() + interval > deadline:
+            return None
+        time.sleep(interval)
+        interval = min(interval * factor, max_interval)
+
+
+def wait_for_device(
+    server_connector: ServerConnector, name: str, timeout: float = 30
+) -> BaseDevice:
+    def find() -> Optional[BaseDevice]:
+        # get_devices is coalesced, workflows waiting together share requests
+        for d in server_connector.get_devices():
+            if d.name == name:
+                return d
+        return None
+
+    device = poll_until(find, timeout=timeout)
+    if device is None:
+        raise DeviceNotCreated(f"{name} didn't appear in {timeout} seconds")
+    return device
+
+
+def device_setup(
+    devices: Devices,
+    name: str,
+    streams: Sequence[Stream],
+    *,
+    server_id: int = None,
+    start: bool = False,
+    timeout: float = 30,
+) -> Workflow:
+    """create → appear → clear outputs → outputs (in parallel) → start,
+    select_server runs next to the outputs.
+
+    The same result as `FacecastAPI.create_device_and_outputs`, an existing
+    device is reused and its outputs are replaced.
+    """
+    sc = devices._server_connector
+    workflow = Workflow(name)
+
+    def create(ctx):
+        if name in devices or any(d.name == name for d in sc.get_devices()):
+            return False
+        if not sc.create_device(name):
+            raise DeviceNotCreated(name)
+        return True
+
+    def appear(ctx) -> Device:
+        found = wait_for_device(sc, name, timeout)
+        with devices._lock:
+            if found.rtmp_id in devices:
+                device = devices[found.rtmp_id]
+            else:
+                device = Device(sc, name, found.rtmp_id, devices.server_catalog)
+                devices._devices.append(device)
+        # server is chosen by its own step
+        device._stream_server_selected = True
+        device.update()
+        return device
+
+    def clear_outputs(ctx):
+        device = ctx["appear"]
+        for o in device.outputs:
+            o.delete()
+
+    def create_output(stream: Stream):
+        def step(ctx):
+            result = sc.create_output(
+                ctx["appear"].rtmp_id,
+                server_url=stream.server_url,
+                shared_key=stream.shared_key,
+                title=stream.name,
+            )
+            if not result.ok:
+                raise FacecastAPIError(f"Output {stream.name} is not created")
+            return result
+
+        return step
+
+    def select_server(ctx):
+        device = ctx["appear"]
+        if server_id is None:
+            device.select_fastest_server()
+        else:
+            device.select_server(server_id)
+
+    # outputs are created concurrently, keep them in the order of streams
+    order = {}
+    for i, stream in enumerate(streams):
+        order.setdefault((stream.name, stream.server_url), i)
+
+    def sort_outputs(device: Device):
+        device.outputs._outputs.sort(
+            key=lambda o: order.get((o.output.title, o.output.server_url), len(order))
+        )
+
+    def refresh_outputs(ctx):
+        ctx["appear"].outputs.update_outputs()
+        sort_outputs(ctx["appear"])
+
+    def start(ctx):
+        ctx["appear"].start_outputs()
+        sort_outputs(ctx["appear"])
+
+    workflow.add("create", create)
+    workflow.add("appear", appear, requires=["create"])
+    workflow.add("clear_outputs", clear_outputs, requires=["appear"])
+    workflow.add("select_server", select_server, requires=["appear"])
+    output_steps = []
+    for i, stream in enumerate(streams):
+        output_steps.append(f"output:{i}")
+        workflow.add(
+            output_steps[-1], create_output(stream), requires=["clear_outputs"]
+        )
+    workflow.add(
+        "refresh_outputs", refresh_outputs, requires=output_steps or ["clear_outputs"]
+    )
+    if start:
+        workflow.add(
+            "start",
+            start,
+            requires=["refresh_outputs", "select_server"],
+        )
+    return workflow
@@ -5,6 +5,10 @@ import httpx
 import pytest
 
 from facecast_io import ServerConnector, BASE_URL, BASE_HEADERS
+from facecast_io.api import FacecastAPI, make_client
+from facecast_io.testing import FakeFacecast, FAKE_BASE_URL
+
+pytest_plugins = ["facecast_io.pytest_plugin"]
 
 TEST_DEVICE_NAME = "TEST_DEVICE_NAME"
 
@@ -33,3 +37,31 @@ def rtmp_id(server_connector):
     dev = [d for d in server_connector.get_devices() if d.name == TEST_DEVICE_NAME][0]
     yield dev.rtmp_id
     server_connector.delete_device(dev.rtmp_id)
+
+
+@pytest.fixture
+def fake_service():
+    return FakeFacecast()
+
+
+@pytest.fixture
+def fake_client(fake_service):
+    return httpx.Client(
+        base_url=FAKE_BASE_URL, headers=BASE_HEADERS, dispatch=fake_service
+    )
+
+
+@pytest.fixture
+def fake_connector(fake_service, fake_client):
+    sc = ServerConnector(fake_client)
+    sc.do_auth(fake_service.username, fake_service.password)
+    return sc
+
+
+@pytest.fixture
+def fake_api(fake_service):
+    return FacecastAPI(
+        fake_service.username,
+        fake_service.password,
+        client=make_client(FAKE_BASE_URL, dispatch=fake_service),
+    )
@@ -0,0 +1,55 @@
+import json
+
+import httpx
+import pytest
+
+from facecast_io import BASE_HEADERS, ServerConnector
+from facecast_io.cassette import (
+    REDACTED,
+    CassetteMismatch,
+    RecordingDispatcher,
+    ReplayDispatcher,
+)
+from facecast_io.testing import FAKE_BASE_URL
+
+
+def connector(dispatcher) -> ServerConnector:
+    client = httpx.Client(
+        base_url=FAKE_BASE_URL, headers=BASE_HEADERS, dispatch=dispatcher
+    )
+    return ServerConnector(client)
+
+
+def test_secrets_are_redacted(fake_service, tmp_path):
+    rtmp_id = fake_service.add_device("DEV")
+    recorder = RecordingDispatcher(fake_service)
+    sc = connector(recorder)
+    sc.do_auth(fake_service.username, fake_service.password)
+    sc.get_status(rtmp_id)
+    sc.create_output(rtmp_id, "rtmp://a.com/live", "secret-key", "YT")
+    recorder.cassette.save(tmp_path / "flow.json")
+
+    text = (tmp_path / "flow.json").read_text()
+    for secret in (fake_service.username, fake_service.password, f"key{rtmp_id}"):
+        assert secret not in text
+    assert "secret-key" not in text and fake_service.form_sign not in text
+    assert "sid=" not in text
+    assert len(json.loads(text)["interactions"]) == recorder.request_count
+
+
+def test_replay(fake_service):
+    rtmp_id = fake_service.add_device("DEV", outputs=2)
+    recorder = RecordingDispatcher(fake_service)
+    sc = connector(recorder)
+    sc.do_auth(fake_service.username, fake_service.password)
+    recorded = sc.get_outputs(rtmp_id)
+
+    replay = ReplayDispatcher(recorder.cassette, latency=0)
+    sc = connector(replay)
+    sc.do_auth(REDACTED, REDACTED)
+    assert sc.get_outputs(rtmp_id) == recorded
+    assert sc.get_outputs(rtmp_id) == recorded
+    assert replay.request_count == recorder.request_count + 1
+
+    with pytest.raises(CassetteMismatch):
+        sc.get_outputs(rtmp_id + 1)
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from facecast_io.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from facecast_io.errors import CircuitOpenError
+
+
+def test_breaker_states():
+    breaker = CircuitBreaker("en/rtmp/ajaj", failure_threshold=2, reset_timeout=0.1)
+    changes = []
+    breaker.on_state_change.append(lambda b, previous: changes.append(b.state))
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_call()
+    assert e.value.retry_after > 0
+
+    time.sleep(0.1)
+    breaker.before_call()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.1)
+    breaker.before_call()
+    breaker.record_success()
+    assert changes == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_callbacks_run_without_lock():
+    breaker = CircuitBreaker("en/rtmp/ajaj", failure_threshold=1)
+    locked = []
+    breaker.on_state_change.append(lambda b, previous: locked.append(b._lock.locked()))
+
+    breaker.record_failure()
+    breaker.record_success()
+
+    assert locked == [False, False]
+
+
+def test_interrupted_probe_is_released(fake_service, fake_connector, monkeypatch):
+    fake_connector.breakers.failure_threshold = 1
+    fake_connector.breakers.reset_timeout = 0.05
+    rtmp_id = fake_service.add_device("DEV")
+    fake_connector.get_outputs(rtmp_id)  # logged in
+    fake_service.down.add("/en/rtmp/ajaj")
+    with pytest.raises(CircuitOpenError):
+        fake_connector.get_status(rtmp_id)
+    fake_service.down.clear()
+    time.sleep(0.05)
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    request = fake_connector.client.request
+    monkeypatch.setattr(fake_connector.client, "request", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        fake_connector.get_status(rtmp_id)
+    monkeypatch.setattr(fake_connector.client, "request", request)
+
+    assert fake_connector.get_status(rtmp_id) is not None
+    breaker = next(b for b in fake_connector.breakers if b.name.endswith("rtmp/ajaj"))
+    assert breaker.state == CLOSED
+
+
+def test_open_circuit_skips_retries(fake_service, fake_connector):
+    fake_connector.breakers.failure_threshold = 1
+    rtmp_id = fake_service.add_device("DEV")
+    fake_service.down.add("/en/rtmp/ajaj")
+
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        fake_connector.get_status(rtmp_id)
+    with pytest.raises(CircuitOpenError):
+        fake_connector.get_status(rtmp_id)
+
+    assert time.perf_counter() - started < 1
+    assert fake_service.count("/en/rtmp/ajaj") == 1
+    # other endpoints are not affected
+    assert fake_connector.get_outputs(rtmp_id) is not None
+    stats = fake_connector.breakers.stats()
+    assert stats["https://fake.facecast.io/en/rtmp/ajaj"]["state"] == OPEN
+    assert stats["https://fake.facecast.io/en/rtmp/ajaj"]["rejected"] == 1
+    assert stats["https://fake.facecast.io/en/rtmp_outputs/ajaj"]["state"] == CLOSED
@@ -0,0 +1,82 @@
+import io
+import json
+
+from typer.testing import CliRunner
+
+from facecast_io import cli, journal as journal_module
+from facecast_io.errors import FacecastAPIError
+from facecast_io.progress import ProgressTable
+
+
+def test_start_many_devices(fake_service, fake_api, monkeypatch):
+    monkeypatch.setattr(cli, "_api", fake_api)
+    for name in ("EN", "ES", "DE"):
+        fake_service.add_device(name, outputs=2)
+    fake_service.latency = 0.01
+
+    result = CliRunner().invoke(
+        cli.app, ["device", "E*", "--start", "--no-preflight", "--json"]
+    )
+
+    assert result.exit_code == 0, result.output
+    results = [json.loads(line) for line in result.output.splitlines()]
+    assert sorted(r["device"] for r in results) == ["EN", "ES"]
+    assert all(r["ok"] and r["action"] == "start" for r in results)
+    assert all(o["enabled"] for r in results for o in r["outputs"])
+    assert fake_service.count("/en/out_rtmp_rtmp/ajaj", "start") == 4
+
+    result = CliRunner().invoke(cli.app, ["device", "MISSING"])
+    assert result.exit_code == 1
+    assert "Device not found: MISSING" in result.output
+
+
+def test_delete_many_devices(fake_service, fake_api, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_api", fake_api)
+    monkeypatch.setattr(journal_module, "JOURNAL_DIR", tmp_path)
+    for name in ("EN", "ES", "DE"):
+        fake_service.add_device(name, outputs=1)
+
+    result = CliRunner().invoke(cli.app, ["devices", "delete", "EN ES", "--yes"])
+
+    assert result.exit_code == 0, result.output
+    assert "EN" in result.output and "deleted" in result.output
+    assert [d["name"] for d in fake_service.devices.values()] == ["DE"]
+    assert [d.name for d in fake_api.devices] == ["DE"]
+
+
+
+def test_delete_partial_failure_forgets_deleted(
+    fake_service, fake_api, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(cli, "_api", fake_api)
+    monkeypatch.setattr(journal_module, "JOURNAL_DIR", tmp_path)
+    rtmp_ids = {name: fake_service.add_device(name) for name in ("EN", "ES")}
+    sc = fake_api.server_connector
+    delete_device = sc.delete_device
+
+    def failing_delete(rtmp_id):
+        if rtmp_id == rtmp_ids["ES"]:
+            raise FacecastAPIError("boom")
+        return delete_device(rtmp_id)
+
+    monkeypatch.setattr(sc, "delete_device", failing_delete)
+    result = CliRunner().invoke(
+        cli.app, ["devices", "delete", "EN ES", "--yes", "--json", "--workers", "1"]
+    )
+
+    assert result.exit_code == 1, result.output
+    assert [d.name for d in fake_api.devices] == ["ES"]
+    lines = [json.loads(line) for line in result.output.splitlines() if "{" in line]
+    assert {(r["device"], r["ok"]) for r in lines} == {("EN", True), ("ES", False)}
+
+def test_live_progress_table():
+    stream = io.StringIO()
+    table = ProgressTable(["EN", "DE"], stream=stream, live=True)
+    table.update("EN", "start...")
+    table.update("EN", "done", ok=True)
+    table.update("DE", "failed", "timeout", ok=False)
+
+    frames = stream.getvalue().split("\x1b[2A")
+    assert len(frames) == 3
+    assert "DE" in frames[-1] and "timeout" in frames[-1]
+    assert table.failed == 1
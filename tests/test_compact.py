@@ -0,0 +1,28 @@
+from facecast_io.compact import CompactFleet
+
+
+def test_compact_fleet_matches_full_model(fake_service, fake_api):
+    for i in range(3):
+        fake_service.add_device(f"DEV{i}", outputs=2)
+    fake_api.devices.update()
+
+    fleet = CompactFleet(fake_api.server_connector)
+    fleet.update()
+
+    assert fleet.input_params == fake_api.devices.input_params
+    assert fleet["DEV0"].backup_server is fleet["DEV2"].backup_server
+    assert [o.title for o in fleet["DEV1"].outputs] == ["Output 0", "Output 1"]
+    assert not hasattr(fleet["DEV1"], "__dict__")
+
+    device = fleet.raw("DEV1")
+    assert device.input_params == fleet["DEV1"].input_params
+    assert len(device.outputs) == 2
+
+
+def test_compact_fleet_from_devices(fake_service, fake_api):
+    fake_service.add_device("DEV", outputs=1)
+    fake_api.devices.update()
+
+    fleet = CompactFleet.from_devices(fake_api.devices)
+
+    assert fleet.input_params == fake_api.devices.input_params
@@ -0,0 +1,79 @@
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from facecast_io import cli
+from facecast_io.daemon import FacecastDaemon, call, is_forwarded
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch, fake_api):
+    monkeypatch.setattr(cli, "_api", fake_api)
+    daemon = FacecastDaemon(fake_api, cli.app, tmp_path / "facecast.sock")
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    while not daemon.path.exists():
+        time.sleep(0.01)
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+def test_cli_command_runs_in_daemon(fake_service, fake_api, daemon):
+    fake_service.add_device("DEV", outputs=1)
+    daemon.refresh()
+    fake_service.requests.clear()
+
+    exit_code, output = call(["device", "DEV", "--input"], daemon.path)
+
+    assert exit_code == 0
+    assert "rtmp://de.facecast.io/live" in output
+    assert fake_service.request_count == 0
+
+
+def test_concurrent_commands_keep_their_output(fake_service, fake_api, daemon):
+    names = [f"DEV{i}" for i in range(4)]
+    for name in names:
+        fake_service.add_device(name, outputs=1)
+    daemon.refresh()
+    fake_service.latency = 0.05
+
+    def start(name):
+        return call(["device", name, "--start", "--no-preflight"], daemon.path)
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(start, names))
+
+    assert stat.S_IMODE(os.stat(daemon.path).st_mode) == 0o600
+    for name, (exit_code, output) in zip(names, results):
+        assert exit_code == 0, output
+        assert [n for n in names if n in output] == [name]
+
+
+def test_call_without_daemon(tmp_path):
+    assert call(["devices", "list"], tmp_path / "missing.sock") is None
+    assert is_forwarded(["devices", "list"])
+    assert not is_forwarded(["devices", "delete", "DEV"])
+
+
+def test_daemon_rejects_commands_it_does_not_serve(daemon):
+    exit_code, output = call(["login", "--force"], daemon.path)
+
+    assert exit_code == 2
+    assert "isn't served by the daemon" in output
+
+
+def test_refresh_drops_deleted_devices(fake_service, fake_api, daemon):
+    en, de = (fake_service.add_device(name) for name in ("EN", "DE"))
+    daemon.refresh()
+    del fake_service.devices[en]
+    fake_service.devices[de]["main_online"] = False
+
+    daemon.refresh()
+
+    assert [d.name for d in fake_api.devices] == ["DE"]
+    assert not fake_api.devices["DE"].is_online
@@ -0,0 +1,102 @@
+import io
+import json
+
+import pytest
+
+from facecast_io.errors import DeviceNotFound, FacecastAPIError
+from facecast_io.export import (
+    FORMATS,
+    export_input_params,
+    save_obs_profiles,
+    write_csv,
+    write_ffmpeg,
+)
+
+PARAMS = [
+    {
+        "lang_code": "EN",
+        "main_server_url": "rtmp://de.facecast.io/live",
+        "backup_server_url": "rtmp://nl.facecast.io/live",
+        "shared_key": "key1",
+    }
+]
+
+
+def test_export_fetches_only_statuses(fake_service, fake_connector):
+    for i in range(200):
+        fake_service.add_device(f"DEV{i}", outputs=2)
+    fake_service.latency = 0.005
+    requests = fake_service.request_count
+
+    params = list(export_input_params(fake_connector))
+
+    assert sorted(p["lang_code"] for p in params) == sorted(
+        f"DEV{i}" for i in range(200)
+    )
+    assert next(p for p in params if p["lang_code"] == "DEV0") == {
+        "lang_code": "DEV0",
+        "main_server_url": "rtmp://de.facecast.io/live",
+        "backup_server_url": "rtmp://nl.facecast.io/live",
+        "shared_key": f"key{min(fake_service.devices)}",
+    }
+    # devices page, servers page and one status per device
+    assert fake_service.request_count - requests == 202
+
+
+def test_export_selected(fake_service, fake_api):
+    fake_service.add_device("DEV1")
+    fake_service.add_device("DEV2")
+    fake_api.devices.update()
+
+    params = list(export_input_params(fake_api.server_connector, names=["DEV2"]))
+
+    assert params == [fake_api.devices["DEV2"].input_params]
+    with pytest.raises(DeviceNotFound):
+        export_input_params(fake_api.server_connector, names=["DEV2", "DEV3"])
+
+
+def test_formats(tmp_path):
+    stream = io.StringIO()
+    write_csv(PARAMS, stream)
+    assert stream.getvalue().splitlines()[1] == (
+        "EN,rtmp://de.facecast.io/live,rtmp://nl.facecast.io/live,key1"
+    )
+
+    stream = io.StringIO()
+    write_ffmpeg(PARAMS, stream)
+    assert "rtmp://de.facecast.io/live/key1|[f=flv:onfail=ignore]" in stream.getvalue()
+
+    stream = io.StringIO()
+    FORMATS["obs"](PARAMS, stream)
+    assert json.loads(stream.getvalue())["EN"]["settings"]["key"] == "key1"
+
+    assert save_obs_profiles(PARAMS, tmp_path) == 1
+    service = json.loads((tmp_path / "EN" / "service.json").read_text())
+    assert service["settings"]["server"] == "rtmp://de.facecast.io/live"
+
+    profiles = tmp_path / "profiles"
+    assert save_obs_profiles([dict(PARAMS[0], lang_code="../EN")], profiles) == 1
+    assert (profiles / "___EN" / "service.json").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["EN", "profiles"]
+
+
+def test_failed_devices_are_skipped(fake_service, fake_connector, monkeypatch):
+    rtmp_ids = {fake_service.add_device(name): name for name in ("EN", "DE")}
+    get_status = fake_connector.get_status
+
+    def flaky_get_status(rtmp_id):
+        if rtmp_ids[rtmp_id] == "DE":
+            raise FacecastAPIError("boom")
+        return get_status(rtmp_id)
+
+    monkeypatch.setattr(fake_connector, "get_status", flaky_get_status)
+    errors = {}
+    stream = io.StringIO()
+
+    write_csv(export_input_params(fake_connector, errors=errors), stream)
+
+    assert [line.split(",")[0] for line in stream.getvalue().splitlines()] == [
+        "lang_code",
+        "EN",
+    ]
+    assert list(errors) == ["DE"]
@@ -0,0 +1,66 @@
+from facecast_io.errors import FacecastAPIError
+from facecast_io.failover import FailoverPolicy, InputFailover
+
+
+def test_main_signal_loss_switches_to_backup(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV", outputs=1)
+    fake_api.devices.update()
+    events = []
+    failover = InputFailover(
+        fake_api.devices,
+        FailoverPolicy(switch_server=True, callbacks=[events.append]),
+    )
+    failover.poll_once()
+    assert not events
+
+    fake_service.devices[rtmp_id]["main_online"] = False
+    failover.poll_once()
+    failover.poll_once()
+
+    assert len(events) == 1
+    assert events[0].actions == ["select_server:12"]
+    assert events[0].switch_latency >= 0
+    assert fake_service.devices[rtmp_id]["server_id"] == 12
+
+    # the former backup is live as main now, the original main is still down
+    failover.poll_once()
+    assert events[0].restored_at is None
+
+    fake_service.devices[rtmp_id]["backup_online"] = True
+    failover.poll_once()
+    assert events[0].restored_at is not None
+
+
+def test_failed_failover_is_retried(fake_service, fake_api, monkeypatch):
+    rtmp_id = fake_service.add_device("DEV")
+    fake_api.devices.update()
+    sc = fake_api.server_connector
+    select_server = sc.select_server
+    failures = [FacecastAPIError("boom")]
+
+    def flaky_select_server(*args):
+        if failures:
+            raise failures.pop()
+        return select_server(*args)
+
+    monkeypatch.setattr(sc, "select_server", flaky_select_server)
+    failover = InputFailover(fake_api.devices, FailoverPolicy(switch_server=True))
+    fake_service.devices[rtmp_id]["main_online"] = False
+    failover.poll_once()
+    assert not failover.events[0].done
+
+    failover.poll_once()
+    assert failover.events[0].done
+    assert failover.events[0].actions == ["select_server:12"]
+    assert fake_service.devices[rtmp_id]["server_id"] == 12
+
+
+def test_no_failover_without_backup_signal(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV")
+    fake_api.devices.update()
+    fake_service.devices[rtmp_id].update(main_online=False, backup_online=False)
+
+    failover = InputFailover(fake_api.devices, FailoverPolicy(switch_server=True))
+    failover.poll_once()
+
+    assert failover.events == []
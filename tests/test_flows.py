@@ -0,0 +1,24 @@
+from facecast_io.entities import Stream
+
+STREAMS = [
+    Stream(
+        name=f"Stream {i}",
+        server_url=f"rtmp://live{i}.example.com/app",
+        shared_key=f"stream-key-{i}",
+    )
+    for i in range(3)
+]
+
+
+def test_create_device_and_outputs(facecast_flow):
+    api = facecast_flow.api("create_device_and_outputs")
+    with facecast_flow.measure("create_device_and_outputs"):
+        device = api.create_device_and_outputs("Flow device", STREAMS)
+    assert [o.output.title for o in device.outputs] == [s.name for s in STREAMS]
+
+
+def test_devices_update(facecast_flow):
+    api = facecast_flow.api("devices_update")
+    with facecast_flow.measure("devices_update"):
+        api.devices.update()
+    assert len(api.devices) == 5
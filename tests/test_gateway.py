@@ -0,0 +1,83 @@
+import threading
+
+import httpx
+import pytest
+
+from facecast_io.errors import FacecastAPIError
+from facecast_io.gateway import Gateway
+
+
+@pytest.fixture
+def gateway(fake_api):
+    gateway = Gateway(fake_api, port=0)
+    thread = threading.Thread(target=gateway.serve_forever, daemon=True)
+    thread.start()
+    yield gateway
+    gateway.shutdown()
+    thread.join()
+    gateway.server_close()
+
+
+@pytest.fixture
+def gateway_client(fake_service, gateway):
+    gateway.cache.refresh()
+    host, port = gateway.server_address
+    with httpx.Client(base_url=f"http://{host}:{port}", trust_env=False) as client:
+        yield client
+
+
+def test_reads_are_cached_with_etags(fake_service, fake_api, gateway, gateway_client):
+    fake_service.add_device("DEV", outputs=1)
+    gateway.cache.refresh()
+    fake_service.requests.clear()
+
+    r = gateway_client.get("/devices/DEV/input")
+    assert r.status_code == 200
+    assert r.json() == fake_api.devices["DEV"].input_params
+    etag = r.headers["etag"]
+    r = gateway_client.get("/devices/DEV/input", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert gateway_client.get("/devices").json()[0]["name"] == "DEV"
+    assert gateway_client.get("/devices/OTHER").status_code == 404
+    assert fake_service.request_count == 0
+
+
+def test_mutations_pass_through(fake_service, gateway, gateway_client):
+    fake_service.add_device("DEV", outputs=2)
+    gateway.cache.refresh()
+
+    r = gateway_client.post("/devices/DEV/start")
+
+    assert r.status_code == 200
+    assert all(o["enabled"] for o in r.json()["outputs"])
+    assert fake_service.count("/en/out_rtmp_rtmp/ajaj", "start") == 2
+
+
+def test_breakers_are_read_live(fake_service, fake_api, gateway, gateway_client):
+    rtmp_id = fake_service.add_device("DEV")
+    fake_api.server_connector.get_status(rtmp_id)
+
+    breakers = gateway_client.get("/breakers").json()
+
+    assert any(name.endswith("en/rtmp/ajaj") for name in breakers)
+
+
+def test_refresh_survives_failed_and_deleted_devices(
+    fake_service, fake_api, gateway, gateway_client, monkeypatch
+):
+    en, de, es = (fake_service.add_device(n) for n in ("EN", "DE", "ES"))
+    gateway.cache.refresh()
+    del fake_service.devices[en]
+    fake_service.devices[de]["main_online"] = False
+
+    def broken_update():
+        raise FacecastAPIError("boom")
+
+    monkeypatch.setattr(fake_api.devices["ES"], "update", broken_update)
+    gateway.cache.refresh()
+
+    devices = {d["name"]: d for d in gateway_client.get("/devices").json()}
+    assert sorted(devices) == ["DE", "ES"]
+    assert devices["DE"]["is_online"] is False
+    assert devices["DE"]["error"] is None
+    assert "boom" in devices["ES"]["error"]
@@ -0,0 +1,43 @@
+import time
+from datetime import datetime
+
+from facecast_io.golive import GoLive, parse_time
+
+
+def test_outputs_start_together(fake_service, fake_api):
+    for i in range(4):
+        fake_service.add_device(f"DEV{i}", outputs=3)
+    fake_api.devices.update()
+    fake_service.expire_sessions()
+    fake_service.latency = 0.01
+
+    go_live = GoLive(fake_api.devices, time.time() + 0.3, warmup=0.2)
+    report = go_live.run()
+
+    assert len(report.starts) == 12 and not report.failed
+    assert all(s.sent_at >= report.at for s in report.starts)
+    assert report.max_skew < 0.1
+    outputs = [o for d in fake_service.devices.values() for o in d["outputs"].values()]
+    assert all(o["enabled"] for o in outputs)
+    # expired session was renewed once while preparing, starts weren't replayed
+    assert fake_service.count("/en/login") == 2
+    assert fake_service.count("/en/out_rtmp_rtmp/ajaj", "start") == 12
+
+
+def test_only_selected_devices(fake_service, fake_api):
+    fake_service.add_device("DEV1", outputs=1)
+    fake_service.add_device("DEV2", outputs=2)
+    fake_api.devices.update()
+
+    go_live = GoLive(fake_api.devices, time.time(), names=["DEV2"])
+    assert [s.device_name for s in go_live.prepare()] == ["DEV2", "DEV2"]
+
+
+def test_parse_time():
+    now = datetime(2020, 5, 1, 12, 0, 0)
+    assert parse_time("+30", now) == now.timestamp() + 30
+    assert parse_time("-30", now) == now.timestamp() - 30
+    assert parse_time("12:30", now) == datetime(2020, 5, 1, 12, 30).timestamp()
+    assert parse_time("2020-05-02T10:00:05", now) == datetime(
+        2020, 5, 2, 10, 0, 5
+    ).timestamp()
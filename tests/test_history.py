@@ -0,0 +1,111 @@
+import pytest
+
+from facecast_io.errors import FacecastAPIError
+from facecast_io.history import (
+    DOWN,
+    INPUT,
+    OFF,
+    UNKNOWN,
+    UP,
+    HistoryRecorder,
+    HistoryStore,
+)
+from facecast_io.supervisor import OutputSupervisor
+
+
+@pytest.fixture
+def store(tmp_path):
+    with HistoryStore(tmp_path / "history.db", flush_interval=60) as store:
+        yield store
+
+
+def test_only_changes_are_stored(store):
+    for at, state, kbps in [
+        (0, UP, 4500),
+        (10, UP, 4600),  # within tolerance
+        (20, UP, 2000),
+        (30, DOWN, None),
+        (40, DOWN, None),
+        (50, UP, 4500),
+        (60, UP, 4500),
+    ]:
+        store.record(1, INPUT, state, kbps=kbps, device_name="EN", at=at)
+    store.flush()
+
+    assert store._db.execute("SELECT COUNT(*) FROM states").fetchone() == (4,)
+    assert store.uptime(1, INPUT, 0, 100) == pytest.approx(40 / 60)
+    assert [(o.start, o.end) for o in store.outages(1, INPUT, 0, 100)] == [(30, 50)]
+    # the state at 35 comes from the row before the range
+    assert [(o.start, o.end) for o in store.outages(1, INPUT, 35, 100)] == [(35, 50)]
+    bitrate = store.bitrate(1, 0, 100)
+    assert (bitrate.min_kbps, bitrate.max_kbps) == (2000, 4500)
+    assert bitrate.mean_kbps == pytest.approx((4500 * 20 + 2000 * 10 + 4500 * 10) / 40)
+
+
+def test_time_between_recordings_is_unknown(tmp_path):
+    path = tmp_path / "history.db"
+    with HistoryStore(path) as first:
+        first.record(1, 7, DOWN, device_name="EN", title="YouTube", at=0)
+        first.record(1, 7, DOWN, at=10)
+    with HistoryStore(path) as second:
+        second.record(1, 7, UP, at=100)
+        second.record(1, 7, UP, at=110)
+        intervals = second.intervals(1, 7, 0, 200)
+
+    assert [(i.start, i.end, i.state) for i in intervals] == [
+        (0, 10, DOWN),
+        (10, 100, UNKNOWN),
+        (100, 110, UP),
+    ]
+    with HistoryStore(path) as reader:
+        (report,) = reader.report(0, 200)
+    assert (report.device_name, report.title) == ("EN", "YouTube")
+    assert report.uptime == pytest.approx(0.5)
+
+
+def test_failed_polls_and_gaps_are_unknown(store, fake_service, fake_api, monkeypatch):
+    for at in (0, 10, 100, 110):
+        if at == 100:
+            store.mark_unknown(1)
+            store.max_gap = 60
+        store.record(1, INPUT, UP, at=at)
+        store.record(2, INPUT, UP, at=at)
+    for rtmp_id in (1, 2):
+        intervals = store.intervals(rtmp_id, INPUT, 0, 200)
+        assert [(i.start, i.end, i.state) for i in intervals] == [
+            (0, 10, UP),
+            (10, 100, UNKNOWN),
+            (100, 110, UP),
+        ]
+
+    rtmp_id = fake_service.add_device("EN")
+    fake_api.devices.update()
+    recorder = HistoryRecorder(fake_api.devices, store)
+    recorder.poll_once()
+
+    def timeout(rtmp_id):
+        raise FacecastAPIError("timeout")
+
+    monkeypatch.setattr(recorder, "_get_status", timeout)
+    recorder.poll_once()
+    assert store._series[rtmp_id, INPUT].state == UNKNOWN
+
+def test_recorder_and_supervisor_feed_the_store(store, fake_service, fake_api):
+    rtmp_id = fake_service.add_device("EN", outputs=2)
+    fake_api.devices.update()
+    enabled, disabled = fake_service.devices[rtmp_id]["outputs"].values()
+    enabled.update(enabled=True, cloud=True)
+
+    HistoryRecorder(fake_api.devices, store).poll_once()
+    OutputSupervisor(fake_api.devices, history=store).poll_once()
+
+    reports = store.report(0, float("inf"), names=["EN"])
+    assert [(r.output_id, r.title) for r in reports] == [
+        (INPUT, ""),
+        (enabled["id"], "Output 0"),
+        (disabled["id"], "Output 1"),
+    ]
+    rows = store._db.execute(
+        "SELECT output_id, state FROM states ORDER BY output_id"
+    ).fetchall()
+    assert rows == [(INPUT, UP), (enabled["id"], UP), (disabled["id"], OFF)]
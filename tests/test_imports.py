@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def loaded_modules(statement: str) -> set:
+    code = f"{statement}; import sys; print(' '.join(sys.modules))"
+    output = subprocess.check_output([sys.executable, "-c", code])
+    return set(output.decode().split())
+
+
+def test_package_import_is_lazy():
+    modules = loaded_modules("import facecast_io")
+    assert not {"httpx", "pyquery", "pydantic"} & modules
+
+
+@pytest.mark.parametrize(
+    "statement", ["import facecast_io.cli", "import facecast_io.__main__"]
+)
+def test_cli_import_skips_heavy_modules(statement):
+    modules = loaded_modules(statement)
+    assert not {"pyquery", "lxml", "tld", "email_validator", "httpx"} & modules
+
+
+def test_lazy_attributes():
+    import facecast_io
+    from facecast_io.api import FacecastAPI
+
+    assert facecast_io.FacecastAPI is FacecastAPI
+    assert "ServerConnector" in dir(facecast_io)
+    with pytest.raises(AttributeError):
+        facecast_io.Missing
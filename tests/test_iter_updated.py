@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+from facecast_io.errors import DeviceNotFound
+
+
+@pytest.fixture
+def slow_device(fake_service, fake_api, monkeypatch):
+    for i in range(5):
+        fake_service.add_device(f"DEV{i}", outputs=1)
+    fake_api.devices.update()
+    slow = fake_api.devices["DEV0"]
+    update = slow.update
+
+    def slow_update():
+        time.sleep(0.2)
+        update()
+
+    monkeypatch.setattr(slow, "update", slow_update)
+    return slow
+
+
+def test_iter_updated_in_completion_order(fake_api, slow_device):
+    updates = list(fake_api.devices.iter_updated(max_workers=5))
+
+    assert len(updates) == 5 and all(u.ok for u in updates)
+    assert updates[-1].device is slow_device
+
+
+def test_iter_updated_reports_errors_inline(fake_service, fake_api, monkeypatch):
+    for name in ("DEV1", "DEV2", "DEV3"):
+        fake_service.add_device(name)
+    fake_api.devices.update()
+    del fake_service.devices[fake_api.devices["DEV2"].rtmp_id]
+    hydrated = []
+    monkeypatch.setattr(fake_api.devices["DEV3"], "update", lambda: hydrated.append(1))
+
+    updates = list(fake_api.devices.iter_updated(["DEV1", "DEV2"]))
+
+    assert {u.device.name: u.ok for u in updates} == {"DEV1": True, "DEV2": False}
+    assert not hydrated
+    with pytest.raises(DeviceNotFound):
+        list(fake_api.devices.iter_updated(["missing"]))
+
+
+def test_aiter_updated(fake_api, slow_device):
+    async def collect():
+        return [u async for u in fake_api.devices.aiter_updated(max_workers=5)]
+
+    updates = asyncio.run(collect())
+
+    assert len(updates) == 5 and all(u.ok for u in updates)
+    assert updates[-1].device is slow_device
+
+
+def test_aiter_updated_selected(fake_api, slow_device):
+    async def collect(names):
+        return [u async for u in fake_api.devices.aiter_updated(names)]
+
+    with pytest.raises(DeviceNotFound):
+        asyncio.run(collect(["DEV1", "missing"]))
+    updates = asyncio.run(collect(["DEV1", "DEV2"]))
+
+    assert sorted(u.device.name for u in updates) == ["DEV1", "DEV2"]
+
+
+def test_new_devices_are_found_by_both_iterators(fake_service, fake_api):
+    fake_api.devices.update()
+    fake_service.add_device("NEW")
+
+    async def collect():
+        return [u async for u in fake_api.devices.aiter_updated(["NEW"])]
+
+    assert [u.device.name for u in fake_api.devices.iter_updated(["NEW"])] == ["NEW"]
+    del fake_api.devices._devices[:]
+    assert [u.device.name for u in asyncio.run(collect())] == ["NEW"]
@@ -0,0 +1,127 @@
+import pytest
+from typer.testing import CliRunner
+
+from facecast_io import cli, journal as journal_module
+from facecast_io.errors import FacecastAPIError
+from facecast_io.journal import Journal, unfinished_jobs
+
+
+def output_operations(rtmp_id, count=3):
+    return [
+        (
+            f"output:{i}",
+            "create_output",
+            {
+                "rtmp_id": rtmp_id,
+                "title": f"Output {i}",
+                "server_url": f"rtmp://out{i}.example.com/live",
+                "shared_key": f"key{i}",
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def test_resume_does_not_duplicate_outputs(
+    fake_service, fake_connector, tmp_path, monkeypatch
+):
+    rtmp_id = fake_service.add_device("DEV")
+    journal = Journal.create("provision", output_operations(rtmp_id), tmp_path)
+    create_output = fake_connector.create_output
+
+    def dies_after_request(rtmp_id, **kwargs):
+        result = create_output(rtmp_id, **kwargs)
+        if kwargs["title"] == "Output 1":
+            raise KeyboardInterrupt
+        return result
+
+    monkeypatch.setattr(fake_connector, "create_output", dies_after_request)
+    with pytest.raises(KeyboardInterrupt):
+        journal.run(fake_connector)
+    monkeypatch.undo()
+
+    resumed = Journal(journal.path)
+    assert [op.id for op in resumed.pending] == ["output:1", "output:2"]
+    assert [j.job_id for j in unfinished_jobs(tmp_path)] == [journal.job_id]
+
+    resumed.run(fake_connector)
+
+    titles = [o["descr"] for o in fake_service.devices[rtmp_id]["outputs"].values()]
+    assert titles == ["Output 0", "Output 1", "Output 2"]
+    assert Journal(journal.path).finished and not unfinished_jobs(tmp_path)
+
+
+def test_resume_tells_outputs_apart_by_id(
+    fake_service, fake_connector, tmp_path, monkeypatch
+):
+    # the device already has outputs with the same titles and urls
+    rtmp_id = fake_service.add_device("DEV", outputs=2)
+    journal = Journal.create("provision", output_operations(rtmp_id, 2), tmp_path)
+
+    def dies_before_request(rtmp_id, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(fake_connector, "create_output", dies_before_request)
+    with pytest.raises(KeyboardInterrupt):
+        journal.run(fake_connector)
+    monkeypatch.undo()
+
+    Journal(journal.path).run(fake_connector)
+
+    outputs = fake_service.devices[rtmp_id]["outputs"]
+    assert len(outputs) == 4
+    done = Journal(journal.path).operations
+    created = [op.result["output_id"] for op in done.values()]
+    assert sorted(created) == sorted(outputs)[2:]
+
+
+def test_job_ids_are_unique(tmp_path):
+    journals = [Journal.create("provision", [], tmp_path) for _ in range(3)]
+
+    assert len({j.job_id for j in journals}) == 3
+
+
+def test_resume_command(fake_service, fake_api, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_api", fake_api)
+    monkeypatch.setattr(journal_module, "JOURNAL_DIR", tmp_path)
+    rtmp_id = fake_service.add_device("DEV")
+    Journal.create("provision", output_operations(rtmp_id, 2))
+
+    result = CliRunner().invoke(cli.app, ["resume"])
+
+    assert result.exit_code == 0, result.output
+    assert "finished" in result.output
+    assert len(fake_service.devices[rtmp_id]["outputs"]) == 2
+    assert CliRunner().invoke(cli.app, ["resume"]).output == "No unfinished jobs\n"
+
+
+def test_devices_run_concurrently(
+    fake_service, fake_connector, tmp_path, monkeypatch
+):
+    rtmp_ids = [fake_service.add_device(f"DEV{i}") for i in range(4)]
+    broken = rtmp_ids.pop()
+    operations = [
+        (f"{rtmp_id}/{op_id}", action, params)
+        for rtmp_id in rtmp_ids + [broken]
+        for op_id, action, params in output_operations(rtmp_id, 2)
+    ]
+    journal = Journal.create("provision", operations, tmp_path)
+    create_output = fake_connector.create_output
+
+    def fails_for_broken(rtmp_id, **kwargs):
+        if rtmp_id == broken:
+            raise FacecastAPIError("Output is not created")
+        return create_output(rtmp_id, **kwargs)
+
+    monkeypatch.setattr(fake_connector, "create_output", fails_for_broken)
+    # the broken device stops at its first output, the others go on
+    with pytest.raises(FacecastAPIError):
+        journal.run(fake_connector, max_workers=4)
+
+    for rtmp_id in rtmp_ids:
+        titles = [o["descr"] for o in fake_service.devices[rtmp_id]["outputs"].values()]
+        assert titles == ["Output 0", "Output 1"]
+    assert [op.id for op in Journal(journal.path).pending] == [
+        f"{broken}/output:0",
+        f"{broken}/output:1",
+    ]
@@ -0,0 +1,38 @@
+import json
+import logging
+
+from facecast_io.logger_setup import logger, setup_logging, stop_logging
+
+
+def test_queued_structured_logging(capsys, fake_service, fake_connector):
+    rtmp_id = fake_service.add_device("DEV")
+    setup_logging(logging.DEBUG, structured=True)
+    try:
+        fake_connector.get_outputs(rtmp_id)
+        stop_logging()
+    finally:
+        setup_logging(logging.INFO, queued=False)
+
+    records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    request = [r for r in records if r.get("endpoint") == "en/rtmp_outputs/ajaj"][0]
+    assert request["rtmp_id"] == rtmp_id
+    assert request["duration"] >= 0
+    assert logger.level == logging.INFO
+
+
+def test_setup_logging_keeps_foreign_handlers_and_renders_early(capsys):
+    foreign = logging.NullHandler()
+    logger.addHandler(foreign)
+    setup_logging(logging.INFO, structured=True)
+    try:
+        state = ["UP"]
+        logger.info("state %s", state)
+        state[0] = "DOWN"
+        stop_logging()
+        assert foreign in logger.handlers
+    finally:
+        logger.removeHandler(foreign)
+        setup_logging(logging.INFO, queued=False)
+
+    records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert records[-1]["message"] == "state ['UP']"
@@ -0,0 +1,104 @@
+import json
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from facecast_io.preflight import PreflightChecker, PreflightError, parse_target
+
+
+class _RTMPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        self.request.recv(1537)
+        self.request.sendall(bytes([self.server.version]) + bytes(1536))
+
+
+@pytest.fixture
+def rtmp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RTMPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.version = 3
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture
+def checker():
+    checker = PreflightChecker(timeout=1)
+    yield checker
+    checker.close()
+
+
+def test_parse_target():
+    assert parse_target("rtmp://a.example.com/live") == ("rtmp", "a.example.com", 1935)
+    assert parse_target("rtmps://b.example.com/app") == ("rtmps", "b.example.com", 443)
+    with pytest.raises(ValueError):
+        parse_target("http://a.example.com/live")
+
+
+def test_checks_are_cached_per_host(checker, rtmp_server, closed_port):
+    port = rtmp_server.server_address[1]
+    checks = checker.check_targets(
+        [(f"rtmp://127.0.0.1:{port}/live{i}", f"key{i}") for i in range(10)]
+        + [
+            (f"rtmp://127.0.0.1:{closed_port}/live", "key"),
+            (f"rtmp://127.0.0.1:{port}/live", " key"),
+            ("rtmp:///live", "key"),
+        ]
+    )
+
+    assert all(c.ok and c.stage == "rtmp" for c in checks[:10])
+    assert rtmp_server.connections == 1
+    assert [c.stage for c in checks[10:]] == ["connect", "key", "url"]
+    assert not any(c.ok for c in checks[10:])
+
+
+def test_not_rtmp_server(checker, rtmp_server):
+    rtmp_server.version = 72  # "H" of an HTTP answer
+    port = rtmp_server.server_address[1]
+
+    with pytest.raises(PreflightError) as e:
+        checker.ensure([(f"rtmp://127.0.0.1:{port}/live", "key")])
+
+    assert e.value.checks[0].stage == "rtmp"
+
+
+def test_provision_checks_targets_before_login(closed_port, monkeypatch):
+    from typer.testing import CliRunner
+
+    from facecast_io import cli
+
+    def login(*args, **kwargs):
+        raise AssertionError("logged in before the preflight")
+
+    monkeypatch.setattr(cli, "_login", login)
+    streams = [
+        {
+            "channel_name": "EN",
+            "server_url": f"rtmp://127.0.0.1:{closed_port}/live",
+            "stream_key": "key",
+            "post_urls": [],
+        }
+    ]
+
+    result = CliRunner().invoke(
+        cli.app, ["devices", "provision", "EN"], input=json.dumps(streams)
+    )
+
+    assert result.exit_code == 1, result.output
+    assert "Unreachable" in result.output
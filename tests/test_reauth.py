@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from facecast_io.errors import AuthError
+
+
+def test_reauth_once_for_concurrent_callers(fake_service, fake_connector):
+    rtmp_ids = [fake_service.add_device(f"DEV{i}") for i in range(50)]
+    old_sign = fake_connector.form_sign
+    fake_service.expire_sessions()
+    fake_service.latency = 0.01
+
+    with ThreadPoolExecutor(25) as pool:
+        statuses = list(pool.map(fake_connector.get_status, rtmp_ids))
+
+    assert len(statuses) == 50
+    assert fake_service.count("/en/login") == 2
+    assert fake_connector.form_sign == fake_service.form_sign != old_sign
+
+
+def test_mutation_is_replayed_with_fresh_sign(fake_service, fake_connector):
+    rtmp_id = fake_service.add_device("DEV")
+    fake_service.expire_sessions()
+
+    result = fake_connector.create_output(rtmp_id, "rtmp://a.com/live", "key", "YT")
+
+    assert result.ok
+    assert len(fake_service.devices[rtmp_id]["outputs"]) == 1
+
+
+def test_failed_login_keeps_working_credentials(fake_service, fake_connector):
+    fake_service.expire_sessions()
+    with pytest.raises(AuthError):
+        fake_connector.do_auth(fake_service.username, "wrong")
+    credentials = (fake_service.username, fake_service.password)
+    assert fake_connector._credentials == credentials
@@ -0,0 +1,35 @@
+import pytest
+
+
+def test_fleet_refresh_scrapes_servers_once(fake_service, fake_api):
+    for i in range(10):
+        fake_service.add_device(f"DEV{i}")
+    fake_service.requests.clear()
+
+    fake_api.devices.update()
+
+    assert len(fake_api.devices) == 10
+    assert fake_service.count("/en/rtmp_server") == 1
+    device = fake_api.devices["DEV3"]
+    assert device.backup_server_url == "rtmp://nl.facecast.io/live"
+    assert device._available_servers is fake_api.devices["DEV7"]._available_servers
+
+
+def test_catalog_refreshes_after_ttl(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV")
+    catalog = fake_api.devices.server_catalog
+    catalog.get(rtmp_id)
+    catalog.ttl = 0
+    catalog.get(rtmp_id)
+
+    assert fake_service.count("/en/rtmp_server") == 2
+    assert 11 in catalog and catalog[12].name == "Amsterdam"
+
+
+def test_fastest_before_first_get(fake_service, fake_api):
+    catalog = fake_api.devices.server_catalog
+    with pytest.raises(ValueError):
+        catalog.fastest
+
+    catalog.get(fake_service.add_device("DEV"))
+    assert catalog.fastest.id in catalog
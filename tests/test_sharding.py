@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+from facecast_io.api import make_client
+from facecast_io.history import HistoryRecorder, HistoryStore
+from facecast_io.sharding import Session, ShardedFleet, partition
+
+
+def test_partition():
+    shards = partition([10, 11, 12, 13, 14], 3)
+    assert shards == [[12], [10, 13], [11, 14]]
+    # a device keeps its shard when others are added
+    assert [10, 13] in partition([10, 13, 15, 17], 3)
+
+
+def test_session_is_shared(fake_service, fake_connector):
+    fake_service.add_device("EN")
+    session = Session.from_connector(fake_connector)
+    sc = session.connector(lambda url: make_client(url, dispatch=fake_service))
+
+    assert [d.name for d in sc.get_devices()] == ["EN"]
+    assert fake_service.count("/en/login") == 1
+
+
+forking = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="workers share the in-memory fake service by forking",
+)
+
+
+def sharded_fleet(fake_service, devices) -> ShardedFleet:
+    return ShardedFleet(
+        devices,
+        processes=3,
+        threads=2,
+        client_factory=lambda url: make_client(url, dispatch=fake_service),
+        mp_context=multiprocessing.get_context("fork"),
+    )
+
+
+@forking
+def test_sharded_update(fake_service, fake_api):
+    names = [f"LANG{i}" for i in range(6)]
+    for name in names:
+        fake_service.add_device(name, outputs=2)
+
+    with sharded_fleet(fake_service, fake_api.devices) as fleet:
+        updates = fleet.update(names)
+        # the pool and connectors of the workers are reused
+        assert all(u.ok for u in fleet.update(names[:2]))
+
+    assert sorted(u.device.name for u in updates) == names
+    assert all(u.ok for u in updates)
+    for name in names:
+        device = fake_api.devices[name]
+        assert device.is_online
+        assert device.backup_server_url
+        assert [o.output.title for o in device.outputs] == ["Output 0", "Output 1"]
+        assert device.outputs._outputs[0].device is device
+
+
+@forking
+def test_sharded_polling(fake_service, fake_api, tmp_path):
+    for i in range(6):
+        fake_service.add_device(f"LANG{i}", outputs=2)
+    fake_api.devices.update()
+
+    with sharded_fleet(fake_service, fake_api.devices) as fleet:
+        with HistoryStore(tmp_path / "history.db") as store:
+            recorder = HistoryRecorder(fake_api.devices, store, fleet=fleet)
+            fake_service.requests.clear()
+            recorder.poll_once()
+            series = store.series()
+
+    # the reads were made by the forked workers, on their copies of the service
+    assert fake_service.request_count == 0
+    # input and two outputs of every device
+    assert len(series) == 6 * 3
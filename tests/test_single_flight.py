@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from facecast_io.single_flight import SingleFlight
+
+
+def test_sequential_calls_are_not_shared():
+    calls = []
+    sf = SingleFlight()
+
+    def fetch():
+        calls.append(1)
+        return object()
+
+    assert sf.do("key", fetch) is not sf.do("key", fetch)
+    assert len(calls) == 2
+    assert len(sf) == 0
+
+
+def test_single_flight_shares_result():
+    calls = []
+    sf = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(sf.do, "key", fetch) for _ in range(4)]
+        while len(sf) == 0:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert len(sf) == 0
+
+
+def test_calls_after_forget_dont_join_older_ones():
+    calls = []
+    sf = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        number = len(calls)
+        release.wait(5)
+        return number
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(sf.do, "key", fetch)
+        while not calls:
+            time.sleep(0.01)
+        sf.forget()
+        second = pool.submit(sf.do, "key", fetch)
+        while len(calls) < 2:
+            time.sleep(0.01)
+        release.set()
+
+    assert (first.result(), second.result()) == (1, 2)
+    assert len(sf) == 0
+
+
+def test_concurrent_reads_are_coalesced(fake_service, fake_connector):
+    rtmp_id = fake_service.add_device("DEV", outputs=2)
+    fake_service.latency = 0.2
+    with ThreadPoolExecutor(8) as pool:
+        statuses = list(pool.map(fake_connector.get_status, [rtmp_id] * 8))
+        outputs = list(pool.map(fake_connector.get_outputs, [rtmp_id] * 8))
+
+    assert fake_service.count("/en/rtmp/ajaj") == 1
+    assert fake_service.count("/en/rtmp_outputs/ajaj") == 1
+    assert all(s == statuses[0] and s is not statuses[0] for s in statuses[1:])
+    assert all(len(o) == 2 for o in outputs)
+    outputs[0].__root__.clear()
+    assert len(outputs[1]) == 2
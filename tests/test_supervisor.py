@@ -0,0 +1,52 @@
+from facecast_io.supervisor import OutputSupervisor
+
+
+def test_failed_output_is_restarted(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV", outputs=2)
+    fake_api.devices.update()
+    broken, healthy = fake_service.devices[rtmp_id]["outputs"].values()
+    broken.update(enabled=True, cloud=False)
+    healthy.update(enabled=True, cloud=True)
+    recovered = []
+
+    supervisor = OutputSupervisor(
+        fake_api.devices, recheck_delay=0.01, on_recovered=recovered.append
+    )
+    supervisor.poll_once()
+
+    assert broken["cloud"]
+    assert fake_service.count("/en/out_rtmp_rtmp/ajaj", "start") == 1
+    assert [i.output_id for i in recovered] == [broken["id"]]
+    assert recovered[0].restarts == 1
+    assert supervisor.stats()["open"] == 0
+
+
+def test_flapping_output_restarts_are_damped(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV", outputs=1)
+    fake_api.devices.update()
+    output = list(fake_service.devices[rtmp_id]["outputs"].values())[0]
+
+    supervisor = OutputSupervisor(
+        fake_api.devices, backoff=0, max_restarts=2, recheck_delay=0
+    )
+    for _ in range(4):
+        output.update(enabled=True, cloud=False)
+        supervisor.poll_once()
+
+    assert fake_service.count("/en/out_rtmp_rtmp/ajaj", "start") == 2
+    assert supervisor.open_incidents[0].restarts == 2
+
+
+def test_incidents_of_deleted_outputs_are_forgotten(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV", outputs=1)
+    fake_api.devices.update()
+    outputs = fake_service.devices[rtmp_id]["outputs"]
+    list(outputs.values())[0].update(enabled=True, cloud=False)
+
+    supervisor = OutputSupervisor(fake_api.devices, backoff=60, recheck_delay=0)
+    supervisor.poll_once()
+    assert len(supervisor.open_incidents) == 1
+
+    outputs.clear()
+    supervisor.poll_once()
+    assert supervisor.open_incidents == []
@@ -0,0 +1,100 @@
+import pytest
+
+from facecast_io import journal as journal_module
+from facecast_io.errors import DeviceNotFound, FacecastAPIError, TemplateError
+from facecast_io.templates import (
+    OutputTemplate,
+    Template,
+    fan_out,
+    plan_fan_out,
+    run_fan_out,
+)
+
+@pytest.fixture(autouse=True)
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "JOURNAL_DIR", tmp_path / "journal")
+
+
+TEMPLATE = Template(
+    "sport",
+    [
+        OutputTemplate("YouTube {device}", "rtmp://a.rtmp.youtube.com/live2", "{yt}"),
+        OutputTemplate("Facebook", "rtmps://live-api-s.facebook.com:443/rtmp", "{fb}"),
+    ],
+)
+
+
+def test_render():
+    assert TEMPLATE.fields == ["device", "yt", "fb"]
+    streams = TEMPLATE.render("DE", {"yt": "k1", "fb": "k2"})
+    assert [(s.name, s.shared_key) for s in streams] == [
+        ("YouTube DE", "k1"),
+        ("Facebook", "k2"),
+    ]
+    with pytest.raises(TemplateError):
+        TEMPLATE.render("DE", {"yt": "k1"})
+
+
+def test_copy_and_save(tmp_path, fake_service, fake_api):
+    rtmp_id = fake_service.add_device("EN", outputs=2)
+    list(fake_service.devices[rtmp_id]["outputs"].values())[1]["descr"] = "Stream {1}"
+    fake_api.devices.update()
+
+    template = Template.from_outputs("copied", fake_api.devices["EN"].outputs)
+    template.save(tmp_path / "copied.json")
+
+    assert Template.load(tmp_path / "copied.json") == template
+    assert template.fields == ["key_0", "key_1"]
+    assert template.render("EN", {"key_0": "", "key_1": ""})[1].name == "Stream {1}"
+
+
+def test_fan_out(fake_service, fake_connector):
+    names = [f"LANG{i}" for i in range(4)]
+    for name in names:
+        fake_service.add_device(name, outputs=1)
+    fake_service.latency = 0.01
+    listings = fake_service.count("/en/main")
+    params = {name: {"yt": f"yt-{name}", "fb": f"fb-{name}"} for name in names}
+
+    results = fan_out(fake_connector, TEMPLATE, params, replace=True, max_workers=8)
+
+    assert all(r.ok for r in results)
+    for result in results:
+        assert [o.title for o in result.outputs] == [
+            f"YouTube {result.device_name}",
+            "Facebook",
+        ]
+    assert fake_service.count("/en/main") == listings + 1
+    assert fake_service.count("/en/out_rtmp_rtmp/ajaj", "add") == 8
+    assert fake_service.count("/en/out_rtmp_rtmp/ajaj", "delete") == 4
+    # the listing before replacing, one before every create and the final refresh
+    assert fake_service.count("/en/rtmp_outputs/ajaj") == 16
+
+    with pytest.raises(DeviceNotFound):
+        fan_out(fake_connector, TEMPLATE, {"MISSING": {"yt": "", "fb": ""}})
+
+
+def test_failed_fan_out_is_resumed(fake_service, fake_connector, monkeypatch):
+    for name in ("DE", "FR"):
+        fake_service.add_device(name)
+    create_output = fake_connector.create_output
+    calls = []
+
+    def flaky_create_output(rtmp_id, **kwargs):
+        calls.append(rtmp_id)
+        if len(calls) == 2:
+            raise FacecastAPIError("boom")
+        return create_output(rtmp_id, **kwargs)
+
+    monkeypatch.setattr(fake_connector, "create_output", flaky_create_output)
+    params = {name: {"yt": f"yt-{name}", "fb": f"fb-{name}"} for name in ("DE", "FR")}
+    journal = plan_fan_out(fake_connector, TEMPLATE, params)
+
+    results = run_fan_out(fake_connector, journal, max_workers=1)
+    assert [r.ok for r in results] == [False, False]
+    assert "boom" in results[0].errors["create"]
+    assert "not run" in results[1].errors["create"]
+
+    results = run_fan_out(fake_connector, journal_module.Journal(journal.path))
+    assert all(r.ok for r in results)
+    assert [len(r.outputs) for r in results] == [2, 2]
@@ -0,0 +1,63 @@
+from facecast_io.timeseries import IngestCollector, RingBuffer
+
+
+def test_ring_buffer_keeps_latest_values():
+    buffer = RingBuffer(4, "H")
+    for i in range(6):
+        buffer.append(i)
+
+    assert list(buffer.values()) == [2, 3, 4, 5]
+    assert list(buffer.values(last=2)) == [4, 5]
+    assert buffer.nbytes == 8
+
+
+def test_collector_stats(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV")
+    fake_api.devices.update()
+    collector = IngestCollector(fake_api.devices, interval=5, retention=3600)
+    series = collector.get_series(rtmp_id)
+    device = fake_service.devices[rtmp_id]
+    for i, bw_in in enumerate([3000000, 4000000, 5000000, 6000000]):
+        device.update(bw_in=bw_in, dropped=i * 10)
+        s = fake_api.server_connector.get_status(rtmp_id).status.s
+        series.add(s, at=collector.epoch + i * 5)
+
+    stats = collector.stats()[rtmp_id]
+    assert (stats.min_kbps, stats.mean_kbps, stats.p95_kbps) == (3000, 4500, 6000)
+    assert stats.dropped == 30
+    assert stats.drop_rate == 2
+    assert series.stats(window=5).samples == 2
+    assert series.meta["resolution"] == "1920x1080"
+    assert collector.capacity == 180
+    assert collector.nbytes == 180 * 12 + (60 + 12) * 14
+
+
+def test_series_rolls_up_old_samples(fake_service, fake_api):
+    rtmp_id = fake_service.add_device("DEV")
+    fake_api.devices.update()
+    collector = IngestCollector(fake_api.devices, interval=5)
+    series = collector.get_series(rtmp_id)
+    device = fake_service.devices[rtmp_id]
+    device.update(bw_in=4000000)
+    s = fake_api.server_connector.get_status(rtmp_id).status.s
+    for i in range(24 * 720):
+        series.add(s if i % 2 else None, at=collector.epoch + i * 5)
+
+    assert len(series) == 180
+    assert collector.nbytes < 10 * 1024
+    hour = series.stats(window=3600)
+    assert hour.samples == 720 and hour.mean_kbps == 2000 and hour.min_kbps == 0
+    day = series.stats()
+    assert day.samples == 24 * 720 and day.mean_kbps == 2000
+    assert series.stats(window=600).samples == 121
+
+
+def test_collector_polls_fleet(fake_service, fake_api):
+    fake_service.add_device("DEV1")
+    fake_service.add_device("DEV2")
+    fake_api.devices.update()
+
+    collector = IngestCollector(fake_api.devices)
+    collector.poll_once()
+
+    assert {s.samples for s in collector.stats().values()} == {1}
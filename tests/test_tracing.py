@@ -0,0 +1,48 @@
+import json
+
+from retry.api import retry_call
+
+from facecast_io.logger_setup import logger
+from facecast_io.tracing import span, traced, tracing
+
+
+def test_nested_spans_count_requests(fake_service, fake_api):
+    fake_service.add_device("DEV", outputs=2)
+
+    with tracing("update") as trace:
+        fake_api.devices.update()
+
+    update = trace.root.children[0]
+    assert update.name == "Devices.update"
+    assert update.requests == trace.root.requests == 7
+    assert [c.name for c in update.children] == ["GET en/main", "Device.update DEV"]
+    assert "Device.select_fastest_server DEV" in trace.format_tree()
+
+
+def test_retry_sleeps_are_recorded(tmp_path):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ValueError("try again")
+
+    @traced("flaky")
+    def call():
+        retry_call(flaky, exceptions=ValueError, tries=3, delay=0.01, logger=logger)
+
+    with tracing() as trace:
+        call()
+
+    flaky_span = trace.root.children[0]
+    assert len(flaky_span.children) == 2
+    assert abs(flaky_span.sleep - 0.02) < 1e-6
+
+    trace.save_chrome(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert [e["cat"] for e in events] == ["call", "call", "sleep", "sleep"]
+
+
+def test_nothing_is_recorded_outside_of_tracing():
+    with span("outside") as s:
+        assert s is None
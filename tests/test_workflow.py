@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from facecast_io.entities import Stream
+from facecast_io.workflow import (
+    Workflow,
+    WorkflowExecutor,
+    device_setup,
+    poll_until,
+)
+
+STREAMS = [
+    Stream(
+        name=f"Stream {i}",
+        server_url=f"rtmp://live{i}.example.com/app",
+        shared_key=f"key{i}",
+    )
+    for i in range(3)
+]
+
+
+def test_steps_run_after_their_requirements():
+    order = []
+    lock = threading.Lock()
+
+    def step(name, delay=0.0):
+        def run(ctx):
+            time.sleep(delay)
+            with lock:
+                order.append(name)
+            return name
+
+        return run
+
+    workflow = (
+        Workflow("wf")
+        .add("a", step("a"))
+        .add("b", step("b", 0.05), requires=["a"])
+        .add("c", step("c"), requires=["a"])
+        .add("d", step("d"), requires=["b", "c"])
+    )
+    (result,) = WorkflowExecutor().run([workflow])
+
+    assert result.ok
+    assert order == ["a", "c", "b", "d"]
+    assert result.context["d"] == "d"
+    with pytest.raises(ValueError):
+        workflow.add("e", step("e"), requires=["missing"])
+
+
+def test_failed_step_skips_dependents():
+    def fail(ctx):
+        raise RuntimeError("boom")
+
+    broken = Workflow("broken").add("a", fail).add("b", dict, requires=["a"])
+    fine = Workflow("fine").add("a", lambda ctx: 1)
+
+    broken_result, fine_result = WorkflowExecutor().run([broken, fine])
+
+    assert isinstance(broken_result.errors["a"], RuntimeError)
+    assert broken_result.skipped == ["b"]
+    assert fine_result.ok
+
+
+def test_poll_until_backs_off():
+    calls = []
+    assert poll_until(lambda: calls.append(1), timeout=0.3, interval=0.05) is None
+    # 0.05, 0.075, 0.1125 and the next one would be past the deadline
+    assert len(calls) == 4
+
+
+def test_device_setup(fake_service, fake_api):
+    fake_service.latency = 0.01
+    existing = fake_service.add_device("EXISTING", outputs=2)
+    fake_api.devices.update()
+
+    results = WorkflowExecutor(max_workers=8).run(
+        [
+            device_setup(fake_api.devices, name, STREAMS, start=True)
+            for name in ("EXISTING", "NEW1", "NEW2")
+        ]
+    )
+
+    assert all(r.ok for r in results), [r.errors for r in results]
+    for name in ("EXISTING", "NEW1", "NEW2"):
+        device = fake_api.devices[name]
+        assert [o.output.title for o in device.outputs] == [s.name for s in STREAMS]
+        assert all(o.output.enabled for o in device.outputs)
+    assert fake_api.devices["EXISTING"].rtmp_id == existing
+    assert fake_service.count("/en/main_add/ajaj") == 2